@@ -8,7 +8,8 @@ from .views import (
     toggle_ban_user,
     list_students,
     list_all_courses_for_admin,
-    toggle_course_visibility
+    toggle_course_visibility,
+    catalog_cache_stats
 )
 
 urlpatterns = [
@@ -28,4 +29,5 @@ urlpatterns = [
     # Course Management URLs
     path('courses/<slug:course_id>/toggle-visibility/', toggle_course_visibility, name='admin-course-toggle'),
     path('courses/', list_all_courses_for_admin, name='admin-course-list'),
+    path('courses/cache-stats/', catalog_cache_stats, name='admin-course-cache-stats'),
 ]
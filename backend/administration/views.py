@@ -9,6 +9,7 @@ from accounts.models import CustomUser
 from accounts.permissions import IsAdminOrSemiAdmin
 from django.shortcuts import get_object_or_404
 from courses.models import Course
+from courses.caching import catalog_page_cache_stats, reset_catalog_page_cache_stats
 from administration.serializers import CourseAdminSerializer
 # Create your views here.
 @api_view(['GET'])
@@ -109,4 +110,15 @@ def toggle_course_visibility(request, course_id):
         'id': course.slug,
         'title': course.name,
         'is_visible': course.is_visible
-    })
\ No newline at end of file
+    })
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOrSemiAdmin])
+def catalog_cache_stats(request):
+    """
+    GET: hit/miss counters of the anonymous course catalog cache, with the current catalog version.
+    DELETE: resets the counters.
+    """
+    if request.method == 'DELETE':
+        reset_catalog_page_cache_stats()
+    return Response(catalog_page_cache_stats())
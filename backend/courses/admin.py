@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, Certificate, Tag, Category, SubCategory, Module, ModuleContent, Enrollment, ContentProgress, Assignment, AssignmentSubmission
+from .models import Course, CourseStats, Certificate, CertificateJob, ChunkedUpload, Tag, Category, SubCategory, Module, ModuleContent, Enrollment, ContentProgress, Assignment, AssignmentSubmission
 # Register your models here.
 admin.site.register(Tag)
 admin.site.register(Category)
@@ -8,6 +8,8 @@ admin.site.register(ModuleContent)
 admin.site.register(Module)
 admin.site.register(ContentProgress)
 admin.site.register(Certificate)
+admin.site.register(CertificateJob)
+admin.site.register(ChunkedUpload)
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -28,6 +30,13 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ('course', 'enrollment_count', 'content_count', 'feedback_count', 'average_rating', 'updated_at')
+    search_fields = ('course__name',)
+    readonly_fields = ('course', 'enrollment_count', 'content_count', 'total_content_duration',
+                       'feedback_count', 'rating_total', 'average_rating', 'updated_at')
+
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ('title', 'module', 'deadline', 'created_at', 'module__course__author')
@@ -0,0 +1,146 @@
+"""
+Completion bitmaps: an alternative to one ContentProgress row per student and content.
+
+Every content gets an ordinal, unique within its course and never reused. An enrollment stores its
+completed contents as a bitmap in which bit n (byte n // 8, least significant bit first, the layout
+of Postgres get_bit on bytea) is set once the content with ordinal n is completed. A 500-item course
+costs 63 bytes per enrollment instead of up to 500 rows and their index entries.
+
+The request path still reads and writes ContentProgress; bitmaps_from_rows() and rows_from_bitmaps()
+convert between the two stores (`manage.py convert_progress_bitmaps`).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .caching import LRUCache
+from .models import ContentProgress, Course, Enrollment, ModuleContent
+from .outline import course_outline
+from .progress import rebuild_enrollment_progress
+
+# Keyed by (course id, outline built_at) like courses.prerequisites: content writes rebuild the outline
+content_ordinals = LRUCache(maxsize=512, ttl=60 * 60)
+
+
+def encode_ordinals(ordinals):
+    bits = 0
+    for ordinal in ordinals:
+        bits |= 1 << ordinal
+    return to_bitmap(bits)
+
+
+def to_bitmap(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def decode_ordinals(bitmap):
+    """Set bit positions of a bitmap, ascending."""
+    ordinals = []
+    for index, byte in enumerate(bytes(bitmap or b'')):
+        if byte:
+            ordinals.extend(index * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return ordinals
+
+
+def next_content_ordinal(course_id):
+    """Reserve the next ordinal of a course; the counter row stays locked until the transaction ends."""
+    with transaction.atomic():
+        Course.objects.filter(pk=course_id).update(next_content_ordinal=F('next_content_ordinal') + 1)
+        return Course.objects.filter(pk=course_id).values_list('next_content_ordinal', flat=True).get() - 1
+
+
+def course_content_ordinals(course):
+    """{ordinal: content id} for the course's contents (select_related('outline') to avoid a query)."""
+    return content_ordinals.get_or_set((course.pk, course_outline(course).built_at), lambda: dict(
+        ModuleContent.objects.filter(module__course=course, ordinal__isnull=False).values_list('ordinal', 'pk')
+    ))
+
+
+def bitmap_completed_ids(student, course):
+    """Ids of the contents of `course` the student has completed, read from the enrollment's bitmap."""
+    bitmap = Enrollment.objects.filter(student=student, course=course).values_list('completion_bitmap', flat=True).first()
+    if not bitmap:
+        return set()
+    ordinals = course_content_ordinals(course)
+    # Bits of deleted contents stay set but no longer map to a content
+    return {ordinals[ordinal] for ordinal in decode_ordinals(bitmap) if ordinal in ordinals}
+
+
+def mark_completed_bits(student, course, content_ids):
+    """
+    Set the bits of `content_ids` (contents of `course`) in the student's bitmap: one query for the
+    ordinals, then the enrollment row is locked, read and written. Returns the ids that were not set yet.
+    """
+    ordinals = dict(
+        ModuleContent.objects.filter(pk__in=content_ids, module__course=course, ordinal__isnull=False)
+        .values_list('pk', 'ordinal')
+    )
+    if not ordinals:
+        return []
+    with transaction.atomic():
+        row = Enrollment.objects.select_for_update().filter(student=student, course=course).values_list(
+            'pk', 'completion_bitmap',
+        ).first()
+        if row is None:
+            return []
+        bits = int.from_bytes(row[1] or b'', 'little')
+        newly_completed = sorted(pk for pk, ordinal in ordinals.items() if not bits >> ordinal & 1)
+        if newly_completed:
+            for pk in newly_completed:
+                bits |= 1 << ordinals[pk]
+            Enrollment.objects.filter(pk=row[0]).update(completion_bitmap=to_bitmap(bits))
+    return newly_completed
+
+
+def _courses(course_ids):
+    return Course.objects.order_by('pk').values_list('pk', flat=True) if course_ids is None else sorted(course_ids)
+
+
+def bitmaps_from_rows(course_ids=None):
+    """
+    Rewrite the bitmaps of every enrollment (of `course_ids`) from its completed ContentProgress rows,
+    one course at a time. Returns the number of enrollments written.
+    """
+    written = 0
+    for course_id in _courses(course_ids):
+        bits = {}
+        completed = ContentProgress.objects.filter(
+            course_id=course_id, content__module__course_id=course_id, is_completed=True, content__ordinal__isnull=False,
+        ).values_list('student_id', 'content__ordinal')
+        for student_id, ordinal in completed.iterator(chunk_size=5000):
+            bits[student_id] = bits.get(student_id, 0) | 1 << ordinal
+        enrollments = list(Enrollment.objects.filter(course_id=course_id).only('pk', 'student_id'))
+        for enrollment in enrollments:
+            enrollment.completion_bitmap = to_bitmap(bits.get(enrollment.student_id, 0))
+        Enrollment.objects.bulk_update(enrollments, ['completion_bitmap'], batch_size=1000)
+        written += len(enrollments)
+    return written
+
+
+def rows_from_bitmaps(course_ids=None):
+    """
+    Create or complete the ContentProgress rows recorded in the bitmaps (of `course_ids`); rows completed
+    earlier keep their `completed_at`. Enrollment counters are recomputed afterwards. Returns the rows written.
+    """
+    written = 0
+    now = timezone.now()
+    for course_id in _courses(course_ids):
+        ordinals = dict(
+            ModuleContent.objects.filter(module__course_id=course_id, ordinal__isnull=False).values_list('ordinal', 'pk')
+        )
+        already = set(ContentProgress.objects.filter(course_id=course_id, is_completed=True).values_list('student_id', 'content_id'))
+        rows = []
+        for student_id, bitmap in Enrollment.objects.filter(course_id=course_id).values_list('student_id', 'completion_bitmap'):
+            for ordinal in decode_ordinals(bitmap):
+                content_id = ordinals.get(ordinal)
+                if content_id is not None and (student_id, content_id) not in already:
+                    rows.append(ContentProgress(
+                        student_id=student_id, content_id=content_id, course_id=course_id, is_completed=True, completed_at=now,
+                    ))
+        ContentProgress.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=['student', 'content'],
+            update_fields=['course', 'is_completed', 'completed_at'],
+        )
+        written += len(rows)
+    # bulk_create skips the signals that maintain the counters
+    rebuild_enrollment_progress(course_ids)
+    return written
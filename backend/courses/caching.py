@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+CATALOG_VERSION_KEY = 'catalog'
+TAGS_VERSION_KEY = 'tags'
+CATEGORIES_VERSION_KEY = 'categories'
+SUBCATEGORIES_VERSION_KEY = 'subcategories'
+
+CATALOG_PAGE_CACHE_TIMEOUT = 60 * 10
+# Query params the catalog list reads; anything else is dropped from the cache key
+CATALOG_PAGE_PARAMS = [
+    'search', 'search_mode', 'level', 'category', 'subcategory', 'is_published', 'is_visible',
+    'price_min', 'price_max', 'tags', 'tags_all', 'cursor', 'ordering', 'page_size', 'fields',
+]
+CATALOG_PAGE_COUNTER_KEYS = {'hits': 'courses:catalog-page:hits', 'misses': 'courses:catalog-page:misses'}
+
+
+def course_version_key(course_id):
+    return f'course:{course_id}'
+
+
+def user_course_version_key(user_id, course_id):
+    """Per-student state shown on a course page: progress and certificate."""
+    return f'user-course:{user_id}:{course_id}'
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU cache with a per-entry TTL.
+    Lives in each worker's memory; callers clear it from model signals when the underlying data changes.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+def get_versions(*keys):
+    """{key: (version, updated_at)} for the given version keys in one query; missing keys are (0, None)."""
+    from .models import ResourceVersion
+    found = {row[0]: row[1:] for row in ResourceVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')}
+    return {key: found.get(key, (0, None)) for key in keys}
+
+
+def bump_versions(*keys):
+    """Increment the given version counters, creating them on first use."""
+    from .models import ResourceVersion
+    keys = set(keys)
+    if not keys:
+        return
+    updated = ResourceVersion.objects.filter(key__in=keys).update(version=F('version') + 1, updated_at=timezone.now())
+    if updated < len(keys):
+        existing = set(ResourceVersion.objects.filter(key__in=keys).values_list('key', flat=True))
+        ResourceVersion.objects.bulk_create(
+            [ResourceVersion(key=key, version=1) for key in keys - existing], ignore_conflicts=True
+        )
+
+
+def catalog_version():
+    """
+    Global version of the catalog, bumped by courses.signals on catalog writes.
+    Cached catalog data embeds it in its key, so a bump invalidates everything at once.
+    It lives in the database, so every worker sees the same value whatever the cache backend.
+    """
+    return get_versions(CATALOG_VERSION_KEY)[CATALOG_VERSION_KEY][0]
+
+
+def conditional_get(request, *keys, vary='', last_modified=True):
+    """
+    Validators for a GET response that depends only on the given version keys (plus `vary`, e.g. the user
+    and query string). Returns (response, headers): `response` is a 304 when the client's
+    If-None-Match / If-Modified-Since still matches, otherwise None and the view should render as usual
+    and attach `headers`. Pass last_modified=False for responses that vary per user or query.
+    """
+    versions = get_versions(*keys)
+    digest = hashlib.md5(f"{sorted((k, v[0]) for k, v in versions.items())}:{vary}".encode()).hexdigest()
+    etag = quote_etag(digest)
+    timestamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    modified = int(max(timestamps).timestamp()) if last_modified and timestamps else None
+
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache' if vary else 'no-cache'}
+    if modified is not None:
+        headers['Last-Modified'] = http_date(modified)
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is not None:
+        for name, value in headers.items():
+            response.headers[name] = value
+    return response, headers
+
+
+def query_signature(query_params, keys):
+    """Stable digest of the given query params, independent of parameter order and repeats."""
+    items = sorted((key, tuple(sorted(set(query_params.getlist(key))))) for key in keys if key in query_params)
+    return hashlib.md5(repr(items).encode()).hexdigest()
+
+
+def catalog_page_cache_key(request, etag):
+    """
+    Cache key for an anonymous catalog page. `etag` comes from conditional_get on the catalog version,
+    so a version bump moves every page to a new key and stale entries simply expire.
+    """
+    signature = query_signature(request.query_params, CATALOG_PAGE_PARAMS)
+    # The host is part of the key because the page's `next` link is absolute
+    return f'courses:catalog-page:{etag}:{request.get_host()}:{signature}'
+
+
+def record_catalog_page_lookup(hit):
+    """Count a catalog page cache hit or miss in the shared cache, so every worker adds to the same totals."""
+    key = CATALOG_PAGE_COUNTER_KEYS['hits' if hit else 'misses']
+    if cache.add(key, 1, timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def catalog_page_cache_stats():
+    counts = cache.get_many(CATALOG_PAGE_COUNTER_KEYS.values())
+    hits = counts.get(CATALOG_PAGE_COUNTER_KEYS['hits'], 0)
+    misses = counts.get(CATALOG_PAGE_COUNTER_KEYS['misses'], 0)
+    return {
+        'catalog_version': catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def reset_catalog_page_cache_stats():
+    cache.delete_many(CATALOG_PAGE_COUNTER_KEYS.values())
@@ -0,0 +1,188 @@
+"""
+Database-backed queue for certificate PDF rendering.
+
+Views call enqueue_certificate(), which moves the certificate to 'generating' and queues a
+CertificateJob in the same transaction. `manage.py process_certificate_jobs` claims queued jobs with
+SELECT ... FOR UPDATE SKIP LOCKED (so several workers can run side by side), renders them in a thread or
+process pool and records the result; the frontend polls the certificate status endpoint meanwhile.
+"""
+import os
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+from .caching import bump_versions, user_course_version_key
+from .models import Certificate, CertificateJob
+from .utils.certificate_renderer import certificate_path, render_certificate
+
+# Delay before retry n is RETRY_BACKOFF * 2 ** (n - 1)
+RETRY_BACKOFF = timedelta(seconds=30)
+# A running job whose worker has not reported back in this long is assumed dead and queued again
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_certificate(certificate, issued_at=None):
+    """Mark the certificate 'generating' and queue its render; an already queued or running job is reused."""
+    with transaction.atomic():
+        certificate.status = 'generating'
+        if issued_at is not None:
+            certificate.issued_at = issued_at
+        certificate.save()
+        job = certificate.jobs.filter(status__in=['queued', 'running']).first()
+        if job is None:
+            job = CertificateJob.objects.create(certificate=certificate)
+    return job
+
+
+def enqueue_certificates(certificates, issued_at=None):
+    """
+    enqueue_certificate() for many certificates in a fixed number of queries: one update moves them all to
+    'generating' and one insert queues those without a queued or running job. Returns the jobs.
+    """
+    ids = [certificate.pk for certificate in certificates]
+    changes = {'status': 'generating'}
+    if issued_at is not None:
+        changes['issued_at'] = issued_at
+    with transaction.atomic():
+        Certificate.objects.filter(pk__in=ids).update(**changes)
+        active = {
+            job.certificate_id: job
+            for job in CertificateJob.objects.filter(certificate_id__in=ids, status__in=['queued', 'running'])
+        }
+        jobs = CertificateJob.objects.bulk_create([CertificateJob(certificate_id=pk) for pk in ids if pk not in active])
+        # Queryset updates skip the post_save receiver that bumps these
+        bump_versions(*(user_course_version_key(certificate.student_id, certificate.course_id) for certificate in certificates))
+    for certificate in certificates:
+        for field, value in changes.items():
+            setattr(certificate, field, value)
+    return list(active.values()) + jobs
+
+
+def student_display_name(student):
+    return student.get_full_name() or student.username
+
+
+def render_args(job):
+    """Arguments of render_certificate for a job claimed with claim_jobs()."""
+    return certificate_render_args(job.certificate)
+
+
+def certificate_render_args(certificate):
+    """Arguments of render_certificate; select_related('student', 'course__author') to avoid queries."""
+    course = certificate.course
+    issued_on = timezone.localdate(certificate.issued_at or timezone.now())
+    return (
+        course.pk, student_display_name(course.author), student_display_name(certificate.student), course.name,
+        issued_on, certificate.pk,
+    )
+
+
+def claim_jobs(worker, limit):
+    """Lock up to `limit` due jobs, mark them running for `worker` and return them with their certificate data."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CertificateJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        CertificateJob.objects.filter(pk__in=ids).update(
+            status='running', locked_at=now, worker=worker, attempts=F('attempts') + 1,
+        )
+    return list(
+        CertificateJob.objects.filter(pk__in=ids).select_related('certificate__student', 'certificate__course__author').order_by('pk')
+    )
+
+
+def complete_jobs(results):
+    """
+    Approve the certificates of finished jobs, [(job, rendered file)], with one update per table; a
+    certificate rejected while its job ran keeps its status.
+    """
+    if not results:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        Certificate.objects.filter(pk__in=[job.certificate_id for job, _ in results], status='generating').update(
+            status='approved',
+            pdf_file=Case(*(When(pk=job.certificate_id, then=Value(pdf_path)) for job, pdf_path in results), output_field=CharField()),
+            issued_at=Coalesce('issued_at', Value(now)),
+        )
+        CertificateJob.objects.filter(pk__in=[job.pk for job, _ in results]).update(status='done', finished_at=now, last_error='')
+        # Queryset updates skip the post_save receiver that bumps these
+        bump_versions(*(
+            user_course_version_key(job.certificate.student_id, job.certificate.course_id) for job, _ in results
+        ))
+
+
+def complete_job(job, pdf_path):
+    complete_jobs([(job, pdf_path)])
+
+
+def fail_job(job, error):
+    """Queue the job again with backoff, or give up and mark the certificate 'failed' after the last attempt."""
+    now = timezone.now()
+    message = ''.join(traceback.format_exception_only(type(error), error)).strip()
+    with transaction.atomic():
+        if job.attempts < job.max_attempts:
+            CertificateJob.objects.filter(pk=job.pk).update(
+                status='queued', run_after=now + RETRY_BACKOFF * 2 ** (job.attempts - 1), last_error=message,
+            )
+            return
+        CertificateJob.objects.filter(pk=job.pk).update(status='failed', finished_at=now, last_error=message)
+        Certificate.objects.filter(pk=job.certificate_id, status='generating').update(status='failed')
+        bump_versions(user_course_version_key(job.certificate.student_id, job.certificate.course_id))
+
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Put jobs left 'running' by a worker that died back in the queue; returns how many."""
+    return CertificateJob.objects.filter(status='running', locked_at__lt=timezone.now() - timeout).update(status='queued')
+
+
+def run_job(job):
+    """Render a claimed job in the current thread and record the outcome."""
+    try:
+        pdf_path = render_certificate(*render_args(job))
+    except Exception as error:
+        fail_job(job, error)
+        return False
+    complete_job(job, pdf_path)
+    return True
+
+
+def certificate_file(certificate):
+    """
+    Storage name of an approved certificate's PDF, rendering it in this thread first if the file is
+    missing, e.g. after MEDIA_ROOT was moved or restored without it.
+    """
+    name = certificate.pdf_file.name or certificate_path(certificate.pk)
+    if not os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+        name = render_certificate(*certificate_render_args(certificate))
+        if certificate.pdf_file.name != name:
+            Certificate.objects.filter(pk=certificate.pk).update(pdf_file=name)
+            certificate.pdf_file.name = name
+    return name
+
+
+def certificate_status(certificate):
+    """What the frontend polls: the certificate's status, its file once rendered and its latest job."""
+    job = certificate.jobs.order_by('-pk').first()
+    return {
+        'id': certificate.pk,
+        'status': certificate.status,
+        'pdf_file': certificate.pdf_file.url if certificate.pdf_file else None,
+        'download_url': reverse('download-certificate', args=[certificate.pk]) if certificate.status == 'approved' else None,
+        'issued_at': certificate.issued_at,
+        'job': job and {
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'run_after': job.run_after,
+            'last_error': job.last_error,
+        },
+    }
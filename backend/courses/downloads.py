@@ -0,0 +1,116 @@
+"""
+Streaming downloads of files under MEDIA_ROOT for views that check permissions first.
+
+serve_media_file() answers with a FileResponse that streams the open file in blocks (servers with a
+wsgi.file_wrapper send whole files with sendfile()), validated by an ETag and Last-Modified built from
+the file's mtime and size, and honours a single byte range. With SENDFILE_ACCEL_PREFIX set (an nginx
+`internal` location aliased to MEDIA_ROOT) the view only checks permissions and hands the file to the
+web server with X-Accel-Redirect, which then does ranges and validators itself.
+"""
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """`length` bytes of an open file from `start`, read in whatever blocks the response asks for."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def byte_range(header, size):
+    """
+    (first, last) byte of a single-range `Range` header, inclusive. None means send the whole file: no
+    header, several ranges or a malformed one, all of which a server may ignore. Raises ValueError when
+    the range starts past the end of the file.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - suffix), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError('Range starts past the end of the file')
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, modified):
+    """Whether a Range request may be answered partially: If-Range, when sent, must name the current file."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == modified
+
+
+def serve_media_file(request, name, filename=None, content_type=None):
+    """Response for GET/HEAD of the file `name` (relative to MEDIA_ROOT); call after checking permissions."""
+    filename = filename or os.path.basename(name)
+    prefix = getattr(settings, 'SENDFILE_ACCEL_PREFIX', '')
+    if prefix:
+        response = HttpResponse(content_type=content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+        return response
+
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    stat = os.stat(path)
+    modified = int(stat.st_mtime)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(modified),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-cache',
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is not None:
+        for header, value in headers.items():
+            response.headers[header] = value
+        return response
+
+    try:
+        requested = byte_range(request.headers.get('Range'), stat.st_size) if if_range_matches(request, etag, modified) else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(path, 'rb')
+    if requested is None:
+        response = FileResponse(file, filename=filename, content_type=content_type)
+    else:
+        first, last = requested
+        response = FileResponse(FileRange(file, first, last - first + 1), status=206, filename=filename, content_type=content_type)
+        response['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+        response['Content-Length'] = last - first + 1
+    for header, value in headers.items():
+        response.headers[header] = value
+    return response
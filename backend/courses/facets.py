@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import Cast
+from .caching import catalog_version, query_signature
+from .models import Course
+
+FACET_CACHE_TIMEOUT = 60 * 10
+
+# Query params that change the facet counts; anything else (cursor, ordering, page_size) is ignored
+FACET_FILTER_PARAMS = [
+    'search', 'search_mode', 'level', 'category', 'subcategory',
+    'is_published', 'is_visible', 'price_min', 'price_max', 'tags', 'tags_all',
+]
+
+# (value, label, upper bound exclusive); the last band is open-ended
+PRICE_BANDS = [
+    ('free', 'Free', None),
+    ('under-500', 'Under ₹500', 500),
+    ('500-2000', '₹500 - ₹2000', 2000),
+    ('2000-plus', '₹2000 and above', None),
+]
+
+LEVEL_LABELS = dict(Course._meta.get_field('level').choices)
+
+
+def price_band():
+    whens = [When(price=0, then=Value(PRICE_BANDS[0][0]))]
+    whens += [When(price__lt=upper, then=Value(value)) for value, _, upper in PRICE_BANDS[1:-1]]
+    return Case(*whens, default=Value(PRICE_BANDS[-1][0]), output_field=CharField())
+
+
+def facet_counts(courses):
+    """
+    Counts per category, subcategory, level, tag and price band for a filtered course queryset.
+    Each facet is a GROUP BY over the same filtered rows, combined with UNION ALL so the
+    whole set arrives in one round trip.
+    """
+    courses = courses.order_by()
+    text = CharField()
+    parts = {
+        'category': courses.filter(category__isnull=False).values(value=F('category_id'), label=F('category__name')),
+        'subcategory': courses.filter(subcategory__isnull=False).values(value=F('subcategory_id'), label=F('subcategory__name')),
+        'level': courses.values(value=F('level'), label=Value('', output_field=text)),
+        'tags': courses.filter(tags__isnull=False).values(value=Cast('tags__id', text), label=F('tags__name')),
+        'price': courses.values(value=price_band(), label=Value('', output_field=text)),
+    }
+    queries = [
+        queryset.annotate(facet=Value(name, output_field=text), count=Count('pk')).values('facet', 'value', 'label', 'count')
+        for name, queryset in parts.items()
+    ]
+    facets = {name: [] for name in parts}
+    for row in queries[0].union(*queries[1:], all=True):
+        facets[row['facet']].append({'value': row['value'], 'label': row['label'], 'count': row['count']})
+
+    # Labels that are not stored in the database
+    band_labels = {value: label for value, label, _ in PRICE_BANDS}
+    for row in facets['price']:
+        row['label'] = band_labels[row['value']]
+    for row in facets['level']:
+        row['label'] = LEVEL_LABELS.get(row['value'], row['value'])
+    for rows in facets.values():
+        rows.sort(key=lambda row: (-row['count'], str(row['label'])))
+    return facets
+
+
+def cached_facet_counts(request, courses):
+    """Facet counts cached per normalized filter signature, visibility scope and catalog version."""
+    scope = 'auth' if request.user.is_authenticated else 'anon'
+    key = f"courses:facets:{catalog_version()}:{scope}:{query_signature(request.query_params, FACET_FILTER_PARAMS)}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = facet_counts(courses)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
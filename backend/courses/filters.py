@@ -1,6 +1,17 @@
 import django_filters
+from django.db.models import Exists, OuterRef
 from .models import Course
 
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+def tagged_with(tag_ids):
+    """EXISTS over the course/tag link table; avoids the join fan-out (and DISTINCT) of filtering on tags__id."""
+    return Exists(Course.tags.through.objects.filter(course_id=OuterRef('pk'), tag_id__in=tag_ids))
+
+
 class CourseFilter(django_filters.FilterSet):
     price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
@@ -9,8 +20,18 @@ class CourseFilter(django_filters.FilterSet):
     is_visible = django_filters.BooleanFilter()
     category = django_filters.CharFilter(field_name='category__slug', lookup_expr='iexact')
     subcategory = django_filters.CharFilter(field_name='subcategory__slug', lookup_expr='iexact')
-    tags = django_filters.AllValuesMultipleFilter(field_name='tags__id', conjoined=False)
+    # ?tags=1,2 matches courses with any of the tags, ?tags_all=1,2 courses with every one of them
+    tags = NumberInFilter(method='filter_tags_any')
+    tags_all = NumberInFilter(method='filter_tags_all')
 
     class Meta:
         model = Course
-        fields = ['level', 'is_published', 'is_visible', 'category', 'subcategory', 'tags']
+        fields = ['level', 'is_published', 'is_visible', 'category', 'subcategory', 'tags', 'tags_all']
+
+    def filter_tags_any(self, queryset, name, value):
+        return queryset.filter(tagged_with(value)) if value else queryset
+
+    def filter_tags_all(self, queryset, name, value):
+        for tag_id in set(value):
+            queryset = queryset.filter(tagged_with([tag_id]))
+        return queryset
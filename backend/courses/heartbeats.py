@@ -0,0 +1,357 @@
+"""
+Write-behind buffer for video heartbeats.
+
+Players report their position every few seconds; writing each report to ContentProgress would cost an
+upsert per event. Instead each worker keeps the latest state per (student, content) in memory and
+writes all of them in a few bulk statements every HEARTBEAT_FLUSH_INTERVAL seconds.
+
+Accepted events are also appended to a per-process journal (heartbeats-<pid>.log in
+HEARTBEAT_JOURNAL_DIR) before they are acknowledged. A flush rotates the journal aside and deletes it
+only after the database write committed, so events of a worker that dies between two flushes are
+replayed by the next buffer created on the same host (or by `manage.py flush_heartbeats`). States the
+database rejects are moved to heartbeats-rejected.log instead of being retried.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .caching import LRUCache, bump_versions, user_course_version_key
+from .models import ContentProgress, Enrollment, ModuleContent
+from .progress import completed_count_subquery
+
+logger = logging.getLogger(__name__)
+
+# A video counts as watched once the player reports this share of its length
+COMPLETION_RATIO = 0.9
+# Largest number of events accepted by one ingestion request
+MAX_HEARTBEAT_EVENTS = 200
+# Longest video a heartbeat may report a position or duration for
+MAX_VIDEO_SECONDS = 24 * 60 * 60
+# Primary keys and position_seconds are 32-bit integer columns
+MAX_ID = 2 ** 31
+
+# heartbeats-<pid>.log is a live journal, heartbeats-<pid>-<ns>.flushing one waiting for its flush
+JOURNAL_NAME = re.compile(r'^heartbeats-(\d+)(?:\.log|-\d+\.flushing)$')
+# States the database rejected, kept for inspection and never replayed
+REJECTED_JOURNAL = 'heartbeats-rejected.log'
+
+# (student id, content id) -> course id for video contents the student is enrolled in
+heartbeat_targets = LRUCache(maxsize=50000, ttl=5 * 60)
+
+
+def resolve_heartbeat_targets(student, content_ids):
+    """{content id: course id} for the ids that are videos of courses `student` is enrolled in; at most one query."""
+    resolved, missing = {}, []
+    for content_id in content_ids:
+        course_id = heartbeat_targets.get((student.pk, content_id))
+        if course_id is None:
+            missing.append(content_id)
+        else:
+            resolved[content_id] = course_id
+    if missing:
+        rows = ModuleContent.objects.filter(
+            pk__in=missing, content_type='video', module__course__enrollments__student=student,
+        ).values_list('pk', 'module__course_id')
+        for content_id, course_id in rows:
+            heartbeat_targets.set((student.pk, content_id), course_id)
+            resolved[content_id] = course_id
+    return resolved
+
+
+def parse_heartbeat(event):
+    """
+    (content id, position, duration or None, completed) from a raw event; raises ValueError/KeyError/TypeError.
+    The position is clamped to 0..duration (or MAX_VIDEO_SECONDS), so every stored value fits its column.
+    """
+    content_id = int(event['content_id'])
+    if not 0 < content_id < MAX_ID:
+        raise ValueError('content_id is out of range')
+    position = float(event['position'])
+    duration = float(event['duration']) if event.get('duration') else None
+    if not math.isfinite(position) or (duration is not None and not 0 < duration <= MAX_VIDEO_SECONDS):
+        raise ValueError(f'position must be finite and duration between 0 and {MAX_VIDEO_SECONDS} seconds')
+    position = min(max(position, 0.0), duration or MAX_VIDEO_SECONDS)
+    return content_id, position, duration, bool(event.get('completed', False))
+
+
+def is_watched(event):
+    duration = event.get('duration')
+    return bool(event.get('completed')) or bool(duration and event['position'] >= COMPLETION_RATIO * duration)
+
+
+def coalesce(pending, event):
+    """
+    Fold an event into `pending`, keyed by (student, content): the most recent position wins and a
+    completed video stays completed. Pending states have the shape of events, so they fold the same way.
+    """
+    key = (event['student'], event['content'])
+    watched = is_watched(event)
+    state = pending.get(key)
+    if state is None:
+        pending[key] = {
+            'student': event['student'], 'content': event['content'], 'course': event['course'],
+            'position': event['position'], 'completed': watched, 'at': event['at'],
+        }
+        return
+    if event['at'] >= state['at']:
+        state['position'] = event['position']
+        state['at'] = event['at']
+    state['completed'] = state['completed'] or watched
+
+
+def write_progress(pending):
+    """
+    Write coalesced states to ContentProgress: one query finds the pairs already completed, then two
+    INSERT ... ON CONFLICT statements store newly completed rows (with `completed_at`) and position-only
+    updates. bulk_create skips the model signals, so enrollment counters and versions are updated here.
+    """
+    if not pending:
+        return
+    students = {student for student, _ in pending}
+    contents = {content for _, content in pending}
+    already = set(ContentProgress.objects.filter(
+        student_id__in=students, content_id__in=contents, is_completed=True,
+    ).values_list('student_id', 'content_id'))
+
+    now = timezone.now()
+    completing, watching = [], []
+    for key, state in pending.items():
+        row = ContentProgress(
+            student_id=state['student'], content_id=state['content'], course_id=state['course'],
+            position_seconds=int(state['position']),
+            last_heartbeat_at=datetime.fromtimestamp(state['at'], tz=dt_timezone.utc),
+        )
+        if state['completed'] and key not in already:
+            row.is_completed = True
+            row.completed_at = now
+            completing.append(row)
+        else:
+            watching.append(row)
+
+    with transaction.atomic():
+        if completing:
+            ContentProgress.objects.bulk_create(
+                completing, update_conflicts=True, unique_fields=['student', 'content'],
+                update_fields=['course', 'is_completed', 'completed_at', 'position_seconds', 'last_heartbeat_at'],
+            )
+        if watching:
+            ContentProgress.objects.bulk_create(
+                watching, update_conflicts=True, unique_fields=['student', 'content'],
+                update_fields=['position_seconds', 'last_heartbeat_at'],
+            )
+        if completing:
+            enrollments = {(row.student_id, row.course_id) for row in completing}
+            match = Q()
+            for student_id, course_id in enrollments:
+                match |= Q(student_id=student_id, course_id=course_id)
+            Enrollment.objects.filter(match).update(completed_count=completed_count_subquery())
+            bump_versions(*(user_course_version_key(student_id, course_id) for student_id, course_id in enrollments))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class HeartbeatJournal:
+    """Append-only JSON-lines file of the events this process accepted and has not flushed yet."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'heartbeats-{os.getpid()}.log')
+        self.orphans = self.claim_orphans()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, events):
+        self.file.write(''.join(json.dumps(event) + '\n' for event in events))
+        self.file.flush()
+
+    def rotate(self):
+        """Move the journal aside for a flush and start a new one; returns the rotated path."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        rotated = os.path.join(self.directory, f'heartbeats-{os.getpid()}-{time.time_ns()}.flushing')
+        os.replace(self.path, rotated)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        return rotated
+
+    def claim_orphans(self):
+        """
+        Take over journals left by processes that are no longer running (or by an earlier process with
+        this pid; called before this process opens its own). Each is renamed to a name owned by this process first, so two workers starting at the
+        same time never replay the same file.
+        """
+        claimed = []
+        for name in sorted(os.listdir(self.directory)):
+            match = JOURNAL_NAME.match(name)
+            if not match:
+                continue
+            pid = int(match.group(1))
+            path = os.path.join(self.directory, name)
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            target = os.path.join(self.directory, f'heartbeats-{os.getpid()}-{time.time_ns()}.flushing')
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # claimed by another worker
+            claimed.append(target)
+        return claimed
+
+    def close(self):
+        self.file.close()
+
+
+def read_journal(path):
+    """Events recorded in a journal; a line cut short by a crash is skipped."""
+    events = []
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning('Skipping a truncated heartbeat record in %s', path)
+    return events
+
+
+class HeartbeatBuffer:
+    """
+    Per-process buffer of coalesced heartbeats, written to ContentProgress by flush().
+    A daemon thread flushes every `interval` seconds (0 leaves flushing to the caller) and earlier when
+    more than `max_pending` pairs are waiting; whatever is left is flushed when the process exits.
+    """
+
+    def __init__(self, journal_dir=None, interval=0, max_pending=5000):
+        self.pid = os.getpid()
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = {}
+        self.unflushed = []  # rotated or recovered journals covered by the next flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.journal = HeartbeatJournal(journal_dir) if journal_dir else None
+        if self.journal:
+            for path in self.journal.orphans:
+                for event in read_journal(path):
+                    coalesce(self.pending, event)
+                self.unflushed.append(path)
+
+    def record(self, events):
+        """Journal and buffer validated events: dicts with student, content, course, position, duration, completed."""
+        now = time.time()
+        for event in events:
+            event['at'] = now
+        with self._lock:
+            if self.journal:
+                self.journal.append(events)
+            for event in events:
+                coalesce(self.pending, event)
+            waiting = len(self.pending)
+        self.start()
+        if waiting >= self.max_pending:
+            self._wake.set()
+
+    def position(self, student_id, content_id):
+        """The buffered position of a pair, or None when nothing is waiting for it in this process."""
+        with self._lock:
+            state = self.pending.get((student_id, content_id))
+            return state and state['position']
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of (student, content) pairs written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+                if self.journal and pending:
+                    self.unflushed.append(self.journal.rotate())
+            try:
+                write_progress(pending)
+            except (DataError, IntegrityError):
+                # Some state can never be written; retrying the batch would fail forever
+                self.write_one_by_one(pending)
+            except Exception:
+                # Keep the states (and their journals) for the next attempt; newer events win as usual
+                with self._lock:
+                    for event in pending.values():
+                        coalesce(self.pending, event)
+                raise
+            for path in self.unflushed:
+                os.remove(path)
+            self.unflushed = []
+            return len(pending)
+
+    def write_one_by_one(self, pending):
+        """Write each state on its own and quarantine the ones the database rejects."""
+        rejected = []
+        for key, state in pending.items():
+            try:
+                write_progress({key: state})
+            except (DataError, IntegrityError):
+                rejected.append(state)
+        if not rejected:
+            return
+        logger.error('Dropped %d heartbeat states the database rejected', len(rejected))
+        if self.journal:
+            with open(os.path.join(self.journal.directory, REJECTED_JOURNAL), 'a', encoding='utf-8') as quarantine:
+                quarantine.write(''.join(json.dumps(state) + '\n' for state in rejected))
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='heartbeat-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Heartbeat flush failed; retrying on the next interval')
+            finally:
+                close_old_connections()
+
+    def close(self):
+        if self.pid != os.getpid():
+            return  # inherited through fork; the parent owns the journal
+        try:
+            self.flush()
+        finally:
+            if self.journal:
+                self.journal.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def heartbeat_buffer():
+    """This process's buffer, created on first use (and again in a forked child)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None or _buffer.pid != os.getpid():
+            _buffer = HeartbeatBuffer(
+                journal_dir=settings.HEARTBEAT_JOURNAL_DIR or None,
+                interval=settings.HEARTBEAT_FLUSH_INTERVAL,
+                max_pending=settings.HEARTBEAT_MAX_PENDING,
+            )
+            atexit.register(_buffer.close)
+        return _buffer
@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.models import Course
+from courses.search import fulltext_search, icontains_search, update_search_vectors
+
+WORDS = (
+    'python django react data science machine learning design marketing finance music '
+    'photography fitness cloud security devops testing algorithms databases writing business'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare the catalog's icontains search against the ranked full-text search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('query', help='Search text, e.g. "python web"')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed runs per search mode')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic courses first (rolled back afterwards)')
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of each mode')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        author, _ = get_user_model().objects.get_or_create(username='benchmark-author')
+        rng = random.Random(42)
+        today = datetime.date.today()
+        courses = []
+        for i in range(count):
+            name = ' '.join(rng.sample(WORDS, 3)).title()
+            courses.append(Course(
+                slug=f'benchmark-{i}', name=name, author=author, launch_date=today, duration=10,
+                description=' '.join(rng.choices(WORDS, k=60)),
+            ))
+        Course.objects.bulk_create(courses, batch_size=1000)
+        update_search_vectors()
+        self.stdout.write(f'Seeded {count} courses')
+
+    def run(self, options):
+        query, size = options['query'], options['page_size']
+        modes = {
+            'icontains': icontains_search(Course.objects.all(), query).order_by('-created_at', '-slug'),
+            'fulltext': fulltext_search(Course.objects.all(), query).order_by('-rank', '-slug'),
+        }
+        for mode, queryset in modes.items():
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(queryset.values_list('pk', flat=True)[:size])
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{mode:>10}: matches={queryset.count()} median={statistics.median(timings):.2f}ms p95={p95:.2f}ms'
+            )
+            if options['explain']:
+                self.stdout.write(queryset[:size].explain())
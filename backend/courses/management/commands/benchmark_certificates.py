@@ -0,0 +1,37 @@
+import datetime
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from courses.utils.certificate_generator import generate_certificate_pdf
+from courses.utils.certificate_renderer import certificate_templates, render_certificate
+
+
+class Command(BaseCommand):
+    help = (
+        'Certificates rendered per second by the full ReportLab generator and by the per-course template '
+        'renderer. Files are written to a temporary MEDIA_ROOT; no database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Certificates rendered per path')
+        parser.add_argument('--courses', type=int, default=5, help='Courses the certificates are spread over')
+
+    def handle(self, *args, **options):
+        count, courses = options['count'], options['courses']
+        issued_on = datetime.date.today()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            full = self.rate(count, lambda i: generate_certificate_pdf(f'Student {i}', f'Course {i % courses}', i))
+            certificate_templates.clear()
+            # Includes building the templates of every course: one cold render each
+            template = self.rate(count, lambda i: render_certificate(
+                i % courses, f'Instructor {i % courses}', f'Student {i}', f'Course {i % courses}', issued_on, i,
+            ))
+        self.stdout.write(f'full render: {full:,.0f} certificates/s')
+        self.stdout.write(f'template:    {template:,.0f} certificates/s ({template / full:.1f}x)')
+
+    def rate(self, count, render):
+        start = time.perf_counter()
+        for i in range(count):
+            render(i)
+        return count / (time.perf_counter() - start)
@@ -0,0 +1,127 @@
+import datetime
+import random
+import shutil
+import tempfile
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from courses.heartbeats import HeartbeatBuffer
+from courses.models import ContentProgress, Course, Enrollment, Module, ModuleContent
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """connection.execute_wrapper counting statements (the debug query log is capped at 9000 entries)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare writing every video heartbeat to ContentProgress with the write-behind buffer '
+        '(in memory and journaled). Runs on synthetic students and videos, rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--videos', type=int, default=20)
+        parser.add_argument('--events', type=int, default=20000, help='Heartbeats replayed per mode')
+        parser.add_argument('--batch', type=int, default=5, help='Events per ingestion request')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                students, course, videos = self.seed(options)
+                self.run(options, students, course, videos)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(username='benchmark-author')
+        course = Course.objects.create(
+            slug='benchmark-heartbeats', name='Heartbeat Benchmark', author=author,
+            launch_date=datetime.date.today(), duration=10, description='',
+        )
+        module = Module.objects.create(slug='benchmark-heartbeats-module', course=course, title='Videos')
+        videos = ModuleContent.objects.bulk_create([
+            ModuleContent(module=module, title=f'Video {i}', content_type='video', order=i, duration=10)
+            for i in range(options['videos'])
+        ])
+        students = User.objects.bulk_create([
+            User(username=f'benchmark-student-{i}') for i in range(options['students'])
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in students])
+        self.stdout.write(f"Seeded {len(students)} enrolled students and {len(videos)} videos")
+        return students, course, videos
+
+    def workload(self, options, students, course, videos):
+        """Players watching concurrently: each heartbeat moves one student's position in one video forward."""
+        rng = random.Random(42)
+        positions = {}
+        events = []
+        for _ in range(options['events']):
+            student, video = rng.choice(students), rng.choice(videos)
+            key = (student.pk, video.pk)
+            positions[key] = positions.get(key, 0) + 10
+            events.append({
+                'student': student.pk, 'content': video.pk, 'course': course.pk,
+                'position': float(positions[key]), 'duration': 600.0, 'completed': False,
+            })
+        return events
+
+    def run(self, options, students, course, videos):
+        events = self.workload(options, students, course, videos)
+        batch = options['batch']
+
+        sid = transaction.savepoint()
+        start = time.perf_counter()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            for event in events:
+                ContentProgress.objects.update_or_create(
+                    student_id=event['student'], content_id=event['content'],
+                    defaults={'course_id': event['course'], 'position_seconds': int(event['position']),
+                              'is_completed': event['position'] >= 540},
+                )
+        elapsed = time.perf_counter() - start
+        transaction.savepoint_rollback(sid)
+        self.stdout.write(
+            f"{'direct':>10}: events={len(events)} {len(events) / elapsed:,.0f} events/s "
+            f"total={elapsed * 1000:.0f}ms queries={queries.count}"
+        )
+
+        for label, journaled in (('memory', False), ('journaled', True)):
+            directory = tempfile.mkdtemp(prefix='heartbeats-') if journaled else None
+            buffer = HeartbeatBuffer(journal_dir=directory)
+            sid = transaction.savepoint()
+            try:
+                start = time.perf_counter()
+                for i in range(0, len(events), batch):
+                    buffer.record([dict(event) for event in events[i:i + batch]])
+                ingest = time.perf_counter() - start
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    start = time.perf_counter()
+                    rows = buffer.flush()
+                    flush = time.perf_counter() - start
+            finally:
+                transaction.savepoint_rollback(sid)
+                if journaled:
+                    buffer.journal.close()
+                    shutil.rmtree(directory)
+            self.stdout.write(
+                f"{label:>10}: events={len(events)} ingest {len(events) / ingest:,.0f} events/s "
+                f"flush={flush * 1000:.0f}ms rows={rows} queries={queries.count} "
+                f"end-to-end {len(events) / (ingest + flush):,.0f} events/s"
+            )
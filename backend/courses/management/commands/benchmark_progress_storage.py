@@ -0,0 +1,147 @@
+import datetime
+import random
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from courses.bitmaps import bitmap_completed_ids, bitmaps_from_rows, mark_completed_bits, rows_from_bitmaps
+from courses.models import ContentProgress, Course, Enrollment, Module, ModuleContent
+from courses.progress import complete_contents
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def table_size(table):
+    """Heap, TOAST and index bytes of a table."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        return cursor.fetchone()[0]
+
+
+def scalar(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0] or 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare storage size and read/write latency of ContentProgress rows with the per-enrollment '
+        'completion bitmaps. Runs on a synthetic course, rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--contents', type=int, default=500)
+        parser.add_argument('--completion', type=float, default=0.6, help='Share of contents each student completed')
+        parser.add_argument('--samples', type=int, default=300, help='Reads and writes timed per store')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(username='benchmark-author')
+        course = Course.objects.create(
+            slug='benchmark-progress', name='Progress Benchmark', author=author,
+            launch_date=datetime.date.today(), duration=10, description='',
+        )
+        module = Module.objects.create(slug='benchmark-progress-module', course=course, title='Contents')
+        contents = ModuleContent.objects.bulk_create([
+            ModuleContent(module=module, title=f'Item {i}', content_type='text', order=i, ordinal=i)
+            for i in range(options['contents'])
+        ])
+        Course.objects.filter(pk=course.pk).update(next_content_ordinal=len(contents))
+        students = User.objects.bulk_create([
+            User(username=f'benchmark-student-{i}') for i in range(options['students'])
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in students])
+        self.stdout.write(f'Seeded {len(students)} students enrolled in a course of {len(contents)} contents')
+        return course, students, contents
+
+    def timed(self, calls):
+        timings = []
+        for call in calls:
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return f'p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms'
+
+    def run(self, options):
+        course, students, contents = self.seed(options)
+        rng = random.Random(42)
+        done = max(1, int(len(contents) * options['completion']))
+
+        before = table_size(ContentProgress._meta.db_table)
+        start = time.perf_counter()
+        for student in students:
+            ContentProgress.objects.bulk_create([
+                ContentProgress(student=student, content=content, course=course, is_completed=True)
+                for content in rng.sample(contents, done)
+            ], batch_size=5000)
+        self.stdout.write(f'Inserted {len(students) * done} rows in {time.perf_counter() - start:.1f}s')
+        rows_size = table_size(ContentProgress._meta.db_table) - before
+        with connection.cursor() as cursor:
+            # Fresh planner statistics, as a table of this size would have outside the benchmark transaction
+            cursor.execute(f'ANALYZE {ContentProgress._meta.db_table}, {Enrollment._meta.db_table}')
+
+        start = time.perf_counter()
+        bitmaps_from_rows([course.pk])
+        to_bitmaps = time.perf_counter() - start
+        # Tuple data plus the 4-byte line pointer per row; table growth also counts the three indexes
+        # but includes free space left by earlier rolled-back runs
+        rows_data = scalar(
+            f'SELECT sum(pg_column_size(p.*) + 4) FROM {ContentProgress._meta.db_table} p WHERE course_id = %s', [course.pk],
+        )
+        bitmap_data = scalar(
+            f'SELECT sum(pg_column_size(completion_bitmap)) FROM {Enrollment._meta.db_table} WHERE course_id = %s', [course.pk],
+        )
+        self.stdout.write(
+            f'storage: rows={rows_data / 1024:,.0f}KiB of tuples ({rows_size / 1024:,.0f}KiB table growth with indexes) '
+            f'bitmaps={bitmap_data / 1024:,.0f}KiB ({rows_data / max(bitmap_data, 1):,.0f}x smaller)'
+        )
+
+        course = Course.objects.select_related('outline').get(pk=course.pk)
+        sample = [rng.choice(students) for _ in range(options['samples'])]
+        self.stdout.write('read completed set: rows ' + self.timed(
+            lambda student=student: set(ContentProgress.objects.filter(
+                student=student, course=course, is_completed=True,
+            ).values_list('content_id', flat=True))
+            for student in sample
+        ))
+        bitmap_completed_ids(sample[0], course)  # warm the ordinal map
+        self.stdout.write('read completed set: bitmap ' + self.timed(
+            lambda student=student: bitmap_completed_ids(student, course) for student in sample
+        ))
+
+        writes = [(rng.choice(students), rng.choice(contents).pk) for _ in range(options['samples'])]
+        sid = transaction.savepoint()
+        self.stdout.write('mark one completed: rows ' + self.timed(
+            lambda student=student, pk=pk: complete_contents(student, course, [pk]) for student, pk in writes
+        ))
+        transaction.savepoint_rollback(sid)
+        self.stdout.write('mark one completed: bitmap ' + self.timed(
+            lambda student=student, pk=pk: mark_completed_bits(student, course, [pk]) for student, pk in writes
+        ))
+
+        # Without the per-row delete signals, which would dominate the run
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {ContentProgress._meta.db_table} WHERE course_id = %s', [course.pk])
+        start = time.perf_counter()
+        written = rows_from_bitmaps([course.pk])
+        self.stdout.write(
+            f'conversion: rows->bitmaps {to_bitmaps * 1000:.0f}ms, bitmaps->rows {written} rows '
+            f'in {(time.perf_counter() - start) * 1000:.0f}ms'
+        )
@@ -0,0 +1,90 @@
+import random
+import time
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from courses.models import Course, Tag
+from courses.search import suggest_cache
+from courses.views import course_suggest
+
+WORDS = (
+    'python django react data science machine learning design marketing finance music '
+    'photography fitness cloud security devops testing algorithms databases writing business'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Replay a synthetic keystroke workload against the suggest endpoint and report latency percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', type=int, default=300, help='Search terms typed (one request per keystroke)')
+        parser.add_argument('--typo-rate', type=float, default=0.1, help='Share of terms typed with a swapped letter')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic courses first (rolled back afterwards)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        author, _ = get_user_model().objects.get_or_create(username='benchmark-author')
+        rng = random.Random(42)
+        today = datetime.date.today()
+        Tag.objects.bulk_create([Tag(name=word) for word in WORDS], ignore_conflicts=True)
+        Course.objects.bulk_create([
+            Course(slug=f'benchmark-{i}', name=' '.join(rng.sample(WORDS, 3)).title(), author=author,
+                   launch_date=today, duration=10, description='')
+            for i in range(count)
+        ], batch_size=1000)
+        self.stdout.write(f'Seeded {count} courses')
+
+    def keystrokes(self, options):
+        """Zipf-distributed terms (a few hot searches, a long tail) typed one character at a time."""
+        rng = random.Random(7)
+        vocabulary = list(Course.objects.values_list('name', flat=True)[:2000]) + list(Tag.objects.values_list('name', flat=True))
+        vocabulary = vocabulary or WORDS
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        for term in rng.choices(vocabulary, weights=weights, k=options['terms']):
+            term = term.lower()[:20]
+            if len(term) > 3 and rng.random() < options['typo_rate']:
+                i = rng.randrange(1, len(term) - 1)
+                term = term[:i] + term[i + 1] + term[i] + term[i + 2:]
+            for end in range(1, len(term) + 1):
+                yield term[:end]
+
+    def run(self, options):
+        factory = APIRequestFactory()
+        prefixes = list(self.keystrokes(options))
+        for label, cached in (('uncached', False), ('cached', True)):
+            suggest_cache.clear()
+            before = suggest_cache.stats()
+            timings = []
+            for prefix in prefixes:
+                if not cached:
+                    suggest_cache.clear()
+                request = factory.get('/api/courses/suggest/', {'q': prefix})
+                start = time.perf_counter()
+                course_suggest(request).render()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{label:>9}: requests={len(timings)} p50={percentile(timings, 50):.2f}ms '
+                f'p95={percentile(timings, 95):.2f}ms p99={percentile(timings, 99):.2f}ms'
+                + (f" cache_hits={suggest_cache.stats()['hits'] - before['hits']}" if cached else '')
+            )
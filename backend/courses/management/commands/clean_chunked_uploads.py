@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from courses.uploads import UPLOAD_EXPIRY, expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads (and their part files in CHUNKED_UPLOAD_DIR) that have not received a chunk in a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float, default=UPLOAD_EXPIRY.total_seconds() / 3600, help='Age of the last chunk, in hours',
+        )
+
+    def handle(self, *args, **options):
+        count = expire_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} expired upload(s).'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.bitmaps import bitmaps_from_rows, rows_from_bitmaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert completion progress between ContentProgress rows and the per-enrollment completion bitmaps '
+        '(see courses.bitmaps).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='Course slugs (default: every course)')
+        direction = parser.add_mutually_exclusive_group()
+        direction.add_argument('--to-bitmaps', action='store_true', help='Rewrite bitmaps from the rows (default)')
+        direction.add_argument('--to-rows', action='store_true', help='Create the completed rows the bitmaps record')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or None
+        with transaction.atomic():
+            if options['to_rows']:
+                count = rows_from_bitmaps(course_ids)
+                message = f'Wrote {count} ContentProgress row(s).'
+            else:
+                count = bitmaps_from_rows(course_ids)
+                message = f'Wrote {count} enrollment bitmap(s).'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from courses.heartbeats import HeartbeatBuffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay heartbeat journals left in HEARTBEAT_JOURNAL_DIR by workers that are no longer running '
+        'and write them to ContentProgress. Journals of running workers are left to them.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.HEARTBEAT_JOURNAL_DIR:
+            self.stdout.write('HEARTBEAT_JOURNAL_DIR is not set; heartbeats are buffered in memory only.')
+            return
+        buffer = HeartbeatBuffer(journal_dir=settings.HEARTBEAT_JOURNAL_DIR)
+        files = len(buffer.unflushed)
+        try:
+            count = buffer.flush()
+        finally:
+            buffer.journal.close()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {files} journal(s): wrote {count} progress row(s).'))
@@ -0,0 +1,59 @@
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from courses.certificate_jobs import claim_jobs, complete_jobs, fail_job, render_args, requeue_stale_jobs
+from courses.utils.certificate_renderer import render_certificate
+
+
+class Command(BaseCommand):
+    help = (
+        'Render queued certificate PDFs (see courses.certificate_jobs). Jobs are claimed with SKIP LOCKED, '
+        'so several workers can run at once; rendering happens in a process or thread pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Pool size')
+        parser.add_argument('--pool', choices=['process', 'thread'], default='process')
+        parser.add_argument('--batch', type=int, default=20, help='Jobs claimed per round')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        if options['pool'] == 'process':
+            # Forked pool processes must not share this process's database connections
+            connections.close_all()
+        executor_class = ProcessPoolExecutor if options['pool'] == 'process' else ThreadPoolExecutor
+        done = failed = 0
+        with executor_class(max_workers=options['workers']) as executor:
+            while True:
+                close_old_connections()
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s).'))
+                jobs = claim_jobs(worker, options['batch'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                # Only rendering runs in the pool; results are recorded from this process
+                futures = {executor.submit(render_certificate, *render_args(job)): job for job in jobs}
+                rendered = []
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        pdf_path = future.result()
+                    except Exception as error:
+                        fail_job(job, error)
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'Certificate {job.certificate_id}: attempt {job.attempts} failed: {error}'))
+                    else:
+                        rendered.append((job, pdf_path))
+                # One status update for the whole batch
+                complete_jobs(rendered)
+                done += len(rendered)
+        self.stdout.write(self.style.SUCCESS(f'Rendered {done} certificate(s), {failed} failed attempt(s).'))
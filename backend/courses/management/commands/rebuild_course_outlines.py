@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from courses.models import Course
+from courses.outline import rebuild_course_outline
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the stored CourseOutline documents (e.g. after a deploy that changes their shape).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='Course slugs (default: every course)')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or Course.objects.values_list('pk', flat=True)
+        count = sum(1 for course_id in course_ids if rebuild_course_outline(course_id))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt outlines for {count} course(s).'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from courses.stats import rebuild_course_stats, verify_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized CourseStats rows from enrollments, contents and feedback, or verify them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='Course slugs (default: every course)')
+        parser.add_argument('--verify', action='store_true', help='Only report drifted stats, do not write')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or None
+        if options['verify']:
+            drift = list(verify_course_stats(course_ids))
+            for course_id, field, stored, computed in drift:
+                self.stdout.write(f'{course_id}: {field} stored={stored} computed={computed}')
+            if drift:
+                self.stdout.write(self.style.WARNING(f'{len(drift)} drifted value(s). Run without --verify to fix.'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Course stats are consistent.'))
+            return
+        count = rebuild_course_stats(course_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} course(s).'))
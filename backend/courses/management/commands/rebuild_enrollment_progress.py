@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from courses.progress import rebuild_enrollment_progress, verify_enrollment_progress
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile the Enrollment.completed_count counters with ContentProgress, or verify them. '
+        'Content totals live in CourseStats (see rebuild_course_stats).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='Course slugs (default: every course)')
+        parser.add_argument('--verify', action='store_true', help='Only report drifted counters, do not write')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or None
+        if options['verify']:
+            drift = list(verify_enrollment_progress(course_ids))
+            for student_id, course_id, stored, computed in drift:
+                self.stdout.write(f'{course_id} / student {student_id}: stored={stored} computed={computed}')
+            if drift:
+                self.stdout.write(self.style.WARNING(f'{len(drift)} drifted counter(s). Run without --verify to fix.'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Enrollment progress counters are consistent.'))
+            return
+        count = rebuild_enrollment_progress(course_ids)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {count} enrollment(s).'))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-17 19:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_search_vectors(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Tag = apps.get_model('courses', 'Tag')
+    Category = apps.get_model('courses', 'Category')
+    SubCategory = apps.get_model('courses', 'SubCategory')
+    tag_names = (
+        Tag.objects.filter(course=OuterRef('pk')).order_by().values('course')
+        .annotate(names=StringAgg('name', delimiter=' ')).values('names')
+    )
+    category_name = Category.objects.filter(slug=OuterRef('category_id')).values('name')
+    subcategory_name = SubCategory.objects.filter(slug=OuterRef('subcategory_id')).values('name')
+    Course.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='english')
+        + SearchVector(
+            Coalesce(Subquery(tag_names), Value(''), output_field=TextField()),
+            Coalesce(Subquery(category_name), Value(''), output_field=TextField()),
+            Coalesce(Subquery(subcategory_name), Value(''), output_field=TextField()),
+            weight='B', config='english',
+        )
+        + SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_course_catalog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='course_search_vector_gin'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
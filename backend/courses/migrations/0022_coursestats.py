@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    ModuleContent = apps.get_model('courses', 'ModuleContent')
+    CourseFeedback = apps.get_model('courses', 'CourseFeedback')
+
+    enrollments = dict(Enrollment.objects.values_list('course').annotate(n=Count('pk')).order_by())
+    contents = {
+        row['module__course']: row
+        for row in ModuleContent.objects.values('module__course').annotate(n=Count('pk'), minutes=Sum('duration')).order_by()
+    }
+    feedbacks = {
+        row['course']: row
+        for row in CourseFeedback.objects.values('course').annotate(n=Count('pk'), total=Sum('rating')).order_by()
+    }
+    rows = []
+    for course_id in Course.objects.values_list('pk', flat=True):
+        content = contents.get(course_id, {})
+        feedback = feedbacks.get(course_id, {})
+        count, total = feedback.get('n', 0), feedback.get('total') or 0
+        rows.append(CourseStats(
+            course_id=course_id,
+            enrollment_count=enrollments.get(course_id, 0),
+            content_count=content.get('n', 0),
+            total_content_duration=content.get('minutes') or 0,
+            feedback_count=count,
+            rating_total=total,
+            average_rating=(Decimal(total) / count).quantize(Decimal('0.01')) if count else Decimal('0'),
+        ))
+    CourseStats.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('content_count', models.PositiveIntegerField(default=0)),
+                ('total_content_duration', models.PositiveIntegerField(default=0, help_text='Total content duration in minutes')),
+                ('feedback_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['enrollment_count', 'course'], name='coursestats_enrollments_idx'), models.Index(fields=['average_rating', 'course'], name='coursestats_rating_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 20:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_completed_counts(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    ContentProgress = apps.get_model('courses', 'ContentProgress')
+    completed = ContentProgress.objects.filter(
+        student=OuterRef('student'), course=OuterRef('course'), is_completed=True,
+    ).order_by().values('student').annotate(n=Count('pk')).values('n')
+    Enrollment.objects.update(completed_count=Coalesce(Subquery(completed, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0024_courseoutline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_completed_counts, migrations.RunPython.noop),
+    ]
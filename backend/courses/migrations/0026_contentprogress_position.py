@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0025_enrollment_completed_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentprogress',
+            name='position_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Resume position of a video, in seconds'),
+        ),
+        migrations.AddField(
+            model_name='contentprogress',
+            name='last_heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
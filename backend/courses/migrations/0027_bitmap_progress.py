@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+def assign_content_ordinals(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    ModuleContent = apps.get_model('courses', 'ModuleContent')
+    for course_id in Course.objects.values_list('pk', flat=True).iterator():
+        contents = list(
+            ModuleContent.objects.filter(module__course_id=course_id).order_by('module__order', 'order', 'pk').only('pk')
+        )
+        for ordinal, content in enumerate(contents):
+            content.ordinal = ordinal
+        ModuleContent.objects.bulk_update(contents, ['ordinal'], batch_size=1000)
+        Course.objects.filter(pk=course_id).update(next_content_ordinal=len(contents))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0026_contentprogress_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='next_content_ordinal',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completion_bitmap',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='modulecontent',
+            name='ordinal',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(assign_content_ordinals, migrations.RunPython.noop),
+    ]
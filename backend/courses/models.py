@@ -1,9 +1,13 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 # --- Category Model ---
@@ -16,6 +20,9 @@ class Category(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='category_name_trgm')]
+
     def __str__(self):
         return self.name
 
@@ -30,6 +37,9 @@ class SubCategory(models.Model):
             self.slug = slugify(f"{self.category.name}-{self.name}")
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='subcategory_name_trgm')]
+
     def __str__(self):
         return f"{self.category.name} - {self.name}"
 
@@ -57,20 +67,62 @@ class Course(models.Model):
     students_enrolled = models.ManyToManyField(User, through='Enrollment', related_name='courses_enrolled', blank=True)
     auto_certificate = models.BooleanField(default=True)
     is_visible = models.BooleanField(default=True)
-    
+    # Full-text search document, maintained by courses.signals (see courses.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Next ModuleContent.ordinal to hand out; ordinals are never reused (see courses.bitmaps)
+    next_content_ordinal = models.PositiveIntegerField(default=0, editable=False)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
             self.slug = f"{base_slug}-{uuid.uuid4().hex[:6]}"
         super().save(*args, **kwargs)
 
+    class Meta:
+        # Keyset pagination sort keys for the catalog (see courses.pagination)
+        indexes = [
+            models.Index(fields=['created_at', 'slug'], name='course_created_slug_idx'),
+            models.Index(fields=['price', 'slug'], name='course_price_slug_idx'),
+            models.Index(fields=['rating', 'slug'], name='course_rating_slug_idx'),
+            GinIndex(fields=['search_vector'], name='course_search_vector_gin'),
+            # Prefix and typo-tolerant matching for the suggest endpoint
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='course_name_trgm'),
+        ]
+
     def __str__(self):
         return self.name
 
+# --- Course Statistics ---
+class CourseStats(models.Model):
+    """
+    Denormalized per-course aggregates, kept up to date incrementally by courses.signals
+    (see courses.stats) and rebuilt with `manage.py rebuild_course_stats`.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    enrollment_count = models.PositiveIntegerField(default=0)
+    content_count = models.PositiveIntegerField(default=0)
+    total_content_duration = models.PositiveIntegerField(default=0, help_text="Total content duration in minutes")
+    feedback_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['enrollment_count', 'course'], name='coursestats_enrollments_idx'),
+            models.Index(fields=['average_rating', 'course'], name='coursestats_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.course_id}"
+
 # --- Tag Model ---
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
+    class Meta:
+        indexes = [GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='tag_name_trgm')]
+
     def __str__(self):
         return self.name
 
@@ -113,6 +165,8 @@ class ModuleContent(models.Model):
     file = models.FileField(upload_to='module_files/', blank=True, null=True)
     is_required = models.BooleanField(default=False)
     duration = models.PositiveIntegerField(default=0, help_text="Duration in minutes (optional)")
+    # Position of the content's bit in Enrollment.completion_bitmap, assigned by courses.signals
+    ordinal = models.PositiveIntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)    
 
     class Meta:
@@ -134,6 +188,11 @@ class Enrollment(models.Model):
     ], default='pending')
     payment_timestamp = models.DateTimeField(blank=True, null=True)
     access_granted = models.BooleanField(default=False)
+    # Completed ContentProgress rows of the student in this course, maintained by courses.signals;
+    # the course's content total is CourseStats.content_count (see courses.progress)
+    completed_count = models.PositiveIntegerField(default=0)
+    # Bit n is set when the content with ordinal n is completed (see courses.bitmaps)
+    completion_bitmap = models.BinaryField(default=b'', blank=True)
 
     class Meta:
         unique_together = ('user', 'course')
@@ -155,6 +214,9 @@ class ContentProgress(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress')
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Written by the heartbeat flush (courses.heartbeats), not on every player event
+    position_seconds = models.PositiveIntegerField(default=0, help_text="Resume position of a video, in seconds")
+    last_heartbeat_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('student', 'content')
@@ -163,8 +225,8 @@ class ContentProgress(models.Model):
         return f"{self.student.username} - {'Completed' if self.is_completed else 'Not Completed'} {self.content} in {self.course.name}"
     
     def get_course_progress_percent(user, course):
-        total = ModuleContent.objects.filter(module__course=course).count()
-        completed = ContentProgress.objects.filter(student=user, content__module__course=course, is_completed=True).count()
+        from .progress import progress_counts
+        completed, total = progress_counts(user, course)
         return int((completed / total) * 100) if total else 0
 
 
@@ -173,16 +235,49 @@ class Certificate(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     # is_approved = models.BooleanField(default=False)
     pdf_file = models.FileField(upload_to='certificates/', null=True, blank=True)
+    # 'generating' while a CertificateJob renders the PDF, 'failed' once its retries are used up
     status = models.CharField(max_length=10, choices=[
         ('pending', 'Pending'),
+        ('generating', 'Generating'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
+        ('failed', 'Failed'),
     ], default='pending')
     applied_at = models.DateTimeField(auto_now_add=True)
     issued_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('student', 'course')
+        # The instructor queue: a course's certificates of one status, oldest application first
+        indexes = [models.Index(fields=['course', 'status', 'applied_at'], name='certificate_queue_idx')]
+
+
+class CertificateJob(models.Model):
+    """
+    A queued certificate PDF render, claimed and run by `manage.py process_certificate_jobs`
+    (see courses.certificate_jobs). Failed attempts are retried with backoff up to `max_attempts`.
+    """
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'], name='certjob_status_run_after_idx')]
+
+    def __str__(self):
+        return f"Certificate {self.certificate_id} job ({self.status})"
 
 class Assignment(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='assignments')
@@ -205,6 +300,34 @@ class AssignmentSubmission(models.Model):
 
     class Meta:
         unique_together = ('assignment', 'student')
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload in progress (see courses.uploads): chunks are appended to a temporary file until
+    `offset` reaches `size`, then the file is attached to a new submission of `assignment` or to the
+    `file` of `content`, and the upload is deleted.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, null=True, blank=True, related_name='chunked_uploads')
+    content = models.ForeignKey(ModuleContent, on_delete=models.CASCADE, null=True, blank=True, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(assignment__isnull=False, content__isnull=True) | models.Q(assignment__isnull=True, content__isnull=False),
+                name='chunked_upload_one_target',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
     
 class CourseFeedback(models.Model):
     RATING_CHOICES = [(i, i) for i in range(1, 6)]
@@ -220,4 +343,29 @@ class CourseFeedback(models.Model):
         ordering = ['-submitted_at']
 
     def __str__(self):
-        return f"{self.user.username} rated {self.course.name}: {self.rating}/5"
\ No newline at end of file
+        return f"{self.user.username} rated {self.course.name}: {self.rating}/5"
+
+class ResourceVersion(models.Model):
+    """
+    Change counters for groups of rows (e.g. 'catalog', 'tags', 'course:<slug>'), bumped by courses.signals.
+    Used to build ETag / Last-Modified validators without touching the underlying tables (see courses.caching).
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class CourseOutline(models.Model):
+    """
+    Precomputed module -> content/assignment tree of a course, rebuilt by courses.signals whenever a module,
+    content or assignment changes (see courses.outline). Per-user state is overlaid when it is served.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='outline')
+    document = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Outline of {self.course_id}"
@@ -0,0 +1,202 @@
+import threading
+import weakref
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Prefetch
+from rest_framework import serializers
+from .caching import bump_versions, course_version_key
+from .models import Assignment, Course, CourseOutline, Module, ModuleContent
+from .serializers import AssignmentSerializer, ModuleContentSerializer, ModuleSerializer, is_selected
+
+# Content keys kept in the outline; the bodies are loaded per request, for the contents being served
+CONTENT_BODY_FIELDS = ('text', 'video_url', 'file')
+CONTENT_OUTLINE_FIELDS = [name for name in ModuleContentSerializer.Meta.fields if name not in CONTENT_BODY_FIELDS + ('is_completed',)]
+# Assignment keys shown in the course outline; the module page loads the whole records of its module
+ASSIGNMENT_STUB_FIELDS = ['id', 'type', 'title', 'deadline']
+# Nested lists of a module in the outline, rendered only when expanded (see serializers.is_selected)
+MODULE_EXPANDABLE_FIELDS = ('contents', 'assignments')
+# Documents are stored as jsonb, which does not keep key order; responses use the serializers' order
+FIELD_ORDER = {
+    'modules': ModuleSerializer.Meta.fields + ['assignments'],
+    'contents': ModuleContentSerializer.Meta.fields,
+    'assignments': AssignmentSerializer.Meta.fields,
+}
+
+
+_datetime = serializers.DateTimeField()
+
+
+def build_outline_document(course_id):
+    """
+    The course's modules as ModuleSerializer renders them, with content stubs (titles, types, durations,
+    no bodies) and assignment stubs. Costs four queries, and the document stays small however long the
+    course's texts are.
+    """
+    contents = ModuleContent.objects.only(*(name for name in CONTENT_OUTLINE_FIELDS if name != 'course_id'))
+    modules = Module.objects.filter(course_id=course_id).prefetch_related(
+        'prerequisites',
+        Prefetch('contents', queryset=contents),
+        Prefetch('assignments', queryset=Assignment.objects.order_by('created_at').only('id', 'module_id', 'title', 'deadline')),
+    )
+    document = []
+    for module in modules:
+        data = dict(ModuleSerializer(module, context={'fields': {
+            *(name for name in ModuleSerializer.Meta.fields if name != 'contents'),
+            *(f'contents.{name}' for name in CONTENT_OUTLINE_FIELDS),
+        }, 'expand': {'contents'}}).data)
+        data['assignments'] = [
+            {
+                'id': assignment.pk, 'type': 'assignment', 'title': assignment.title,
+                'deadline': _datetime.to_representation(assignment.deadline) if assignment.deadline else None,
+            }
+            for assignment in module.assignments.all()
+        ]
+        document.append(data)
+    return {'modules': document}
+
+
+def rebuild_course_outline(course_id):
+    """Regenerate and store the outline of a course; returns it, or None if the course no longer exists."""
+    if not Course.objects.filter(pk=course_id).exists():
+        return None
+    outline, _ = CourseOutline.objects.update_or_create(
+        course_id=course_id, defaults={'document': build_outline_document(course_id)},
+    )
+    # Readers may have validated against the version bumped by the edit before this rebuild committed
+    bump_versions(course_version_key(course_id))
+    return outline
+
+
+class _PendingRebuilds(threading.local):
+    def __init__(self):
+        # Connection alias -> weak reference to the _OutlineRebuild queued on its current transaction.
+        # A rollback discards the callback, so the reference dies with it and the next edit queues a new one
+        self.by_alias = {}
+
+
+_pending_rebuilds = _PendingRebuilds()
+
+
+class _OutlineRebuild:
+    """on_commit callback rebuilding the outlines of the courses a transaction touched."""
+
+    def __init__(self, using):
+        self.using = using
+        self.course_ids = set()
+
+    def __call__(self):
+        if self.using in _pending_rebuilds.by_alias and _pending_rebuilds.by_alias[self.using]() is self:
+            del _pending_rebuilds.by_alias[self.using]
+        for course_id in self.course_ids:
+            rebuild_course_outline(course_id)
+
+
+def schedule_outline_rebuild(course_id, using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild the course's outline once the current transaction commits, at most once per course
+    however many modules, contents or assignments the transaction touched.
+    """
+    if course_id is None:
+        return
+    ref = _pending_rebuilds.by_alias.get(using)
+    rebuild = ref() if ref is not None else None
+    if rebuild is not None:
+        rebuild.course_ids.add(course_id)
+        return
+    rebuild = _OutlineRebuild(using)
+    rebuild.course_ids.add(course_id)
+    _pending_rebuilds.by_alias[using] = weakref.ref(rebuild)
+    # Outside a transaction this runs the rebuild right away
+    transaction.on_commit(rebuild, using=using)
+
+
+def course_outline(course):
+    """The stored CourseOutline of `course` (select_related('outline') to avoid a query), built on first use."""
+    try:
+        return course.outline
+    except CourseOutline.DoesNotExist:
+        course.outline = rebuild_course_outline(course.pk)
+        return course.outline
+
+
+def course_outline_document(course):
+    return course_outline(course).document
+
+
+def _absolute(request, url):
+    return request.build_absolute_uri(url) if url else url
+
+
+def _ordered(item, kind):
+    return {name: item[name] for name in FIELD_ORDER[kind] if name in item}
+
+
+def content_bodies(contents, fields):
+    """{content id: {field: value}} of the body `fields` (CONTENT_BODY_FIELDS) of `contents`, in one query."""
+    if not fields:
+        return {}
+    storage = ModuleContent._meta.get_field('file').storage
+    bodies = {}
+    for row in contents.values('id', *fields):
+        if 'file' in row:
+            row['file'] = storage.url(row['file']) if row['file'] else None
+        bodies[row.pop('id')] = row
+    return bodies
+
+
+def selected_body_fields(selection, path):
+    """The CONTENT_BODY_FIELDS a field_selection() renders for the contents at `path`."""
+    return [name for name in CONTENT_BODY_FIELDS if is_selected(selection, f'{path}.{name}')]
+
+
+def _content(request, content, completed_ids, bodies):
+    content = {**content, **bodies.get(content['id'], {}), 'is_completed': content['id'] in completed_ids}
+    if 'file' in content:
+        content['file'] = _absolute(request, content['file'])
+    return content
+
+
+def outline_modules(document, request, completed_ids, selection=None, bodies=None):
+    """
+    The outline's modules as served on the course page: content `bodies` (see content_bodies) merged in,
+    completion overlaid from `completed_ids`, assignments reduced to stubs and every level pruned to the
+    field_selection().
+    """
+    selection = selection or {}
+    bodies = bodies or {}
+    modules = []
+    for module in document['modules']:
+        module = {
+            **module,
+            'contents': [_content(request, content, completed_ids, bodies) for content in module['contents']],
+            'assignments': [{key: assignment[key] for key in ASSIGNMENT_STUB_FIELDS} for assignment in module['assignments']],
+        }
+        pruned = {}
+        for key in FIELD_ORDER['modules']:
+            if not is_selected(selection, f'modules.{key}', expandable=key in MODULE_EXPANDABLE_FIELDS):
+                continue
+            value = module[key]
+            if key in MODULE_EXPANDABLE_FIELDS:
+                value = [
+                    {name: item[name] for name in FIELD_ORDER[key] if name in item and is_selected(selection, f'modules.{key}.{name}')}
+                    for item in value
+                ]
+            pruned[key] = value
+        modules.append(pruned)
+    return modules
+
+
+def outline_module_items(document, module, request, completed_ids, is_author):
+    """
+    A module's contents and full assignments ordered by creation, as the module page lists them: the
+    order and stubs come from the outline, content bodies and assignments from two queries on this module.
+    """
+    outline_module = next((item for item in document['modules'] if item['slug'] == module.slug), None)
+    if outline_module is None:
+        return []
+    bodies = content_bodies(ModuleContent.objects.filter(module=module), CONTENT_BODY_FIELDS)
+    contents = [_ordered(_content(request, content, completed_ids, bodies), 'contents') for content in outline_module['contents']]
+    assignments = [
+        _ordered({**assignment, 'attachment': _absolute(request, assignment['attachment']), 'is_author': is_author}, 'assignments')
+        for assignment in AssignmentSerializer(module.assignments.order_by('created_at'), many=True).data
+    ]
+    return sorted(contents + assignments, key=lambda item: item.get('created_at', ''))
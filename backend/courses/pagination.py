@@ -0,0 +1,155 @@
+import base64
+import functools
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Orderings accepted by the catalog, mapped to the sort field. Each sort field is paired with the primary
+# key of its table so the sort key is unique: (field, slug) pairs are backed by indexes on Course, and
+# `popularity` and `average_rating` sort on the CourseStats columns paired with `stats__course`, backed by
+# the CourseStats indexes. `relevance` sorts by the `rank` annotation of a full-text search (see courses.search).
+CATALOG_ORDERINGS = {
+    'created_at': 'created_at',
+    '-created_at': '-created_at',
+    'price': 'price',
+    '-price': '-price',
+    'rating': 'rating',
+    '-rating': '-rating',
+    'popularity': 'stats__enrollment_count',
+    '-popularity': '-stats__enrollment_count',
+    'average_rating': 'stats__average_rating',
+    '-average_rating': '-stats__average_rating',
+    'relevance': '-rank',
+}
+
+
+class CourseCursorPagination(BasePagination):
+    """
+    Keyset pagination for the course catalog.
+    The cursor holds the (sort field, slug) of the last row on the page, and the next page
+    is fetched with `WHERE (field, slug) > (value, slug)` so deep pages cost the same as page one.
+    Query params: ?ordering=-price&page_size=20&cursor=<opaque>
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    default_ordering = '-created_at'
+    orderings = CATALOG_ORDERINGS
+
+    def get_ordering(self, request, queryset):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        field = self.orderings.get(ordering, '').lstrip('-')
+        if not field or not (field in queryset.query.annotations or self.model_field(queryset.model, field)):
+            raise ValidationError({self.ordering_query_param: [f"Invalid ordering. Choose one of: {', '.join(self.orderings)}."]})
+        return self.orderings[ordering]
+
+    def model_field(self, model, name):
+        """The concrete field `name` of `model`, following `relation__field` lookups, or None."""
+        relation, _, name = name.rpartition('__')
+        try:
+            for part in filter(None, relation.split('__')):
+                model = model._meta.get_field(part).related_model
+            field = model._meta.get_field(name)
+        except (AttributeError, FieldDoesNotExist):
+            return None
+        return field if field.concrete else None
+
+    def get_sort_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return self.model_field(queryset.model, name)
+
+    def get_tiebreak(self, name):
+        """The primary key paired with the sort field: `slug`, or the key of the related table it lives on."""
+        relation = name.rpartition('__')[0]
+        return f'{relation}__pk' if relation else 'slug'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, slug = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return self.queryset_field.to_python(value), slug
+        except (ValueError, TypeError, DjangoValidationError):
+            raise NotFound('Invalid cursor.')
+
+    def encode_cursor(self, instance):
+        value = functools.reduce(getattr, self.field_name.split('__'), instance)
+        payload = json.dumps([value, instance.slug], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request, queryset)
+        descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        self.queryset_field = self.get_sort_field(queryset, self.field_name)
+
+        tiebreak = self.get_tiebreak(self.field_name)
+        relation = self.field_name.rpartition('__')[0]
+        if relation:
+            # An inner join lets the related table's (field, pk) index drive the scan; the row is also
+            # what the cursor is read from. Courses without that row are not listed in this ordering.
+            queryset = queryset.filter(**{f'{relation}__isnull': False}).select_related(relation)
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field_name}', f'{prefix}{tiebreak}')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, slug = cursor
+            op = 'lt' if descending else 'gt'
+            # The inclusive range on `field` lets the (field, pk) index bound the scan.
+            queryset = queryset.filter(
+                Q(**{f'{self.field_name}__{op}e': value}),
+                Q(**{f'{self.field_name}__{op}': value}) | Q(**{f'{tiebreak}__{op}': slug}),
+            )
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CertificateQueuePagination(PageNumberPagination):
+    """Pages of an instructor's certificate queue: ?page=2&page_size=50."""
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
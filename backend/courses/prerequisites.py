@@ -0,0 +1,102 @@
+import heapq
+from collections import defaultdict
+from django.core.exceptions import ValidationError
+from .caching import LRUCache
+from .models import Module
+from .outline import course_outline
+
+# Keyed by (course id, outline built_at): every module/prerequisite/content write rebuilds the outline,
+# so a stale graph is never looked up again and simply ages out
+prerequisite_graphs = LRUCache(maxsize=512, ttl=60 * 60)
+
+
+def topological_order(slugs, prerequisites):
+    """
+    Kahn's algorithm over {slug: prerequisite slugs}; ties keep the order of `slugs` and prerequisites
+    outside `slugs` are ignored. Returns (ordered slugs, slugs on or behind a cycle).
+    """
+    position = {slug: index for index, slug in enumerate(slugs)}
+    waiting = {slug: {p for p in prerequisites.get(slug, ()) if p in position} for slug in slugs}
+    dependents = defaultdict(list)
+    for slug, needs in waiting.items():
+        for prerequisite in needs:
+            dependents[prerequisite].append(slug)
+
+    ready = [position[slug] for slug, needs in waiting.items() if not needs]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        slug = slugs[heapq.heappop(ready)]
+        order.append(slug)
+        for dependent in dependents[slug]:
+            waiting[dependent].discard(slug)
+            if not waiting[dependent]:
+                heapq.heappush(ready, position[dependent])
+    ordered = set(order)
+    return order, [slug for slug in slugs if slug not in ordered]
+
+
+def check_prerequisite_edges(added):
+    """
+    Raise ValidationError if adding the (module, prerequisite) pairs in `added` would close a cycle.
+    Loads the prerequisite links of the courses involved in one query.
+    """
+    involved = {slug for edge in added for slug in edge}
+    rows = Module.objects.filter(course__modules__slug__in=involved).distinct().values_list('slug', 'prerequisites')
+    prerequisites = {}
+    for slug, prerequisite in rows:
+        needs = prerequisites.setdefault(slug, set())
+        if prerequisite:
+            needs.add(prerequisite)
+    for slug, prerequisite in added:
+        prerequisites.setdefault(slug, set()).add(prerequisite)
+    _, cyclic = topological_order(list(prerequisites), prerequisites)
+    if cyclic:
+        raise ValidationError(f"Prerequisites would form a cycle through: {', '.join(sorted(cyclic))}")
+
+
+class PrerequisiteGraph:
+    """A course's modules in prerequisite order, with the content ids that complete each one."""
+
+    def __init__(self, document):
+        modules = document['modules']
+        slugs = [module['slug'] for module in modules]
+        known = set(slugs)
+        self.titles = {module['slug']: module['title'] for module in modules}
+        self.prerequisites = {
+            module['slug']: [slug for slug in module['prerequisites'] if slug in known] for module in modules
+        }
+        self.contents = {module['slug']: frozenset(content['id'] for content in module['contents']) for module in modules}
+        self.order, self.cyclic = topological_order(slugs, self.prerequisites)
+
+    def unlocks(self, completed_ids):
+        """
+        One pass in prerequisite order: a module is unlocked when all its prerequisites are completed, and
+        completed when all its contents are (a module without contents once it is unlocked).
+        Modules on a cycle stay locked.
+        """
+        cyclic = set(self.cyclic)
+        completed = set()
+        modules = []
+        for slug in self.order + self.cyclic:
+            missing = [prerequisite for prerequisite in self.prerequisites[slug] if prerequisite not in completed]
+            unlocked = not missing and slug not in cyclic
+            contents = self.contents[slug]
+            if (contents <= completed_ids) if contents else unlocked:
+                completed.add(slug)
+            modules.append({
+                'slug': slug,
+                'title': self.titles[slug],
+                'is_completed': slug in completed,
+                'is_unlocked': unlocked,
+                'missing_prerequisites': missing,
+            })
+        return modules
+
+
+def course_prerequisite_graph(course):
+    """The cached graph of `course` (select_related('outline') to avoid a query), built from its outline."""
+    outline = course_outline(course)
+    return prerequisite_graphs.get_or_set(
+        (course.pk, outline.built_at), lambda: PrerequisiteGraph(outline.document),
+    )
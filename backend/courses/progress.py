@@ -0,0 +1,185 @@
+import threading
+import weakref
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .caching import bump_versions, user_course_version_key
+from .models import Certificate, ContentProgress, Course, Enrollment, ModuleContent
+
+# Largest number of content ids accepted by one batch completion request
+MAX_BATCH_COMPLETIONS = 500
+
+
+def parse_content_id(value):
+    """
+    A content id from a request body: an integer or a numeric string. Raises ValueError for anything
+    else, including floats and booleans that int() would quietly turn into an id.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{value!r} is not an integer')
+    return int(value)
+
+
+def complete_contents(student, course, content_ids):
+    """
+    Mark contents of `course` completed for `student`: one query validates the ids and finds the ones
+    already completed, one INSERT ... ON CONFLICT writes the rest with `completed_at`.
+    Returns (completed ids, ignored ids); ids that are not contents of the course are ignored and
+    contents completed earlier keep their original `completed_at`.
+    bulk_create skips the model signals, so the enrollment counter and per-user version are updated here.
+    """
+    found = dict(
+        ModuleContent.objects.filter(pk__in=content_ids, module__course=course).annotate(
+            done=Exists(ContentProgress.objects.filter(student=student, content=OuterRef('pk'), is_completed=True)),
+        ).values_list('pk', 'done')
+    )
+    newly_completed = sorted(pk for pk, done in found.items() if not done)
+    if newly_completed:
+        now = timezone.now()
+        ContentProgress.objects.bulk_create(
+            [
+                ContentProgress(student=student, course=course, content_id=pk, is_completed=True, completed_at=now)
+                for pk in newly_completed
+            ],
+            update_conflicts=True,
+            unique_fields=['student', 'content'],
+            update_fields=['course', 'is_completed', 'completed_at'],
+        )
+        # Recount instead of adding len(newly_completed): concurrent batches may overlap
+        Enrollment.objects.filter(student=student, course=course).update(completed_count=completed_count_subquery())
+        bump_versions(user_course_version_key(student.pk, course.pk))
+    return newly_completed, sorted(set(content_ids) - set(found))
+
+
+def completed_count_subquery():
+    """Completed ContentProgress rows of the enrollment in the outer query."""
+    completed = ContentProgress.objects.filter(
+        student=OuterRef('student'), course=OuterRef('course'), is_completed=True,
+    ).order_by().values('student').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(completed, output_field=IntegerField()), 0)
+
+
+def adjust_completed_count(student_id, course_id, delta):
+    """Apply a delta to an enrollment's completed counter; a student without an enrollment is left alone."""
+    if delta:
+        Enrollment.objects.filter(student_id=student_id, course_id=course_id).update(
+            completed_count=Greatest(F('completed_count') + delta, 0),
+        )
+
+
+class _PendingRefreshes(threading.local):
+    def __init__(self):
+        # Connection alias -> weak reference to the _ProgressRefresh queued on its current transaction;
+        # it dies with the callback when a rollback discards it
+        self.by_alias = {}
+
+
+_pending_refreshes = _PendingRefreshes()
+
+
+class _ProgressRefresh:
+    """on_commit callback refreshing the (student, course) pairs whose progress a transaction changed."""
+
+    def __init__(self, using):
+        self.using = using
+        self.progress_pairs = set()
+        self.recount_pairs = set()
+
+    def __call__(self):
+        if self.using in _pending_refreshes.by_alias and _pending_refreshes.by_alias[self.using]() is self:
+            del _pending_refreshes.by_alias[self.using]
+        students_by_course = {}
+        for student, course in self.recount_pairs:
+            students_by_course.setdefault(course, set()).add(student)
+        for course, students in students_by_course.items():
+            Enrollment.objects.filter(course_id=course, student_id__in=students).update(
+                completed_count=completed_count_subquery(),
+            )
+        bump_versions(*(user_course_version_key(student, course) for student, course in self.progress_pairs))
+
+
+def schedule_progress_refresh(student_id, course_id, recount=True, using=DEFAULT_DB_ALIAS):
+    """
+    Once the current transaction commits, bump the per-user version of (student, course) and, with
+    `recount`, recompute its enrollment counter. Cascades and queryset deletes call this for every deleted
+    row; the pairs are gathered so the refresh is one grouped UPDATE per course and one version bump.
+    """
+    ref = _pending_refreshes.by_alias.get(using)
+    refresh = ref() if ref is not None else None
+    queue = refresh is None
+    if queue:
+        refresh = _ProgressRefresh(using)
+    refresh.progress_pairs.add((student_id, course_id))
+    if recount:
+        refresh.recount_pairs.add((student_id, course_id))
+    if queue:
+        _pending_refreshes.by_alias[using] = weakref.ref(refresh)
+        # Outside a transaction this refreshes right away
+        transaction.on_commit(refresh, using=using)
+
+
+def progress_counts(student, course):
+    """
+    (completed, total) for a student in a course: one single-row query over the enrollment counter and
+    CourseStats.content_count. Students who are not enrolled are counted from the source tables.
+    """
+    row = Enrollment.objects.filter(student=student, course=course).values_list(
+        'completed_count', 'course__stats__content_count',
+    ).first()
+    if row is None:
+        completed = ContentProgress.objects.filter(student=student, course=course, is_completed=True).count()
+    else:
+        completed = row[0]
+    if row is None or row[1] is None:
+        return completed, ModuleContent.objects.filter(module__course=course).count()
+    return row
+
+
+def dashboard_courses(student):
+    """
+    The student's enrolled courses annotated with `completed_count` and `total_count` in one query:
+    the enrollment counters joined to CourseStats, ordered by enrollment date.
+    """
+    return Course.objects.filter(enrollments__student=student).annotate(
+        completed_count=F('enrollments__completed_count'),
+        total_count=Coalesce('stats__content_count', 0),
+    ).order_by('enrollments__enrolled_at')
+
+
+def certificate_queue(author, statuses):
+    """
+    Certificates of the author's courses with one of `statuses`, oldest application first, annotated with
+    the student's `completed_count` (a ContentProgress count grouped by student and course, so students
+    who left the course still show their progress) and the course's `total_count`. A page of it is one query.
+    """
+    content_count = ModuleContent.objects.filter(module__course=OuterRef('course')).order_by().values(
+        'module__course',
+    ).annotate(n=Count('pk')).values('n')
+    return Certificate.objects.filter(course__author=author, status__in=statuses).select_related('student', 'course').annotate(
+        completed_count=completed_count_subquery(),
+        total_count=Coalesce('course__stats__content_count', Subquery(content_count, output_field=IntegerField()), 0),
+    ).order_by('applied_at', 'pk')
+
+
+def course_progress_summary(student, course):
+    """{'completed', 'total', 'progress'} for a student in a course."""
+    completed, total = progress_counts(student, course)
+    return {
+        'completed': completed,
+        'total': total,
+        'progress': int((completed / total) * 100) if total > 0 else 0,
+    }
+
+
+def rebuild_enrollment_progress(course_ids=None):
+    """Recompute every enrollment's completed counter from ContentProgress in one UPDATE; returns the row count."""
+    enrollments = Enrollment.objects.all() if course_ids is None else Enrollment.objects.filter(course_id__in=course_ids)
+    return enrollments.update(completed_count=completed_count_subquery())
+
+
+def verify_enrollment_progress(course_ids=None):
+    """Yield (student_id, course_id, stored, computed) for every enrollment whose counter has drifted."""
+    enrollments = Enrollment.objects.all() if course_ids is None else Enrollment.objects.filter(course_id__in=course_ids)
+    rows = enrollments.annotate(computed=completed_count_subquery()).exclude(completed_count=F('computed'))
+    yield from rows.values_list('student_id', 'course_id', 'completed_count', 'computed')
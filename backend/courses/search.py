@@ -0,0 +1,113 @@
+import re
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Length
+from .caching import LRUCache
+from .models import Course, Category, SubCategory, Tag
+
+SEARCH_CONFIG = 'english'
+
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_PREFIX = 100
+# Shorter prefixes produce too few trigrams for similarity matching to be meaningful
+TYPO_MIN_LENGTH = 3
+
+# Hot prefixes per worker; cleared by courses.signals whenever a course or taxonomy row changes
+suggest_cache = LRUCache(maxsize=4096, ttl=300)
+
+
+def course_search_vector():
+    """
+    Expression for `Course.search_vector`.
+    Weights: name (A) > tag, category and subcategory names (B) > description (C).
+    Related names are pulled in with correlated subqueries so the expression can be used in `.update()`.
+    """
+    tag_names = (
+        Tag.objects.filter(course=OuterRef('pk'))
+        .order_by()
+        .values('course')
+        .annotate(names=StringAgg('name', delimiter=' '))
+        .values('names')
+    )
+    category_name = Category.objects.filter(slug=OuterRef('category_id')).values('name')
+    subcategory_name = SubCategory.objects.filter(slug=OuterRef('subcategory_id')).values('name')
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(tag_names), Value(''), output_field=TextField()),
+            Coalesce(Subquery(category_name), Value(''), output_field=TextField()),
+            Coalesce(Subquery(subcategory_name), Value(''), output_field=TextField()),
+            weight='B', config=SEARCH_CONFIG,
+        )
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(course_ids=None):
+    """Recompute the search vector in a single UPDATE, for the given courses or for every course."""
+    courses = Course.objects.all() if course_ids is None else Course.objects.filter(pk__in=course_ids)
+    return courses.update(search_vector=course_search_vector())
+
+
+def fulltext_search(queryset, text):
+    """Filter courses through the GIN-indexed search vector and annotate a `rank` for ordering by relevance."""
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    # Cast to double precision so the rank round-trips exactly through the pagination cursor
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+
+
+def icontains_search(queryset, text):
+    """The original substring search; kept as the default mode and as the benchmark baseline."""
+    return queryset.filter(
+        Q(name__icontains=text) |
+        Q(description__icontains=text) |
+        Q(author__username__icontains=text)
+    )
+
+
+def normalize_prefix(text):
+    return ' '.join(text.split()).lower()[:SUGGEST_MAX_PREFIX]
+
+
+def name_suggestions(queryset, prefix, limit, fields):
+    """
+    Prefix matches first (shortest names first), then typo-tolerant trigram matches to fill the remaining slots.
+    Both branches are served by the gin_trgm_ops index on `name`.
+    """
+    matches = list(
+        queryset.filter(name__iregex='^' + re.escape(prefix))
+        .order_by(Length('name'), 'name')
+        .values(*fields)[:limit]
+    )
+    if len(matches) < limit and len(prefix) >= TYPO_MIN_LENGTH:
+        key = fields[0]
+        fuzzy = (
+            queryset.filter(name__trigram_word_similar=prefix)
+            .exclude(**{f'{key}__in': [m[key] for m in matches]})
+            .annotate(similarity=TrigramWordSimilarity(prefix, 'name'))
+            .order_by('-similarity', 'name')
+            .values(*fields)[:limit - len(matches)]
+        )
+        matches += list(fuzzy)
+    return matches
+
+
+def suggest(prefix, limit=SUGGEST_LIMIT):
+    """Top course, tag, category and subcategory names for a search-box prefix, cached per (prefix, limit)."""
+    prefix = normalize_prefix(prefix)
+    if not prefix:
+        return {'courses': [], 'tags': [], 'categories': [], 'subcategories': []}
+
+    def compute():
+        return {
+            'courses': name_suggestions(Course.objects.filter(is_visible=True), prefix, limit, ['slug', 'name']),
+            'tags': name_suggestions(Tag.objects.all(), prefix, limit, ['id', 'name']),
+            'categories': name_suggestions(Category.objects.all(), prefix, limit, ['slug', 'name']),
+            'subcategories': name_suggestions(SubCategory.objects.all(), prefix, limit, ['slug', 'name', 'category']),
+        }
+
+    return suggest_cache.get_or_set((prefix, limit), compute)
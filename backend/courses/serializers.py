@@ -1,6 +1,77 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Course, Module, CourseFeedback, ModuleContent, Enrollment, ContentProgress, Certificate, Assignment, AssignmentSubmission, Category, SubCategory, Tag 
 from accounts.serializers import AuthorSerializer
+from .progress import dashboard_courses, progress_counts
+
+
+# --- Sparse fieldsets and nested expansion ---
+def field_selection(request):
+    """
+    Parses ?fields=slug,name,modules.title and ?expand=modules,modules.contents into serializer context
+    for ExpandableFieldsMixin. A parameter that is not in the query string is None.
+    """
+    def parse(param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+    return {'fields': parse('fields'), 'expand': parse('expand')}
+
+
+def _is_expanded(expand, path):
+    # Expanding `modules.contents` implies expanding `modules`
+    return any(name == path or name.startswith(f'{path}.') for name in expand)
+
+
+def is_selected(selection, path, expandable=False):
+    """
+    Whether the field at dotted `path` (e.g. 'modules.contents.text') is rendered for a field_selection().
+    Without ?fields and ?expand everything is rendered, as before. Otherwise nested serializers are
+    rendered only when expanded, and a level listed in ?fields keeps just the listed names.
+    """
+    fields, expand = selection.get('fields'), selection.get('expand')
+    if fields is None and expand is None:
+        return True
+    expand = expand or set()
+    parent, _, name = path.rpartition('.')
+    if parent and not _is_expanded(expand, parent):
+        return False
+    if expandable:
+        return _is_expanded(expand, path)
+    prefix = f'{parent}.' if parent else ''
+    level = {field[len(prefix):].split('.')[0] for field in fields or () if field.startswith(prefix)}
+    return not level or name in level
+
+
+class ExpandableFieldsMixin:
+    """
+    Drops fields not selected by the `fields` / `expand` context keys (see field_selection).
+    `expandable_fields` names the nested serializers that are only rendered when expanded.
+    """
+    expandable_fields = ()
+
+    def field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = {'fields': self.context.get('fields'), 'expand': self.context.get('expand')}
+        if selection['fields'] is None and selection['expand'] is None:
+            return fields
+        path = self.field_path()
+        prefix = f'{path}.' if path else ''
+        return {
+            name: field for name, field in fields.items()
+            if is_selected(selection, prefix + name, expandable=name in self.expandable_fields)
+        }
 
 
 # --- Tag Serializer ---
@@ -25,7 +96,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['slug', 'name'] # slug is primary key for frontend value
         read_only_fields = ['slug'] # slug is auto-generated
 
-class ModuleContentSerializer(serializers.ModelSerializer):
+class ModuleContentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     is_completed = serializers.SerializerMethodField()
     course_id = serializers.SerializerMethodField()
 
@@ -37,6 +108,10 @@ class ModuleContentSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_completed(self, obj):
+        # Views serializing many contents pass the user's completed ids to avoid a query per item
+        completed_ids = self.context.get('completed_content_ids')
+        if completed_ids is not None:
+            return obj.pk in completed_ids
         request = self.context.get('request')
         user = request.user if request and hasattr(request, 'user') else None
         if not user or user.is_anonymous:
@@ -44,10 +119,12 @@ class ModuleContentSerializer(serializers.ModelSerializer):
         return obj.progresses.filter(student=user, is_completed=True).exists()
     
     def get_course_id(self, obj):
-        return obj.module.course.slug if obj.module else None
+        # The course slug is its primary key, so no course lookup is needed
+        return obj.module.course_id if obj.module else None
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     contents = ModuleContentSerializer(many=True, read_only=True)
+    expandable_fields = ('contents',)
 
     class Meta:
         model = Module
@@ -56,9 +133,26 @@ class ModuleSerializer(serializers.ModelSerializer):
             'prerequisites', 'contents', 'created_at', 'last_updated'
         ]
 
-class CourseSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        from .prerequisites import check_prerequisite_edges
+        prerequisites = attrs.get('prerequisites')
+        if not prerequisites:
+            return attrs
+        course = attrs.get('course') or (self.instance and self.instance.course)
+        if course and any(module.course_id != course.pk for module in prerequisites):
+            raise serializers.ValidationError({'prerequisites': 'Prerequisites must be modules of the same course.'})
+        if self.instance:
+            # A new module has no dependents yet, so only an update can close a cycle
+            try:
+                check_prerequisite_edges([(self.instance.pk, module.pk) for module in prerequisites])
+            except DjangoValidationError as error:
+                raise serializers.ValidationError({'prerequisites': error.messages})
+        return attrs
+
+class CourseSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)  # replace default ID with nested details
     modules = ModuleSerializer(many=True, read_only=True)
+    expandable_fields = ('modules',)
     is_enrolled = serializers.SerializerMethodField()
     is_author = serializers.SerializerMethodField()
     category = serializers.SlugRelatedField(
@@ -110,6 +204,37 @@ class CourseSerializer(serializers.ModelSerializer):
         # Let DRF handle the update logic
         return super().update(instance, validated_data)
 
+class CourseListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """
+    Summary representation used by the course catalog.
+    Expects a queryset from `catalog_queryset` so author/category/subcategory are joined,
+    tags are prefetched and `is_enrolled` / `is_author` come from annotations.
+    """
+    author = AuthorSerializer(read_only=True)
+    category = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    subcategory = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    subcategory_name = serializers.CharField(source='subcategory.name', read_only=True, default=None)
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    is_enrolled = serializers.BooleanField(read_only=True)
+    is_author = serializers.BooleanField(read_only=True)
+    enrollment_count = serializers.IntegerField(read_only=True)
+    content_count = serializers.IntegerField(read_only=True)
+    total_content_duration = serializers.IntegerField(read_only=True)
+    feedback_count = serializers.IntegerField(read_only=True)
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'slug', 'name', 'description', 'created_at', 'rating',
+            'launch_date', 'is_published', 'is_visible', 'thumbnail', 'level', 'duration',
+            'author', 'category', 'category_name', 'subcategory', 'subcategory_name', 'tags',
+            'is_enrolled', 'is_author', 'auto_certificate', 'price',
+            'enrollment_count', 'content_count', 'total_content_duration', 'feedback_count', 'average_rating'
+        ]
+        read_only_fields = fields
+
 class EnrollmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enrollment
@@ -131,38 +256,63 @@ class CourseProgressSerializer(serializers.ModelSerializer):
         fields = ['slug', 'name', 'thumbnail', 'progress']
 
     def get_progress(self, obj):
-        user = self.context['request'].user
-        completed = ContentProgress.objects.filter(course=obj, student=user, is_completed=True).count()
-        total = ModuleContent.objects.filter(module__course=obj).count()
+        if hasattr(obj, 'completed_count') and hasattr(obj, 'total_count'):
+            # Annotated by progress.dashboard_courses
+            completed, total = obj.completed_count, obj.total_count
+        else:
+            completed, total = progress_counts(self.context['request'].user, obj)
         return round((completed / total) * 100) if total else 0
 
 class CertificateSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Certificate
         fields = '__all__'
         read_only_fields = ['student', 'issued_at', 'pdf_file']
 
+    def get_download_url(self, obj):
+        if obj.status != 'approved':
+            return None
+        url = reverse('download-certificate', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
 
 class DashboardSerializer(serializers.Serializer):
+    """
+    Reads the enrolled courses from context['courses'] (annotated by progress.dashboard_courses) and the
+    certificates from context['certificates'], so the whole dashboard is two queries; both are loaded
+    here when not given.
+    """
     full_name = serializers.CharField(source='get_full_name')
     username = serializers.CharField()
     email = serializers.EmailField()
     bio = serializers.CharField(source='profile.bio', default='')
-    enrolled_courses = CourseProgressSerializer(source='courses_enrolled', many=True)
+    enrolled_courses = serializers.SerializerMethodField()
     completed_courses = serializers.SerializerMethodField()
-    certificates = CertificateSerializer(source='certificate_set', many=True)
-    
+    certificates = serializers.SerializerMethodField()
+
+    def courses_for(self, obj):
+        if 'courses' not in self.context:
+            self.context['courses'] = list(dashboard_courses(obj))
+        return self.context['courses']
+
+    def get_enrolled_courses(self, obj):
+        return CourseProgressSerializer(self.courses_for(obj), many=True, context=self.context).data
+
     def get_completed_courses(self, obj):
-        completed = []
-        for course in obj.courses_enrolled.all():
-            total = ModuleContent.objects.filter(module__course=course).count()
-            completed_count = ContentProgress.objects.filter(course=course, student=obj, is_completed=True).count()
-            if total > 0 and total == completed_count:
-                completed.append({
-                    'name': course.name,
-                    'slug': course.slug,
-                })
-        return completed
+        return [
+            {'name': course.name, 'slug': course.slug}
+            for course in self.courses_for(obj)
+            if course.total_count > 0 and course.total_count == course.completed_count
+        ]
+
+    def get_certificates(self, obj):
+        certificates = self.context.get('certificates')
+        if certificates is None:
+            certificates = Certificate.objects.filter(student=obj)
+        return CertificateSerializer(certificates, many=True, context=self.context).data
 
 class PendingCertificateSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.get_full_name')
@@ -175,6 +325,10 @@ class PendingCertificateSerializer(serializers.ModelSerializer):
         fields = ['id', 'student_name', 'student_email', 'course_title', 'status', 'applied_at', 'progress']
 
     def get_progress(self, obj):
+        if hasattr(obj, 'completed_count') and hasattr(obj, 'total_count'):
+            # Annotated by progress.certificate_queue
+            completed, total = obj.completed_count, obj.total_count
+            return int((completed / total) * 100) if total else 0
         return ContentProgress.get_course_progress_percent(obj.student, obj.course)
 
 
@@ -0,0 +1,345 @@
+import os
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Assignment, ChunkedUpload, Course, CourseStats, CourseFeedback, Category, Certificate, ContentProgress, Enrollment, Module, ModuleContent, SubCategory, Tag
+from .caching import (
+    bump_versions, course_version_key, user_course_version_key,
+    CATALOG_VERSION_KEY, TAGS_VERSION_KEY, CATEGORIES_VERSION_KEY, SUBCATEGORIES_VERSION_KEY,
+)
+from .search import suggest_cache, update_search_vectors
+from .taxonomy import taxonomy_cache
+from .outline import schedule_outline_rebuild
+from .prerequisites import check_prerequisite_edges
+from .bitmaps import next_content_ordinal
+from .stats import adjust_course_stats
+from .progress import adjust_completed_count, completed_count_subquery, schedule_progress_refresh
+from .uploads import part_path
+
+# Fields of Course that feed its search vector
+SEARCH_FIELDS = {'name', 'description', 'category', 'subcategory'}
+
+
+# --- Search vector maintenance ---
+@receiver(post_save, sender=Course)
+def refresh_course_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def refresh_search_vector_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        update_search_vectors([instance.pk])
+    elif pk_set:
+        update_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def refresh_search_vector_on_tag_rename(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(instance.course_set.values('pk'))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+def refresh_search_vector_on_taxonomy_rename(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(instance.courses.values('pk'))
+
+
+# Deleting a tag or category unlinks courses without per-row signals, so remember them first
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_courses(sender, instance, **kwargs):
+    instance._search_course_ids = list(instance.course_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=SubCategory)
+def remember_categorised_courses(sender, instance, **kwargs):
+    instance._search_course_ids = list(instance.courses.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=SubCategory)
+def refresh_search_vector_on_taxonomy_delete(sender, instance, **kwargs):
+    course_ids = getattr(instance, '_search_course_ids', None)
+    if course_ids:
+        update_search_vectors(course_ids)
+
+
+# --- Suggest cache invalidation ---
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+def clear_suggest_cache(sender, **kwargs):
+    suggest_cache.clear()
+
+
+# --- Taxonomy cache invalidation (see courses.taxonomy) ---
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+def clear_taxonomy_cache(sender, **kwargs):
+    taxonomy_cache.clear()
+
+
+# --- Course statistics (see courses.stats) ---
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CourseStats.objects.get_or_create(course=instance)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment(sender, instance, created, **kwargs):
+    if created:
+        adjust_course_stats(instance.course_id, enrollment_count=1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def uncount_enrollment(sender, instance, **kwargs):
+    adjust_course_stats(instance.course_id, enrollment_count=-1)
+
+
+# --- Enrollment progress counters (see courses.progress) ---
+@receiver(post_save, sender=Enrollment)
+def initialize_completed_count(sender, instance, created, raw=False, **kwargs):
+    # Progress recorded before (re-)enrolling counts from the start
+    if created and not raw:
+        Enrollment.objects.filter(pk=instance.pk).update(completed_count=completed_count_subquery())
+
+
+@receiver(pre_save, sender=ContentProgress)
+def remember_progress_state(sender, instance, **kwargs):
+    instance._progress_previous = None
+    if instance.pk:
+        instance._progress_previous = ContentProgress.objects.filter(pk=instance.pk).values('course', 'is_completed').first()
+
+
+@receiver(post_save, sender=ContentProgress)
+def count_progress(sender, instance, **kwargs):
+    previous = getattr(instance, '_progress_previous', None)
+    before = (previous['course'], previous['is_completed']) if previous else None
+    if before == (instance.course_id, instance.is_completed):
+        return
+    if before and before[1]:
+        adjust_completed_count(instance.student_id, before[0], -1)
+    if instance.is_completed:
+        adjust_completed_count(instance.student_id, instance.course_id, 1)
+
+
+@receiver(post_delete, sender=ContentProgress)
+def uncount_progress(sender, instance, origin=None, **kwargs):
+    if not instance.is_completed:
+        return
+    if origin is instance:
+        adjust_completed_count(instance.student_id, instance.course_id, -1)
+    else:
+        # Deleted with its content, course or a queryset: recounted per course once the delete commits
+        schedule_progress_refresh(instance.student_id, instance.course_id)
+
+
+def content_course_id(module_id):
+    return Module.objects.filter(pk=module_id).values_list('course_id', flat=True).first()
+
+
+@receiver(pre_save, sender=ModuleContent)
+def remember_content_stats(sender, instance, **kwargs):
+    instance._stats_previous = None
+    if instance.pk:
+        instance._stats_previous = (
+            ModuleContent.objects.filter(pk=instance.pk).values('module__course', 'duration').first()
+        )
+
+
+@receiver(pre_save, sender=ModuleContent)
+def assign_content_ordinal(sender, instance, **kwargs):
+    # Runs after remember_content_stats; a content moved to another course gets an ordinal there
+    previous = instance._stats_previous
+    course_id = content_course_id(instance.module_id)
+    if instance.ordinal is None or (previous and previous['module__course'] != course_id):
+        instance.ordinal = next_content_ordinal(course_id)
+
+
+@receiver(post_save, sender=ModuleContent)
+def count_content(sender, instance, created, **kwargs):
+    course_id = content_course_id(instance.module_id)
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        adjust_course_stats(course_id, content_count=1, total_content_duration=instance.duration)
+    elif previous['module__course'] == course_id:
+        adjust_course_stats(course_id, total_content_duration=instance.duration - previous['duration'])
+    else:
+        # Content moved to a module of another course
+        adjust_course_stats(previous['module__course'], content_count=-1, total_content_duration=-previous['duration'])
+        adjust_course_stats(course_id, content_count=1, total_content_duration=instance.duration)
+
+
+@receiver(post_delete, sender=ModuleContent)
+def uncount_content(sender, instance, **kwargs):
+    adjust_course_stats(content_course_id(instance.module_id), content_count=-1, total_content_duration=-instance.duration)
+
+
+@receiver(pre_save, sender=CourseFeedback)
+def remember_feedback_rating(sender, instance, **kwargs):
+    instance._stats_previous_rating = None
+    if instance.pk:
+        instance._stats_previous_rating = (
+            CourseFeedback.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=CourseFeedback)
+def count_feedback(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous_rating', None)
+    if created or previous is None:
+        adjust_course_stats(instance.course_id, feedback_count=1, rating_total=instance.rating)
+    else:
+        adjust_course_stats(instance.course_id, rating_total=instance.rating - previous)
+
+
+@receiver(post_delete, sender=CourseFeedback)
+def uncount_feedback(sender, instance, **kwargs):
+    adjust_course_stats(instance.course_id, feedback_count=-1, rating_total=-instance.rating)
+
+
+# --- Version counters for conditional GETs and cached catalog data (see courses.caching) ---
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_versions(sender, instance, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, course_version_key(instance.pk))
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def bump_versions_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    course_ids = (pk_set or []) if reverse else [instance.pk]
+    bump_versions(CATALOG_VERSION_KEY, *[course_version_key(course_id) for course_id in course_ids])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_versions(sender, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, TAGS_VERSION_KEY)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_versions(sender, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, CATEGORIES_VERSION_KEY)
+
+
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+def bump_subcategory_versions(sender, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, SUBCATEGORIES_VERSION_KEY)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def bump_versions_on_module(sender, instance, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, course_version_key(instance.course_id))
+
+
+@receiver(post_save, sender=ModuleContent)
+@receiver(post_delete, sender=ModuleContent)
+def bump_versions_on_content(sender, instance, **kwargs):
+    # The catalog shows content counts from CourseStats
+    bump_versions(CATALOG_VERSION_KEY, course_version_key(content_course_id(instance.module_id)))
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def bump_versions_on_assignment(sender, instance, **kwargs):
+    # Assignment stubs are part of the course page
+    bump_versions(course_version_key(content_course_id(instance.module_id)))
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def bump_versions_on_enrollment(sender, instance, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY, course_version_key(instance.course_id))
+
+
+@receiver(post_save, sender=CourseFeedback)
+@receiver(post_delete, sender=CourseFeedback)
+def bump_versions_on_feedback(sender, instance, **kwargs):
+    bump_versions(CATALOG_VERSION_KEY)
+
+
+@receiver(post_save, sender=ContentProgress)
+@receiver(post_save, sender=Certificate)
+def bump_user_course_version(sender, instance, **kwargs):
+    bump_versions(user_course_version_key(instance.student_id, instance.course_id))
+
+
+@receiver(post_delete, sender=ContentProgress)
+@receiver(post_delete, sender=Certificate)
+def bump_user_course_version_on_delete(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        bump_versions(user_course_version_key(instance.student_id, instance.course_id))
+    else:
+        # Bulk and cascade deletes bump once per (student, course) when they commit
+        schedule_progress_refresh(instance.student_id, instance.course_id, recount=False)
+
+
+# --- Course outline snapshots (see courses.outline) ---
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def rebuild_outline_on_module(sender, instance, **kwargs):
+    schedule_outline_rebuild(instance.course_id)
+
+
+@receiver(m2m_changed, sender=Module.prerequisites.through)
+def reject_prerequisite_cycles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'pre_add' or not pk_set:
+        return
+    if reverse:
+        check_prerequisite_edges([(slug, instance.pk) for slug in pk_set])
+    else:
+        check_prerequisite_edges([(instance.pk, slug) for slug in pk_set])
+
+
+@receiver(m2m_changed, sender=Module.prerequisites.through)
+def rebuild_outline_on_prerequisites(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    schedule_outline_rebuild(instance.course_id)
+    if reverse and pk_set:
+        for course_id in set(Module.objects.filter(pk__in=pk_set).values_list('course_id', flat=True)):
+            schedule_outline_rebuild(course_id)
+
+
+@receiver(post_save, sender=ModuleContent)
+@receiver(post_delete, sender=ModuleContent)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def rebuild_outline_on_module_item(sender, instance, **kwargs):
+    schedule_outline_rebuild(content_course_id(instance.module_id))
+    previous = getattr(instance, '_stats_previous', None)
+    if previous:
+        # Content moved from a module of another course
+        schedule_outline_rebuild(previous['module__course'])
+
+
+# --- Chunked uploads (see courses.uploads) ---
+@receiver(post_delete, sender=ChunkedUpload)
+def remove_upload_part(sender, instance, **kwargs):
+    # Finalized uploads had their part file moved into storage already
+    try:
+        os.remove(part_path(instance.pk))
+    except FileNotFoundError:
+        pass
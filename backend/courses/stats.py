@@ -0,0 +1,90 @@
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from .models import Course, CourseStats, CourseFeedback, Enrollment, ModuleContent
+
+STAT_FIELDS = ['enrollment_count', 'content_count', 'total_content_duration', 'feedback_count', 'rating_total', 'average_rating']
+
+
+def average_rating_expression(rating_total, feedback_count):
+    average = Cast(rating_total, DecimalField(max_digits=12, decimal_places=2)) / NullIf(feedback_count, Value(0))
+    return Cast(Coalesce(average, Value(0)), DecimalField(max_digits=3, decimal_places=2))
+
+
+def adjust_course_stats(course_id, **deltas):
+    """
+    Apply counter deltas to a course's stats row with a single atomic UPDATE.
+    e.g. adjust_course_stats(course.pk, enrollment_count=1)
+    Courses without a stats row (e.g. bulk-created) are left alone until `rebuild_course_stats` runs.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if 'rating_total' in deltas or 'feedback_count' in deltas:
+        # Column references in an UPDATE see the old values, so apply the deltas here too
+        updates['average_rating'] = average_rating_expression(
+            F('rating_total') + deltas.get('rating_total', 0),
+            F('feedback_count') + deltas.get('feedback_count', 0),
+        )
+    CourseStats.objects.filter(course_id=course_id).update(**updates)
+
+
+def _count(queryset, field='pk'):
+    return Subquery(
+        queryset.order_by().values('course_ref').annotate(total=Count(field)).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def _sum(queryset, field):
+    return Subquery(
+        queryset.order_by().values('course_ref').annotate(total=Sum(field)).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def computed_course_stats(course_ids=None):
+    """Courses annotated with their stats computed from the source tables (one query)."""
+    courses = Course.objects.all() if course_ids is None else Course.objects.filter(pk__in=course_ids)
+    enrollments = Enrollment.objects.filter(course=OuterRef('pk')).annotate(course_ref=F('course'))
+    contents = ModuleContent.objects.filter(module__course=OuterRef('pk')).annotate(course_ref=F('module__course'))
+    feedbacks = CourseFeedback.objects.filter(course=OuterRef('pk')).annotate(course_ref=F('course'))
+    courses = courses.annotate(
+        computed_enrollment_count=Coalesce(_count(enrollments), 0),
+        computed_content_count=Coalesce(_count(contents), 0),
+        computed_total_content_duration=Coalesce(_sum(contents, 'duration'), 0),
+        computed_feedback_count=Coalesce(_count(feedbacks), 0),
+        computed_rating_total=Coalesce(_sum(feedbacks, 'rating'), 0),
+    )
+    return courses.annotate(
+        computed_average_rating=average_rating_expression(F('computed_rating_total'), F('computed_feedback_count')),
+    ).values('pk', *[f'computed_{field}' for field in STAT_FIELDS])
+
+
+def rebuild_course_stats(course_ids=None, batch_size=1000):
+    """Recompute stats rows from the source tables and upsert them; returns the number of rows written."""
+    rows = [
+        CourseStats(course_id=row['pk'], **{field: row[f'computed_{field}'] for field in STAT_FIELDS})
+        for row in computed_course_stats(course_ids)
+    ]
+    CourseStats.objects.bulk_create(
+        rows, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['course'], update_fields=STAT_FIELDS + ['updated_at'],
+    )
+    return len(rows)
+
+
+def verify_course_stats(course_ids=None):
+    """Yield (course_id, field, stored, computed) for every stat that has drifted from the source tables."""
+    stored = {
+        row['course_id']: row
+        for row in CourseStats.objects.filter(
+            **({} if course_ids is None else {'course_id__in': course_ids})
+        ).values('course_id', *STAT_FIELDS)
+    }
+    for row in computed_course_stats(course_ids):
+        current = stored.get(row['pk'])
+        for field in STAT_FIELDS:
+            value = current[field] if current else None
+            if value != row[f'computed_{field}']:
+                yield row['pk'], field, value, row[f'computed_{field}']
@@ -0,0 +1,33 @@
+from .caching import LRUCache, TAGS_VERSION_KEY, CATEGORIES_VERSION_KEY, SUBCATEGORIES_VERSION_KEY
+from .models import Category, SubCategory, Tag
+from .serializers import CategorySerializer, SubCategorySerializer, TagSerializer
+
+# Every taxonomy response is validated against all three versions, so a cached entry is never served
+# after a write in another worker: the bump changes the ETag, which is the cache key.
+TAXONOMY_VERSION_KEYS = (TAGS_VERSION_KEY, CATEGORIES_VERSION_KEY, SUBCATEGORIES_VERSION_KEY)
+
+# Cleared from courses.signals on Category/SubCategory/Tag writes; entries for old versions also age out
+taxonomy_cache = LRUCache(maxsize=4, ttl=60 * 60)
+
+
+def build_taxonomy():
+    """Serialized tags, categories and subcategories (three queries), plus the category -> subcategory tree."""
+    tags = TagSerializer(Tag.objects.order_by('name'), many=True).data
+    categories = CategorySerializer(Category.objects.order_by('name'), many=True).data
+    subcategories = SubCategorySerializer(SubCategory.objects.order_by('name'), many=True).data
+
+    by_category = {category['slug']: [] for category in categories}
+    for subcategory in subcategories:
+        by_category[subcategory['category']].append(subcategory)
+    return {
+        'tags': tags,
+        'categories': categories,
+        'subcategories': subcategories,
+        'by_category': by_category,
+        'tree': [{**category, 'subcategories': by_category[category['slug']]} for category in categories],
+    }
+
+
+def cached_taxonomy(etag):
+    """The taxonomy for the versions behind `etag` (from conditional_get on TAXONOMY_VERSION_KEYS)."""
+    return taxonomy_cache.get_or_set(etag, build_taxonomy)
@@ -1,3 +1,1233 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from . import heartbeats
+from .bitmaps import bitmap_completed_ids, bitmaps_from_rows, decode_ordinals, encode_ordinals, mark_completed_bits, rows_from_bitmaps
+from .caching import catalog_page_cache_key, catalog_page_cache_stats, catalog_version, user_course_version_key
+from .certificate_jobs import claim_jobs, complete_jobs, render_args, run_job
+from .models import Assignment, AssignmentSubmission, Category, Certificate, CertificateJob, ChunkedUpload, ContentProgress, Course, CourseFeedback, CourseStats, Enrollment, Module, ModuleContent, SubCategory, Tag
+from .outline import build_outline_document
+from .progress import MAX_BATCH_COMPLETIONS
+from .search import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, suggest_cache
+from .stats import STAT_FIELDS, verify_course_stats
+from .taxonomy import taxonomy_cache
+from .uploads import OffsetMismatch, append_chunk, start_upload
+from .utils.certificate_renderer import CertificateTemplate, overlay_fields, render_certificate, render_certificate_pdf
 
-# Create your tests here.
+User = get_user_model()
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def create_course(self, index, contents=2):
+        course = Course.objects.create(
+            name=f'Course {index}', description='', author=self.author,
+            launch_date=datetime.date.today(), duration=1,
+        )
+        module = Module.objects.create(course=course, title='Module')
+        for order in range(contents):
+            ModuleContent.objects.create(module=module, title=f'Content {order}', content_type='text', order=order)
+        Enrollment.objects.create(student=self.student, course=course)
+        return course
+
+    def complete(self, course, count):
+        for content in ModuleContent.objects.filter(module__course=course)[:count]:
+            ContentProgress.objects.create(student=self.student, content=content, course=course, is_completed=True)
+
+    def test_progress_and_completed_courses(self):
+        finished, halfway = self.create_course(1), self.create_course(2)
+        self.complete(finished, 2)
+        self.complete(halfway, 1)
+        Certificate.objects.create(student=self.student, course=finished)
+
+        data = self.client.get('/api/courses/dashboard/').json()
+
+        progress = {course['slug']: course['progress'] for course in data['enrolled_courses']}
+        self.assertEqual(progress, {finished.slug: 100, halfway.slug: 50})
+        self.assertEqual(data['completed_courses'], [{'name': finished.name, 'slug': finished.slug}])
+        self.assertEqual([certificate['course'] for certificate in data['certificates']], [finished.slug])
+
+    def test_certificate_links_are_absolute(self):
+        certificate = Certificate.objects.create(student=self.student, course=self.create_course(1), status='approved')
+
+        data = self.client.get('/api/courses/dashboard/').json()
+
+        self.assertEqual(
+            data['certificates'][0]['download_url'],
+            f'http://testserver/api/courses/certificates/{certificate.pk}/download/',
+        )
+
+    def test_query_count_does_not_grow_with_enrollments(self):
+        for enrollments in (1, 30):
+            with self.subTest(enrollments=enrollments):
+                Enrollment.objects.filter(student=self.student).delete()
+                courses = [self.create_course(index) for index in range(enrollments)]
+                self.complete(courses[0], 1)
+                Certificate.objects.create(student=self.student, course=courses[-1])
+                # enrolled courses with their counters, certificates
+                with self.assertNumQueries(2):
+                    response = self.client.get('/api/courses/dashboard/')
+                self.assertEqual(len(response.json()['enrolled_courses']), enrollments)
+
+
+class ProgressCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course, self.other = (
+            Course.objects.create(name=name, description='', author=self.author, launch_date=datetime.date.today(), duration=1)
+            for name in ('Counted', 'Other')
+        )
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.contents = [
+            ModuleContent.objects.create(module=self.module, title=f'Content {order}', content_type='text', duration=10)
+            for order in range(3)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def completed_count(self):
+        self.enrollment.refresh_from_db()
+        return self.enrollment.completed_count
+
+    def complete_all(self):
+        for content in self.contents:
+            ContentProgress.objects.create(student=self.student, content=content, course=self.course, is_completed=True)
+
+    def test_marking_and_unmarking(self):
+        self.client.post('/api/courses/content-progress/complete/', {'content_id': self.contents[0].pk, 'course_id': self.course.pk})
+        self.assertEqual(self.completed_count(), 1)
+        progress = ContentProgress.objects.get()
+        progress.is_completed = False
+        progress.save()
+        self.assertEqual(self.completed_count(), 0)
+        progress.is_completed = True
+        progress.save()
+        progress.delete()
+        self.assertEqual(self.completed_count(), 0)
+
+    def test_content_added_and_removed(self):
+        self.course.stats.refresh_from_db()
+        self.assertEqual((self.course.stats.content_count, self.course.stats.total_content_duration), (3, 30))
+        self.complete_all()
+        self.assertEqual(self.completed_count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contents[0].delete()
+        self.assertEqual(self.completed_count(), 2)
+        self.course.stats.refresh_from_db()
+        self.assertEqual((self.course.stats.content_count, self.course.stats.total_content_duration), (2, 20))
+
+    def test_cascades_recount_once_per_course(self):
+        self.complete_all()
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.module.delete()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "courses_enrollment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.completed_count(), 0)
+
+    def test_rolled_back_delete_does_not_swallow_the_next_refresh(self):
+        self.complete_all()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.module.delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            ContentProgress.objects.filter(content=self.contents[0]).delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.completed_count(), 2)
+
+    def test_content_moved_to_another_course(self):
+        content = self.contents[0]
+        content.module = Module.objects.create(course=self.other, title='Elsewhere')
+        content.save()
+        self.course.stats.refresh_from_db()
+        self.other.stats.refresh_from_db()
+        self.assertEqual((self.course.stats.content_count, self.course.stats.total_content_duration), (2, 20))
+        self.assertEqual((self.other.stats.content_count, self.other.stats.total_content_duration), (1, 10))
+
+    def test_reconcile_command(self):
+        self.complete_all()
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_count=7)
+        out = io.StringIO()
+        call_command('rebuild_enrollment_progress', '--verify', stdout=out)
+        self.assertIn('stored=7 computed=3', out.getvalue())
+        self.assertEqual(self.completed_count(), 7)
+
+        call_command('rebuild_enrollment_progress', self.course.pk, stdout=io.StringIO())
+        self.assertEqual(self.completed_count(), 3)
+        out = io.StringIO()
+        call_command('rebuild_enrollment_progress', '--verify', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+
+class BatchCompletionTests(TestCase):
+    url = '/api/courses/content-progress/complete/batch/'
+
+    def setUp(self):
+        author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course, other = (
+            Course.objects.create(name=name, description='', author=author, launch_date=datetime.date.today(), duration=1)
+            for name in ('Batch', 'Other')
+        )
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.contents = self.create_contents(4)
+        self.foreign = ModuleContent.objects.create(module=Module.objects.create(course=other, title='Other'), title='Foreign', content_type='text')
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def create_contents(self, count):
+        module = Module.objects.create(course=self.course, title=f'Module {count}')
+        return [ModuleContent.objects.create(module=module, title=f'Item {order}', content_type='text') for order in range(count)]
+
+    def complete(self, content_ids):
+        return self.client.post(self.url, {'course_id': self.course.slug, 'content_ids': content_ids}, format='json')
+
+    def test_upserts_and_ignores_other_ids(self):
+        done_at = timezone.now() - datetime.timedelta(days=3)
+        done, started, fresh, _ = self.contents
+        ContentProgress.objects.create(student=self.student, content=done, course=self.course, is_completed=True, completed_at=done_at)
+        ContentProgress.objects.create(student=self.student, content=started, course=self.course, is_completed=False)
+        missing = self.foreign.pk + 1000
+
+        data = self.complete([done.pk, started.pk, fresh.pk, self.foreign.pk, missing]).json()
+
+        self.assertEqual(data['marked_ids'], [started.pk, fresh.pk])
+        self.assertEqual(data['ignored_ids'], [self.foreign.pk, missing])
+        self.assertEqual((data['completed'], data['total']), (3, 4))
+        self.assertEqual(ContentProgress.objects.filter(student=self.student, is_completed=True).count(), 3)
+        self.assertEqual(ContentProgress.objects.get(content=done).completed_at, done_at)
+        self.assertFalse(ContentProgress.objects.filter(content=self.foreign).exists())
+
+    def test_counter_is_recounted(self):
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_count=7)
+        self.complete([self.contents[0].pk])
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_count, 1)
+
+    def test_rejects_ids_that_are_not_integers(self):
+        for content_ids in ([1.9], [True], ['1.5'], ['x'], [None], [[1]]):
+            with self.subTest(content_ids=content_ids):
+                self.assertEqual(self.complete(content_ids).status_code, 400)
+        self.assertFalse(ContentProgress.objects.exists())
+
+        response = self.complete([str(self.contents[0].pk)])
+        self.assertEqual(response.json()['marked_ids'], [self.contents[0].pk])
+
+    def test_batch_size_is_capped(self):
+        response = self.complete(list(range(1, MAX_BATCH_COMPLETIONS + 2)))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ContentProgress.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        self.complete([self.contents[0].pk])  # creates the student's version row for the course
+        counts = []
+        for size in (2, 40):
+            contents = self.create_contents(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.complete([content.pk for content in contents])
+            self.assertEqual(len(response.json()['marked_ids']), size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class CourseStatsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.students = [User.objects.create_user(username=f'student{index}', password='x') for index in range(3)]
+        self.course = Course.objects.create(
+            name='Counted', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[0])
+
+    def stats(self, course=None):
+        return CourseStats.objects.values(*STAT_FIELDS).get(course=course or self.course)
+
+    def test_signals_apply_deltas(self):
+        module = Module.objects.create(course=self.course, title='Module')
+        content = ModuleContent.objects.create(module=module, title='Video', content_type='video', duration=12)
+        enrollments = [Enrollment.objects.create(student=student, course=self.course) for student in self.students[:2]]
+        CourseFeedback.objects.create(user=self.students[0], course=self.course, rating=5)
+        feedback = CourseFeedback.objects.create(user=self.students[1], course=self.course, rating=2)
+        self.assertEqual(self.stats(), {
+            'enrollment_count': 2, 'content_count': 1, 'total_content_duration': 12,
+            'feedback_count': 2, 'rating_total': 7, 'average_rating': Decimal('3.50'),
+        })
+
+        feedback.rating = 4
+        feedback.save()
+        self.assertEqual(self.stats()['average_rating'], Decimal('4.50'))
+        feedback.delete()
+        enrollments[0].delete()
+        content.duration = 20
+        content.save()
+        self.assertEqual(self.stats(), {
+            'enrollment_count': 1, 'content_count': 1, 'total_content_duration': 20,
+            'feedback_count': 1, 'rating_total': 5, 'average_rating': Decimal('5.00'),
+        })
+
+    def test_rebuild_and_verify(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        CourseFeedback.objects.create(user=self.students[0], course=self.course, rating=3)
+        CourseStats.objects.filter(course=self.course).update(enrollment_count=9, average_rating=1)
+        out = io.StringIO()
+        call_command('rebuild_course_stats', '--verify', stdout=out)
+        self.assertIn(f'{self.course.pk}: enrollment_count stored=9 computed=1', out.getvalue())
+        self.assertIn('average_rating', out.getvalue())
+
+        call_command('rebuild_course_stats', stdout=io.StringIO())
+        self.assertEqual(list(verify_course_stats()), [])
+        self.assertEqual((self.stats()['enrollment_count'], self.stats()['average_rating']), (1, Decimal('3.00')))
+
+    def test_feedback_without_a_stats_row(self):
+        CourseStats.objects.filter(course=self.course).delete()
+        response = self.client.post(f'/api/courses/{self.course.slug}/feedback/', {'course': self.course.slug, 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.rating, 4)
+
+    def test_popularity_pages_walk_the_stats_index(self):
+        courses = [self.course] + [
+            Course.objects.create(name=f'Course {index}', description='', author=self.author, launch_date=datetime.date.today(), duration=1)
+            for index in range(2)
+        ]
+        for count, course in enumerate(courses):
+            for student in self.students[:count]:
+                Enrollment.objects.create(student=student, course=course)
+
+        slugs, url = [], '/api/courses/courses/?ordering=-popularity&page_size=1'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                data = self.client.get(url).json()
+                slugs += [course['slug'] for course in data['results']]
+                url = data['next']
+        self.assertEqual(slugs, [course.slug for course in reversed(courses)])
+        page = next(query['sql'] for query in queries if 'ORDER BY "courses_coursestats"."enrollment_count" DESC' in query['sql'])
+        self.assertIn('INNER JOIN "courses_coursestats"', page)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Versioned', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.content = ModuleContent.objects.create(module=self.module, title='Lesson', content_type='text')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = f'/api/courses/courses/{self.course.slug}/'
+
+    def etag(self, url=None):
+        return self.client.get(url or self.url)['ETag']
+
+    def test_matching_etag_is_answered_from_the_versions_alone(self):
+        self.etag()  # builds the outline, which bumps the course version
+        etag = self.etag()
+        # the version counters
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.etag()
+        self.course.description = 'Updated'
+        self.course.save()
+        self.assertNotEqual(self.etag(), etag)
+
+        etag = self.etag()
+        ContentProgress.objects.create(student=self.student, content=self.content, course=self.course, is_completed=True)
+        self.assertNotEqual(self.etag(), etag)
+
+        taxonomy = self.etag('/api/courses/taxonomy/')
+        Category.objects.create(name='Science')
+        self.assertNotEqual(self.etag('/api/courses/taxonomy/'), taxonomy)
+
+    def test_cascades_bump_the_user_version_once(self):
+        ContentProgress.objects.create(student=self.student, content=self.content, course=self.course, is_completed=True)
+        etag = self.etag()
+        with mock.patch('courses.progress.bump_versions') as bump, self.captureOnCommitCallbacks(execute=True):
+            self.module.delete()
+        bump.assert_called_once_with(user_course_version_key(self.student.pk, self.course.pk))
+        self.assertNotEqual(self.etag(), etag)
+
+
+class CatalogTests(TestCase):
+    url = '/api/courses/courses/'
+
+    def setUp(self):
+        # Version counters restart with every test, so pages cached by an earlier test would match
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.other_author = User.objects.create_user(username='other', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.python, self.django, self.sql = (Tag.objects.create(name=name) for name in ('python', 'django', 'sql'))
+        self.client = APIClient()
+
+    def create_course(self, name, author=None, tags=(), students=(), **fields):
+        course = Course.objects.create(
+            name=name, description='', author=author or self.author, launch_date=datetime.date.today(), duration=1, **fields,
+        )
+        course.tags.set(tags)
+        for student in students:
+            Enrollment.objects.create(student=student, course=course)
+        return course
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.client.force_authenticate(self.student)
+
+        def create_courses(count):
+            for index in range(count):
+                self.create_course(
+                    f'Course {count}-{index}', author=(self.author, self.other_author)[index % 2],
+                    tags=[self.python, self.django, self.sql][:index % 3 + 1], students=[self.student][:index % 2],
+                )
+
+        create_courses(2)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        expected = len(queries)
+
+        create_courses(15)
+        self.client.get(self.url)
+        with self.assertNumQueries(expected):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['results']), 17)
+
+    def test_is_enrolled_and_is_author(self):
+        own = self.create_course('Own', students=[self.student])
+        taken = self.create_course('Taken', author=self.other_author, students=[self.student, self.author])
+        other = self.create_course('Other', author=self.other_author)
+
+        for user, enrolled, authored in (
+            (self.student, {own.slug, taken.slug}, set()),
+            (self.author, {taken.slug}, {own.slug}),
+        ):
+            with self.subTest(user=user.username):
+                self.client.force_authenticate(user)
+                results = self.client.get(self.url).json()['results']
+                self.assertEqual({course['slug'] for course in results if course['is_enrolled']}, enrolled)
+                self.assertEqual({course['slug'] for course in results if course['is_author']}, authored)
+                self.assertEqual({course['slug'] for course in results}, {own.slug, taken.slug, other.slug})
+
+        self.client.force_authenticate(None)
+        results = self.client.get(self.url).json()['results']
+        self.assertFalse(any(course['is_enrolled'] or course['is_author'] for course in results))
+
+    def slugs(self, **params):
+        return sorted(course['slug'] for course in self.client.get(self.url, params).json()['results'])
+
+    def test_tag_filters(self):
+        both = self.create_course('Both', tags=[self.python, self.django])
+        python = self.create_course('Python', tags=[self.python])
+        self.create_course('SQL', tags=[self.sql])
+        self.create_course('Untagged')
+        tags = f'{self.python.pk},{self.django.pk}'
+
+        # `both` matches two of the tags and is still listed once
+        self.assertEqual(self.slugs(tags=tags), sorted([both.slug, python.slug]))
+        self.assertEqual(self.slugs(tags_all=tags), [both.slug])
+        self.assertEqual(self.slugs(tags_all=f'{self.python.pk},{self.python.pk}'), sorted([both.slug, python.slug]))
+        self.assertEqual(self.slugs(tags=tags, tags_all=self.django.pk), [both.slug])
+
+    def facets(self, **params):
+        data = self.client.get(f'{self.url}facets/', params).json()
+        return {name: {row['value']: row['count'] for row in rows} for name, rows in data.items()}
+
+    def test_facet_counts_follow_filters_search_and_visibility(self):
+        science = Category.objects.create(name='Science')
+        self.create_course('Python basics', tags=[self.python], category=science)
+        self.create_course('Django web', tags=[self.python, self.django], level='advanced', price=Decimal('1000'), category=science)
+        self.create_course('Hidden SQL', tags=[self.sql], is_visible=False)
+        python, django, sql = (str(tag.pk) for tag in (self.python, self.django, self.sql))
+
+        facets = self.facets()
+        self.assertEqual(facets['level'], {'beginner': 1, 'advanced': 1})
+        self.assertEqual(facets['tags'], {python: 2, django: 1})
+        self.assertEqual(facets['price'], {'free': 1, '500-2000': 1})
+        self.assertEqual(facets['category'], {science.slug: 2})
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.facets()['tags'], {python: 2, django: 1, sql: 1})
+        self.assertEqual(self.facets(level='advanced')['tags'], {python: 1, django: 1})
+        self.assertEqual(self.facets(tags=django)['level'], {'advanced': 1})
+        self.assertEqual(self.facets(search='basics')['level'], {'beginner': 1})
+        self.assertEqual(self.facets(search='nothing matches'), {name: {} for name in facets})
+
+    def test_facet_cache_follows_the_catalog_version(self):
+        self.create_course('First')
+        self.assertEqual(self.facets()['level'], {'beginner': 1})
+        # the catalog version
+        with self.assertNumQueries(1):
+            self.assertEqual(self.facets()['level'], {'beginner': 1})
+
+        self.create_course('Second', level='advanced')
+        self.assertEqual(self.facets()['level'], {'beginner': 1, 'advanced': 1})
+
+    def test_anonymous_pages_are_cached(self):
+        course = self.create_course('Cached')
+        first = self.client.get(self.url).json()
+        # the catalog version
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).json(), first)
+
+        self.client.force_authenticate(self.student)
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get(self.url).json()['results']
+        self.assertGreater(len(queries), 1)
+        self.assertEqual([row['slug'] for row in results], [course.slug])
+        self.assertEqual((catalog_page_cache_stats()['hits'], catalog_page_cache_stats()['misses']), (1, 1))
+
+    def test_version_bump_invalidates_cached_pages(self):
+        first = self.create_course('First')
+        self.assertEqual(self.slugs(), [first.slug])
+        second = self.create_course('Second')
+        self.assertEqual(self.slugs(), sorted([first.slug, second.slug]))
+        first.name = 'Renamed'
+        first.save()
+        names = {row['name'] for row in self.client.get(self.url).json()['results']}
+        self.assertEqual(names, {'Renamed', 'Second'})
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'example.com'])
+    def test_page_cache_key(self):
+        factory = APIRequestFactory()
+
+        def key(path, etag='"1"', host='testserver'):
+            return catalog_page_cache_key(Request(factory.get(path, HTTP_HOST=host)), etag)
+
+        base = key('/api/courses/courses/?level=beginner&tags=1&tags=2')
+        # Order and repeats of the params do not matter, params the catalog does not read are dropped
+        self.assertEqual(key('/api/courses/courses/?tags=2&level=beginner&tags=1&tags=1&utm_source=mail'), base)
+        for other in (
+            key('/api/courses/courses/?level=advanced&tags=1&tags=2'),
+            key('/api/courses/courses/?level=beginner&tags=1&tags=2&cursor=abc'),
+            key('/api/courses/courses/?level=beginner&tags=1&tags=2', host='example.com'),
+            key('/api/courses/courses/?level=beginner&tags=1&tags=2', etag='"2"'),
+        ):
+            self.assertNotEqual(other, base)
+
+    def test_admin_cache_stats(self):
+        stats_url = '/api/admin/courses/cache-stats/'
+        admin = User.objects.create_user(username='admin', password='x', is_semi_admin=True)
+        self.create_course('Counted')
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.get(self.url, {'level': 'advanced'})
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(stats_url).status_code, 403)
+        self.assertEqual(self.client.delete(stats_url).status_code, 403)
+
+        self.client.force_authenticate(admin)
+        stats = self.client.get(stats_url).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 2, 0.3333))
+        self.assertEqual(stats['catalog_version'], catalog_version())
+
+        stats = self.client.delete(stats_url).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (0, 0, None))
+        self.assertEqual(self.client.get(stats_url).json()['hits'], 0)
+
+
+class TaxonomyCacheTests(TestCase):
+    url = '/api/courses/taxonomy/'
+
+    def setUp(self):
+        taxonomy_cache.clear()
+        self.client = APIClient()
+
+    def names(self):
+        data = self.client.get(self.url).json()
+        tree = {category['name']: [sub['name'] for sub in category['subcategories']] for category in data['categories']}
+        return [tag['name'] for tag in data['tags']], tree
+
+    def assert_refreshed(self, expected):
+        self.assertEqual(taxonomy_cache.stats()['size'], 0)
+        self.assertEqual(self.names(), expected)
+
+    def test_writes_clear_the_cached_payload(self):
+        science = Category.objects.create(name='Science')
+        self.assertEqual(self.names(), ([], {'Science': []}))
+        # the version counters
+        with self.assertNumQueries(1):
+            self.names()
+
+        Category.objects.create(name='Arts')
+        self.assert_refreshed(([], {'Science': [], 'Arts': []}))
+        science.name = 'Physics'
+        science.save()
+        self.assert_refreshed(([], {'Physics': [], 'Arts': []}))
+
+        optics = SubCategory.objects.create(name='Optics', category=science)
+        self.assert_refreshed(([], {'Physics': ['Optics'], 'Arts': []}))
+        optics.name = 'Lasers'
+        optics.save()
+        self.assert_refreshed(([], {'Physics': ['Lasers'], 'Arts': []}))
+
+        tag = Tag.objects.create(name='python')
+        self.assert_refreshed((['python'], {'Physics': ['Lasers'], 'Arts': []}))
+        tag.name = 'python3'
+        tag.save()
+        self.assert_refreshed((['python3'], {'Physics': ['Lasers'], 'Arts': []}))
+
+
+class SuggestTests(TestCase):
+    url = '/api/courses/suggest/'
+
+    def setUp(self):
+        suggest_cache.clear()
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.client = APIClient()
+
+    def create_course(self, name, **fields):
+        return Course.objects.create(
+            name=name, description='', author=self.author, launch_date=datetime.date.today(), duration=1, **fields,
+        )
+
+    def suggest(self, q, **params):
+        return self.client.get(self.url, {'q': q, **params}).json()
+
+    # Two-letter prefixes stay below TYPO_MIN_LENGTH, so only prefix matches are returned
+    def test_prefix_matches(self):
+        self.create_course('Python Advanced')
+        self.create_course('Python Basics')
+        self.create_course('Python Internals', is_visible=False)
+        self.create_course('Java')
+        Tag.objects.create(name='python')
+        Category.objects.create(name='Programming')
+
+        data = self.suggest('  PY ')
+        self.assertEqual([course['name'] for course in data['courses']], ['Python Basics', 'Python Advanced'])
+        self.assertEqual([tag['name'] for tag in data['tags']], ['python'])
+        self.assertEqual(data['categories'], [])
+        self.assertEqual(self.suggest(''), {'courses': [], 'tags': [], 'categories': [], 'subcategories': []})
+
+    def test_limit_is_capped(self):
+        for index in range(SUGGEST_MAX_LIMIT + 5):
+            self.create_course(f'Course {index:02}')
+
+        self.assertEqual(len(self.suggest('co')['courses']), SUGGEST_LIMIT)
+        self.assertEqual(len(self.suggest('co', limit=2)['courses']), 2)
+        self.assertEqual(len(self.suggest('co', limit=0)['courses']), 1)
+        self.assertEqual(len(self.suggest('co', limit=1000)['courses']), SUGGEST_MAX_LIMIT)
+        self.assertEqual(self.client.get(self.url, {'q': 'co', 'limit': 'many'}).status_code, 400)
+
+    def test_writes_clear_the_cache(self):
+        course = self.create_course('Pygame')
+        tag = Tag.objects.create(name='pytest')
+        self.assertEqual([row['name'] for row in self.suggest('py')['courses']], ['Pygame'])
+        with self.assertNumQueries(0):
+            self.suggest('py')
+
+        self.create_course('Pyramids')
+        self.assertEqual([row['name'] for row in self.suggest('py')['courses']], ['Pygame', 'Pyramids'])
+        course.name = 'Game design'
+        course.save()
+        self.assertEqual([row['name'] for row in self.suggest('py')['courses']], ['Pyramids'])
+
+        self.assertEqual([row['name'] for row in self.suggest('py')['tags']], ['pytest'])
+        tag.name = 'unittest'
+        tag.save()
+        self.assertEqual(self.suggest('py')['tags'], [])
+
+
+class HeartbeatTests(TestCase):
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir)
+        settings = override_settings(HEARTBEAT_JOURNAL_DIR=self.journal_dir, HEARTBEAT_FLUSH_INTERVAL=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        heartbeats._buffer = None
+        self.addCleanup(setattr, heartbeats, '_buffer', None)
+        heartbeats.heartbeat_targets.clear()
+
+        author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Videos', description='', author=author, launch_date=datetime.date.today(), duration=1,
+        )
+        module = Module.objects.create(course=self.course, title='Module')
+        self.video = ModuleContent.objects.create(module=module, title='Video', content_type='video')
+        self.article = ModuleContent.objects.create(module=module, title='Article', content_type='text')
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def send(self, *events):
+        return self.client.post('/api/courses/content-progress/heartbeats/', {'events': list(events)}, format='json')
+
+    def test_events_are_coalesced_until_flush(self):
+        response = self.send(
+            {'content_id': self.video.pk, 'position': 30, 'duration': 600},
+            {'content_id': self.video.pk, 'position': 560, 'duration': 600},
+            {'content_id': self.article.pk, 'position': 5},
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 2, 'ignored_ids': [self.article.pk]})
+        self.assertFalse(ContentProgress.objects.exists())
+        resume = self.client.get(f'/api/courses/contents/{self.video.pk}/').json()['resume_position']
+        self.assertEqual(resume, 560)
+
+        self.assertEqual(heartbeats.heartbeat_buffer().flush(), 1)
+        progress = ContentProgress.objects.get()
+        self.assertEqual((progress.position_seconds, progress.is_completed), (560, True))
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_count, 1)
+        self.assertEqual(os.listdir(self.journal_dir), [f'heartbeats-{os.getpid()}.log'])
+
+    def test_journal_of_a_dead_worker_is_replayed(self):
+        self.send({'content_id': self.video.pk, 'position': 125})
+        # Simulate a crash: the next buffer in this process finds the journal the old one left behind
+        crashed = heartbeats.heartbeat_buffer()
+        crashed.journal.close()
+        crashed.journal, crashed.pending = None, {}
+        heartbeats._buffer = None
+
+        buffer = heartbeats.heartbeat_buffer()
+        self.assertEqual(buffer.position(self.student.pk, self.video.pk), 125)
+        buffer.flush()
+        self.assertEqual(ContentProgress.objects.get().position_seconds, 125)
+        self.assertFalse([name for name in os.listdir(self.journal_dir) if name.endswith('.flushing')])
+
+    def test_positions_are_clamped_and_out_of_range_values_rejected(self):
+        self.assertEqual(heartbeats.parse_heartbeat({'content_id': 1, 'position': 900, 'duration': 600})[1], 600)
+        self.assertEqual(heartbeats.parse_heartbeat({'content_id': 1, 'position': -5})[1], 0)
+        self.assertEqual(heartbeats.parse_heartbeat({'content_id': 1, 'position': 1e12})[1], heartbeats.MAX_VIDEO_SECONDS)
+        for event in ({'content_id': 2 ** 40, 'position': 1}, {'content_id': 1, 'position': 1, 'duration': 1e12}):
+            with self.subTest(event=event):
+                self.assertEqual(self.send(event).status_code, 400)
+
+    def test_states_the_database_rejects_are_quarantined(self):
+        buffer = heartbeats.heartbeat_buffer()
+        # e.g. replayed from a journal written before positions were clamped
+        buffer.record([
+            {'student': self.student.pk, 'content': self.video.pk, 'course': self.course.pk,
+             'position': 30, 'duration': None, 'completed': False},
+            {'student': self.student.pk, 'content': self.article.pk, 'course': self.course.pk,
+             'position': 2 ** 40, 'duration': None, 'completed': False},
+        ])
+        with self.assertLogs('courses.heartbeats', 'ERROR'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(ContentProgress.objects.get().content, self.video)
+        self.assertEqual(buffer.pending, {})
+        with open(os.path.join(self.journal_dir, heartbeats.REJECTED_JOURNAL)) as quarantine:
+            self.assertEqual(len(quarantine.readlines()), 1)
+        self.assertEqual(buffer.flush(), 0)
+
+
+class PrerequisiteTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Graph', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.basics, self.advanced, self.project = (
+            Module.objects.create(course=self.course, title=title, order=order)
+            for order, title in enumerate(['Basics', 'Advanced', 'Project'])
+        )
+        self.advanced.prerequisites.add(self.basics)
+        self.project.prerequisites.add(self.basics, self.advanced)
+        self.lesson = ModuleContent.objects.create(module=self.basics, title='Lesson', content_type='text')
+        ModuleContent.objects.create(module=self.advanced, title='Deep dive', content_type='text')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def unlocks(self):
+        return self.client.get(f'/api/courses/courses/{self.course.slug}/modules/unlocks/').json()
+
+    def test_modules_unlock_as_prerequisites_complete(self):
+        data = self.unlocks()
+        self.assertEqual([module['slug'] for module in data['modules']], [self.basics.slug, self.advanced.slug, self.project.slug])
+        self.assertEqual(data['unlocked'], [self.basics.slug])
+
+        ContentProgress.objects.create(student=self.student, content=self.lesson, course=self.course, is_completed=True)
+        data = self.unlocks()
+        self.assertEqual(data['unlocked'], [self.basics.slug, self.advanced.slug])
+        self.assertEqual(data['modules'][2]['missing_prerequisites'], [self.advanced.slug])
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaises(ValidationError), transaction.atomic():
+            self.basics.prerequisites.add(self.project)
+
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/courses/modules/{self.basics.slug}/', {'prerequisites': [self.advanced.slug]}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('prerequisites', response.json())
+        self.assertFalse(self.basics.prerequisites.exists())
+
+    def test_graph_is_cached_between_requests(self):
+        self.unlocks()
+        # version check, course with its outline, completed contents
+        with self.assertNumQueries(3):
+            self.unlocks()
+
+
+class OutlineTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Outline', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.lesson = ModuleContent.objects.create(module=self.module, title='Lesson', content_type='text', text='Body ' * 200)
+        self.assignment = Assignment.objects.create(module=self.module, title='Essay', description='Write 500 words.')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_document_holds_only_the_outline(self):
+        module = build_outline_document(self.course.pk)['modules'][0]
+        self.assertEqual(module['contents'][0]['title'], 'Lesson')
+        self.assertNotIn('text', module['contents'][0])
+        self.assertEqual(set(module['assignments'][0]), {'id', 'type', 'title', 'deadline'})
+
+    def test_bodies_are_loaded_for_the_requested_fields_and_module(self):
+        url = f'/api/courses/courses/{self.course.slug}/'
+        data = self.client.get(url).json()
+        self.assertEqual(data['modules'][0]['contents'][0]['text'], self.lesson.text)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'fields': 'slug,name'}).json()
+        self.assertEqual(set(data), {'slug', 'name'})
+        self.assertFalse(any('courses_courseoutline' in query['sql'] for query in queries))
+
+        items = self.client.get('/api/courses/contents/', {'module_slug': self.module.slug}).json()
+        by_title = {item['title']: item for item in items}
+        self.assertEqual(by_title['Lesson']['text'], self.lesson.text)
+        self.assertEqual(by_title['Essay']['description'], 'Write 500 words.')
+
+    def create_course(self, modules):
+        course = Course.objects.create(
+            name=f'Course with {modules} modules', description='', author=self.author,
+            launch_date=datetime.date.today(), duration=1,
+        )
+        for index in range(modules):
+            module = Module.objects.create(course=course, title=f'Module {index}')
+            for order in range(2):
+                content = ModuleContent.objects.create(module=module, title=f'Item {order}', content_type='text', text='Body', order=order)
+            Assignment.objects.create(module=module, title=f'Assignment {index}', description='')
+            ContentProgress.objects.create(student=self.student, content=content, course=course, is_completed=True)
+        Enrollment.objects.create(student=self.student, course=course)
+        url = f'/api/courses/courses/{course.slug}/'
+        self.client.get(url)  # builds the outline
+        return url
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        url = self.create_course(2)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        self.assertEqual(len(data['modules']), 2)
+        expected = len(queries)
+
+        url = self.create_course(40)
+        with self.assertNumQueries(expected):
+            data = self.client.get(url).json()
+        self.assertEqual(len(data['modules']), 40)
+        self.assertEqual(sum(content['is_completed'] for module in data['modules'] for content in module['contents']), 40)
+        self.assertEqual(data['modules'][39]['contents'][0]['text'], 'Body')
+
+
+class FieldSelectionTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Selected', description='', author=author, launch_date=datetime.date.today(), duration=1,
+        )
+        module = Module.objects.create(course=self.course, title='Module')
+        ModuleContent.objects.create(module=module, title='Lesson', content_type='text', text='Body')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = f'/api/courses/courses/{self.course.slug}/'
+        self.client.get(self.url)  # builds the outline
+
+    def get(self, **params):
+        return self.client.get(self.url, params).json()
+
+    def test_nested_fields(self):
+        data = self.get(fields='slug,modules.title,modules.contents.title', expand='modules.contents')
+        self.assertEqual(data, {'slug': self.course.slug, 'modules': [{'title': 'Module', 'contents': [{'title': 'Lesson'}]}]})
+
+        data = self.get(fields='slug,modules.title', expand='modules')
+        self.assertEqual(data['modules'], [{'title': 'Module'}])
+
+    def test_unknown_fields_are_ignored(self):
+        self.assertEqual(self.get(fields='slug,nonexistent'), {'slug': self.course.slug})
+        data = self.get(fields='name,modules.nonexistent,modules.title', expand='modules')
+        self.assertEqual(data, {'name': 'Selected', 'modules': [{'title': 'Module'}]})
+
+    def test_unexpanded_relations_are_omitted_and_not_loaded(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(fields='slug,modules,certificate,tags,students_enrolled')
+        self.assertEqual(set(data), {'slug', 'certificate', 'tags', 'students_enrolled'})
+        tables = ' '.join(query['sql'] for query in queries)
+        for table in ('courses_courseoutline', 'courses_modulecontent', 'courses_contentprogress'):
+            self.assertNotIn(table, tables)
+
+        # version check, course
+        with self.assertNumQueries(2):
+            data = self.get(fields='slug,name')
+        self.assertEqual(set(data), {'slug', 'name'})
+
+
+class OutlineRebuildTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = Course.objects.create(
+                name='Rebuilt', description='', author=author, launch_date=datetime.date.today(), duration=1,
+            )
+            self.module = Module.objects.create(course=self.course, title='Module')
+            self.lesson = ModuleContent.objects.create(module=self.module, title='Lesson', content_type='text')
+
+    def test_rebuild_runs_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Module.objects.create(course=self.course, title='Second')
+            ModuleContent.objects.create(module=self.module, title='Recap', content_type='text')
+            self.lesson.title = 'Intro'
+            self.lesson.save()
+        self.assertEqual(len(callbacks), 1)
+        titles = [content['title'] for content in self.course.outline.document['modules'][0]['contents']]
+        self.assertEqual(sorted(titles), ['Intro', 'Recap'])
+
+    def test_rolled_back_edit_does_not_swallow_the_next_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Module.objects.create(course=self.course, title='Discarded')
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            Module.objects.create(course=self.course, title='Kept')
+        self.assertEqual(len(callbacks), 1)
+        titles = [module['title'] for module in self.course.outline.document['modules']]
+        self.assertEqual(titles, ['Module', 'Kept'])
+
+
+class CompletionBitmapTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        self.course = Course.objects.create(
+            name='Bits', description='', author=author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.contents = [
+            ModuleContent.objects.create(module=self.module, title=f'Item {order}', content_type='text', order=order)
+            for order in range(10)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def test_encoding_round_trip(self):
+        self.assertEqual(encode_ordinals([0, 9]), bytes([0b00000001, 0b00000010]))
+        self.assertEqual(decode_ordinals(encode_ordinals([3, 8, 64])), [3, 8, 64])
+        self.assertEqual(encode_ordinals([]), b'')
+
+    def test_ordinals_are_unique_and_not_reused(self):
+        self.assertEqual([content.ordinal for content in self.contents], list(range(10)))
+        self.contents[-1].delete()
+        added = ModuleContent.objects.create(module=self.module, title='New', content_type='text')
+        self.assertEqual(added.ordinal, 10)
+
+    def test_conversion_between_rows_and_bitmaps(self):
+        for content in self.contents[1:4]:
+            ContentProgress.objects.create(student=self.student, content=content, course=self.course, is_completed=True)
+        bitmaps_from_rows([self.course.pk])
+        expected = {content.pk for content in self.contents[1:4]}
+        self.assertEqual(bitmap_completed_ids(self.student, self.course), expected)
+
+        self.assertEqual(mark_completed_bits(self.student, self.course, [self.contents[1].pk, self.contents[7].pk]), [self.contents[7].pk])
+        ContentProgress.objects.all().delete()
+        self.assertEqual(rows_from_bitmaps([self.course.pk]), 4)
+        completed = set(ContentProgress.objects.filter(is_completed=True).values_list('content_id', flat=True))
+        self.assertEqual(completed, expected | {self.contents[7].pk})
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_count, 4)
+
+
+class CertificateJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x', first_name='Ada', last_name='Lovelace')
+        self.course = Course.objects.create(
+            name='Certified', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def apply(self):
+        return self.client.post(f'/api/courses/certificates/apply/{self.course.slug}/')
+
+    def test_apply_queues_the_render_and_the_worker_approves(self):
+        self.assertEqual(self.apply().json()['status'], 'generating')
+        certificate = Certificate.objects.get()
+        self.assertEqual(certificate.jobs.get().status, 'queued')
+
+        (job,) = claim_jobs('test', 10)
+        self.assertTrue(run_job(job))
+
+        status = self.client.get(f'/api/courses/certificates/{certificate.pk}/status/').json()
+        self.assertEqual((status['status'], status['job']['status']), ('approved', 'done'))
+        certificate.refresh_from_db()
+        self.assertTrue(os.path.exists(certificate.pdf_file.path))
+        self.assertIsNotNone(certificate.issued_at)
+
+    def test_failed_renders_are_retried_then_given_up(self):
+        self.apply()
+        job = CertificateJob.objects.get()
+        with mock.patch('courses.certificate_jobs.render_certificate', side_effect=OSError('disk full')):
+            for attempt in range(1, job.max_attempts + 1):
+                CertificateJob.objects.filter(pk=job.pk).update(run_after=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc))
+                (claimed,) = claim_jobs('test', 10)
+                self.assertFalse(run_job(claimed))
+                claimed.refresh_from_db()
+                self.assertEqual((claimed.attempts, claimed.last_error), (attempt, 'OSError: disk full'))
+        self.assertEqual(claimed.status, 'failed')
+        self.assertEqual(Certificate.objects.get().status, 'failed')
+
+    def test_bulk_approval_checks_authorship_and_queues_every_render(self):
+        students = [User.objects.create_user(username=f'cohort-{i}', password='x') for i in range(3)]
+        certificates = [Certificate.objects.create(student=student, course=self.course) for student in students]
+        other_course = Course.objects.create(
+            name='Other', description='', author=self.student, launch_date=datetime.date.today(), duration=1,
+        )
+        foreign = Certificate.objects.create(student=students[0], course=other_course)
+        author = APIClient()
+        author.force_authenticate(self.author)
+        url = '/api/courses/certificates/approve/bulk/'
+
+        response = author.post(url, {'certificate_ids': [certificates[0].pk, foreign.pk]}, format='json')
+        self.assertEqual((response.status_code, response.json()['certificate_ids']), (403, [foreign.pk]))
+        self.assertFalse(CertificateJob.objects.exists())
+
+        with self.assertNumQueries(8):
+            response = author.post(url, {'course_id': self.course.slug}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['certificate_ids'], [certificate.pk for certificate in certificates])
+
+        jobs = claim_jobs('test', 10)
+        with self.assertNumQueries(5):
+            complete_jobs([(job, render_certificate(*render_args(job))) for job in jobs])
+        self.assertEqual(set(Certificate.objects.filter(course=self.course).values_list('status', flat=True)), {'approved'})
+        self.assertEqual(Certificate.objects.get(pk=certificates[1].pk).pdf_file.name, f'certificates/certificate_{certificates[1].pk}.pdf')
+
+    def test_download_checks_access_renders_missing_files_and_serves_ranges(self):
+        certificate = Certificate.objects.create(
+            student=self.student, course=self.course, status='approved', issued_at=datetime.datetime(2026, 10, 17, tzinfo=datetime.timezone.utc),
+        )
+        url = f'/api/courses/certificates/{certificate.pk}/download/'
+        stranger = APIClient()
+        stranger.force_authenticate(User.objects.create_user(username='stranger', password='x'))
+        self.assertEqual(stranger.get(url).status_code, 403)
+
+        # No file yet: rendered on the first download
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'application/pdf'))
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(Certificate.objects.get(pk=certificate.pk).pdf_file.name, f'certificates/certificate_{certificate.pk}.pdf')
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get(url, HTTP_RANGE='bytes=5-14')
+        self.assertEqual((response.status_code, response['Content-Range']), (206, f'bytes 5-14/{len(body)}'))
+        self.assertEqual(b''.join(response.streaming_content), body[5:15])
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE='bytes=-7').streaming_content), body[-7:])
+        # A stale If-Range gets the whole file
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-0', HTTP_IF_RANGE='"old"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(body)}-').status_code, 416)
+
+    def test_pending_queue_is_filtered_paginated_and_annotated(self):
+        module = Module.objects.create(course=self.course, title='Module')
+        contents = [
+            ModuleContent.objects.create(module=module, title=f'Content {i}', content_type='text', order=i) for i in range(4)
+        ]
+        for i in range(5):
+            student = User.objects.create_user(username=f'queue-{i}', password='x')
+            Enrollment.objects.create(student=student, course=self.course)
+            for content in contents[:i]:
+                ContentProgress.objects.create(student=student, content=content, course=self.course, is_completed=True)
+            Certificate.objects.create(student=student, course=self.course, status='rejected' if i == 4 else 'pending')
+        author = APIClient()
+        author.force_authenticate(self.author)
+        url = '/api/courses/certificates/pending/'
+
+        with self.assertNumQueries(2):
+            page = author.get(url, {'page_size': 3}).json()
+        self.assertEqual(page['count'], 4)
+        self.assertEqual([row['progress'] for row in page['results']], [0, 25, 50])
+        self.assertEqual([row['progress'] for row in author.get(page['next']).json()['results']], [75])
+        self.assertEqual(author.get(url, {'status': 'all'}).json()['count'], 5)
+        self.assertEqual(author.get(url, {'status': 'bogus'}).status_code, 400)
+
+    def test_template_render_appends_an_incremental_update(self):
+        template = CertificateTemplate('Grace Hopper')
+        fields = overlay_fields('Zoë (Ada) Lovelace', 'Certified', datetime.date(2026, 10, 17), 7)
+        pdf = template.render(fields)
+        self.assertTrue(pdf.startswith(template.pdf))
+        update = pdf[len(template.pdf):]
+        self.assertIn(rb'(Zo\353 \(Ada\) Lovelace) Tj', update)
+        self.assertIn(b'/Prev %d ' % template.startxref, update)
+        # Every cross-reference entry and the final startxref point at what they name
+        for number, offset in re.findall(rb'(\d+) 1\n(\d{10}) 00000 n', update):
+            self.assertTrue(pdf[int(offset):].startswith(number + b' 0 obj'))
+        startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', update).group(1))
+        self.assertTrue(pdf[startxref:].startswith(b'xref'))
+
+        # Text the standard fonts cannot encode needs font substitution: drawn by ReportLab instead
+        self.assertIsNone(template.render(overlay_fields('Ωmega', 'Certified', datetime.date(2026, 10, 17), 7)))
+        pdf = render_certificate_pdf(self.course.pk, 'Grace Hopper', 'Ωmega', 'Certified', datetime.date(2026, 10, 17), 7)
+        self.assertTrue(pdf.startswith(b'%PDF') and b'/Prev' not in pdf)
+
+    def test_concurrent_renders_of_one_certificate_use_their_own_temporary_files(self):
+        args = (self.course.pk, 'Grace Hopper', 'Ada Lovelace', 'Certified', datetime.date(2026, 10, 17), 7)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            names = set(pool.map(lambda _: render_certificate(*args), range(16)))
+        self.assertEqual(names, {'certificates/certificate_7.pdf'})
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'certificates')), ['certificate_7.pdf'])
+        with open(os.path.join(self.media_root, 'certificates', 'certificate_7.pdf'), 'rb') as pdf:
+            self.assertEqual(pdf.read(), render_certificate_pdf(*args))
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'parts'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.author = User.objects.create_user(username='author', password='x', is_teacher=True)
+        self.student = User.objects.create_user(username='student', password='x')
+        course = Course.objects.create(
+            name='Uploads', description='', author=self.author, launch_date=datetime.date.today(), duration=1,
+        )
+        self.module = Module.objects.create(course=course, title='Module')
+        self.assignment = Assignment.objects.create(module=self.module, title='Essay', description='')
+        Enrollment.objects.create(student=self.student, course=course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.data = os.urandom(10_000)
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.put(
+            f'/api/courses/uploads/{upload_id}/chunk/?offset={offset}', chunk, content_type='application/octet-stream',
+        )
+
+    def test_submission_resumes_from_the_server_offset_and_checks_the_checksum(self):
+        upload = self.client.post('/api/courses/uploads/', {
+            'assignment_id': self.assignment.pk, 'filename': '../essay.pdf', 'size': len(self.data),
+        }, format='json').json()
+        self.assertEqual((upload['filename'], upload['offset']), ('essay.pdf', 0))
+        self.assertEqual(self.put_chunk(upload['id'], 0, self.data[:4000]).json()['offset'], 4000)
+
+        # A retried chunk whose first attempt did arrive: the client is told where to resume
+        response = self.put_chunk(upload['id'], 0, self.data[:4000])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4000))
+        offset = self.client.get(f"/api/courses/uploads/{upload['id']}/").json()['offset']
+        self.assertEqual(self.put_chunk(upload['id'], offset, self.data[offset:]).json()['offset'], len(self.data))
+
+        finalize = f"/api/courses/uploads/{upload['id']}/finalize/"
+        self.assertEqual(self.client.post(finalize, {'checksum': '0' * 64}, format='json').status_code, 400)
+        response = self.client.post(finalize, {'checksum': hashlib.sha256(self.data).hexdigest(), 'comment': 'Done'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        submission = AssignmentSubmission.objects.get()
+        with submission.submitted_files.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertEqual(submission.comment, 'Done')
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'parts')), [])
+
+    def test_content_files_are_author_only_and_chunks_stay_within_the_size(self):
+        content = ModuleContent.objects.create(module=self.module, title='Slides', content_type='file')
+        start = {'content_id': content.pk, 'filename': 'slides.pdf', 'size': len(self.data)}
+        self.assertEqual(self.client.post('/api/courses/uploads/', start, format='json').status_code, 403)
+
+        self.client.force_authenticate(self.author)
+        upload = self.client.post('/api/courses/uploads/', start, format='json').json()
+        self.assertEqual(self.put_chunk(upload['id'], 0, self.data + b'extra').status_code, 400)
+        self.put_chunk(upload['id'], 0, self.data)
+        response = self.client.post(
+            f"/api/courses/uploads/{upload['id']}/finalize/", {'checksum': hashlib.sha256(self.data).hexdigest()}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        content.refresh_from_db()
+        self.assertTrue(content.file.name.startswith('module_files/slides'))
+
+    def test_finalize_leaves_the_upload_intact_when_the_submission_cannot_be_saved(self):
+        upload = self.client.post('/api/courses/uploads/', {
+            'assignment_id': self.assignment.pk, 'filename': 'essay.pdf', 'size': len(self.data),
+        }, format='json').json()
+        self.put_chunk(upload['id'], 0, self.data)
+        finalize = f"/api/courses/uploads/{upload['id']}/finalize/"
+        checksum = {'checksum': hashlib.sha256(self.data).hexdigest()}
+        part = os.path.join(self.media_root, 'parts', f"{upload['id']}.part")
+
+        # A submission that raced past the permission check is only seen by the database
+        with mock.patch.object(AssignmentSubmission, 'save', side_effect=IntegrityError):
+            self.assertEqual(self.client.post(finalize, checksum, format='json').status_code, 400)
+        self.assertTrue(ChunkedUpload.objects.exists())
+        with open(part, 'rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'submissions')))
+
+        self.assertEqual(self.client.post(finalize, checksum, format='json').status_code, 201)
+        self.assertEqual(self.client.post(finalize, checksum, format='json').status_code, 404)
+
+    def test_chunk_loses_when_the_offset_moved_during_the_write(self):
+        upload = start_upload(self.student, 'essay.pdf', len(self.data), assignment=self.assignment)
+
+        class RacingStream(io.BytesIO):
+            # Another request for the same offset commits while this one is still writing
+            def read(self, size=-1):
+                ChunkedUpload.objects.filter(pk=upload.pk).update(offset=1000)
+                return super().read(size)
+
+        with self.assertRaises(OffsetMismatch) as mismatch:
+            append_chunk(upload, 0, RacingStream(self.data[:1000]), 1000)
+        self.assertEqual(mismatch.exception.offset, 1000)
+        self.assertEqual(append_chunk(upload, 1000, io.BytesIO(self.data[1000:]), len(self.data) - 1000), len(self.data))
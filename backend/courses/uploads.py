@@ -0,0 +1,149 @@
+"""
+Resumable chunked uploads for assignment submissions and module content files.
+
+start_upload() records the target and the declared size; append_chunk() streams each chunk from the
+request into CHUNKED_UPLOAD_DIR/<upload id>.part at the offset the client says it is at, so memory stays
+bounded by the copy buffer; a client that lost a response asks for the upload's `offset` and resumes from
+there. Chunks are written outside any transaction; the offset is advanced by a compare-and-set afterwards.
+finalize_upload() checks the size and SHA-256 checksum, then moves the file into storage (a rename
+when CHUNKED_UPLOAD_DIR is on the same filesystem as MEDIA_ROOT) and attaches it to its target.
+"""
+import hashlib
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from .models import AssignmentSubmission, ChunkedUpload
+
+COPY_BUFFER = 64 * 1024
+# Uploads untouched for this long are deleted by `manage.py clean_chunked_uploads`
+UPLOAD_EXPIRY = timedelta(days=1)
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the upload stopped; the client should resume from `offset`."""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}.')
+        self.offset = offset
+
+
+class AssembledFile(File):
+    # FileSystemStorage moves files that expose a temporary path instead of copying them
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(upload_id):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload_id}.part')
+
+
+def start_upload(owner, filename, size, assignment=None, content=None):
+    """Create an upload for a file of `size` bytes and its empty part file."""
+    size = int(size)
+    if not 0 < size <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise ValidationError(f'size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.')
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        raise ValidationError('filename is required.')
+    upload = ChunkedUpload.objects.create(
+        owner=owner, filename=filename[:255], size=size, assignment=assignment, content=content,
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload.pk), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Write `length` bytes read from `stream` at `offset`, which must be the upload's current offset, and
+    return the new offset. No transaction is open while the bytes are written: the offset is checked
+    under a short lock, the chunk written, then `offset` advances only if it is still where the write
+    started, so of two requests for the same offset one gets OffsetMismatch. Bytes left past the offset
+    by an interrupted request are overwritten by the next chunk; the finalize checksum catches the rest.
+    """
+    if not 0 < length <= settings.CHUNKED_UPLOAD_MAX_CHUNK:
+        raise ValidationError(f'Chunks must be between 1 and {settings.CHUNKED_UPLOAD_MAX_CHUNK} bytes.')
+    with transaction.atomic():
+        current, size = ChunkedUpload.objects.select_for_update().values_list('offset', 'size').get(pk=upload.pk)
+    if offset != current:
+        raise OffsetMismatch(current)
+    if offset + length > size:
+        raise ValidationError(f'The chunk ends past the declared size of {size} bytes.')
+    try:
+        part = open(part_path(upload.pk), 'r+b')
+    except FileNotFoundError:
+        raise ChunkedUpload.DoesNotExist('The upload was finalized or cancelled.')
+    with part:
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(COPY_BUFFER, remaining))
+            if not data:
+                raise ValidationError('The request body is shorter than its Content-Length.')
+            part.write(data)
+            remaining -= len(data)
+    advanced = ChunkedUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now(),
+    )
+    if not advanced:
+        raise OffsetMismatch(ChunkedUpload.objects.values_list('offset', flat=True).get(pk=upload.pk))
+    return offset + length
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(COPY_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(upload, checksum, comment=None):
+    """
+    Verify the complete file against the client's SHA-256 `checksum` and attach it: a new
+    AssignmentSubmission of `upload.owner`, or the `file` of the module content. Returns the object.
+    The upload stays locked throughout, so it is attached once; if the save fails the file is moved
+    back, leaving the upload as it was for another attempt.
+    """
+    path = part_path(upload.pk)
+    field = None
+    try:
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.offset != upload.size:
+                raise ValidationError(f'Upload is incomplete: {upload.offset} of {upload.size} bytes received.')
+            if file_checksum(path) != str(checksum or '').strip().lower():
+                raise ValidationError('Checksum does not match the uploaded file.')
+            if upload.assignment_id:
+                if AssignmentSubmission.objects.filter(assignment_id=upload.assignment_id, student_id=upload.owner_id).exists():
+                    raise ValidationError('You have already submitted this assignment.')
+                target = AssignmentSubmission(assignment_id=upload.assignment_id, student_id=upload.owner_id, comment=comment)
+                attached = target.submitted_files
+            else:
+                target = upload.content
+                attached = target.file
+            with open(path, 'rb') as part:
+                attached.save(upload.filename, AssembledFile(part, name=upload.filename), save=False)
+            field = attached
+            target.save()
+            upload.delete()
+    except Exception:
+        if field is not None:
+            os.replace(field.path, path)
+        raise
+    return target
+
+
+def expire_uploads(age=UPLOAD_EXPIRY):
+    """Delete uploads untouched for `age` together with their part files; returns how many."""
+    expired = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - age)
+    count = 0
+    # One by one so post_delete removes each part file
+    for upload in expired.iterator():
+        upload.delete()
+        count += 1
+    return count
@@ -4,8 +4,11 @@ from . import views
 urlpatterns = [
     # Course
     path('courses/', views.course_list_create, name='course-list-create'),
+    path('courses/facets/', views.course_facets, name='course-facets'),
+    path('suggest/', views.course_suggest, name='course-suggest'),
     path('courses/<slug:slug>/', views.course_detail, name='course-detail'),
     # Module
+    path('courses/<slug:course_id>/modules/unlocks/', views.module_unlocks, name='module-unlocks'),
     path('modules/', views.module_list_create_view, name='module-list-create'),
     path('modules/<slug:slug>/', views.module_detail_view, name='module-detail'),
     # Module Contents
@@ -15,6 +18,8 @@ urlpatterns = [
     path('courses/<slug:slug>/enroll/', views.enroll_student, name='enroll-student'),
     # Content Progress
     path('content-progress/complete/', views.mark_content_completed, name='mark-content-completed'),
+    path('content-progress/complete/batch/', views.mark_contents_completed, name='mark-contents-completed'),
+    path('content-progress/heartbeats/', views.record_heartbeats, name='record-heartbeats'),
     # Course Progress
     path('courses/<slug:course_id>/progress/', views.course_progress, name='course-progress'),
     # User Dashboard
@@ -22,14 +27,22 @@ urlpatterns = [
     # Certificates
     path('certificates/apply/<slug:course_id>/', views.apply_for_certificate, name='apply-certificate'),
     path('certificates/approve/<int:cert_id>/', views.approve_certificate, name='approve-certificate'),
+    path('certificates/approve/bulk/', views.bulk_approve_certificates, name='bulk-approve-certificates'),
     path('certificates/reject/<int:cert_id>/', views.reject_certificate, name='reject-certificate'),
+    path('certificates/<int:cert_id>/status/', views.certificate_status_view, name='certificate-status'),
+    path('certificates/<int:cert_id>/download/', views.download_certificate, name='download-certificate'),
     path('certificates/pending/', views.pending_certificates_view, name='pending-certificates'),
     # Assignments
     path('modules/<slug:module_id>/assignments/', views.assignment_list_create, name='assignment-list-create'),
     path('assignments/<int:assignment_id>/submit/', views.submit_assignment, name='assignment-submit'),
     path('assignments/<int:assignment_id>/submissions/', views.view_submissions, name='view-submissions'),
+    path('uploads/', views.start_chunked_upload, name='chunked-upload-start'),
+    path('uploads/<uuid:upload_id>/', views.chunked_upload_detail, name='chunked-upload-detail'),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='chunked-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', views.finalize_chunked_upload, name='chunked-upload-finalize'),
     path('submissions/<int:submission_id>/grade/', views.grade_submission, name='grade-submission'),
     # Tags and Categories Extras
+    path('taxonomy/', views.taxonomy, name='taxonomy'),
     path('tags/', views.tag_list, name='tag-list'),
     path('categories/', views.category_list, name='category-list'),
     path('subcategories/', views.subcategory_list, name='subcategory-list'),
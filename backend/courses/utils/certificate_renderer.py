@@ -0,0 +1,209 @@
+"""
+Certificate PDFs rendered from a per-course template.
+
+The static page (headings, border, signature line, instructor block and the optional branding image
+from CERTIFICATE_BRANDING_IMAGE) is drawn with ReportLab once per course and kept as PDF bytes. A
+certificate is that document plus a PDF incremental update: one content stream with the student name,
+course title, date and certificate ID, and a new version of the page that draws both streams. So each
+render is a few string operations instead of a ReportLab document.
+
+Text the template's standard fonts cannot encode (it would need Symbol/ZapfDingbats substitution) is
+rendered the slow way: the whole page drawn with ReportLab, which lays out the same fields.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.rl_accel import escapePDF, fp_str
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+from ..caching import LRUCache
+
+WIDTH, HEIGHT = letter
+
+# Per-certificate fields: (font, size, x or None to centre, y)
+OVERLAY_LAYOUT = {
+    'student_name': ('Helvetica-Bold', 22, None, HEIGHT - 200),
+    'course_title': ('Helvetica-Bold', 20, None, HEIGHT - 300),
+    'issued_on': ('Helvetica', 11, 140, 62),
+    'certificate_id': ('Helvetica', 11, 140, 46),
+}
+
+# Keyed by (course id, instructor name, branding image); course titles are overlaid, so renames need no reset
+certificate_templates = LRUCache(maxsize=256, ttl=60 * 60)
+
+PAGE_OBJECT = re.compile(rb'(\d+) 0 obj\n<<\n/Contents (\d+) 0 R (.*?/Type /Page\n)>>\nendobj', re.S)
+FONT_NAME = re.compile(rb'/BaseFont /([\w-]+) /Encoding /WinAnsiEncoding /Name /(F\d+)')
+TRAILER = re.compile(
+    rb'/ID\s*\[<(\w+)><(\w+)>\].*?/Info (\d+) 0 R\s*/Root (\d+) 0 R\s*/Size (\d+).*?startxref\n(\d+)\n%%EOF\n?$', re.S,
+)
+
+
+def draw_static(c, instructor_name, branding_image=None):
+    c.setLineWidth(2)
+    c.rect(30, 30, WIDTH - 60, HEIGHT - 60)
+    if branding_image:
+        c.drawImage(ImageReader(branding_image), 50, HEIGHT - 110, width=70, height=70, preserveAspectRatio=True, mask='auto')
+
+    c.setFont("Helvetica-Bold", 26)
+    c.drawCentredString(WIDTH / 2, HEIGHT - 100, "Certificate of Completion")
+    c.setFont("Helvetica", 18)
+    c.drawCentredString(WIDTH / 2, HEIGHT - 150, "This certifies that")
+    c.drawCentredString(WIDTH / 2, HEIGHT - 250, "has successfully completed the course:")
+
+    c.setFont("Helvetica", 14)
+    c.drawString(50, 100, "Signature: _____________________")
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(400, 116, instructor_name)
+    c.setFont("Helvetica", 12)
+    c.drawString(400, 100, "Instructor")
+
+    c.setFont("Helvetica", 11)
+    c.drawString(50, 62, "Date:")
+    c.drawString(50, 46, "Certificate ID:")
+
+
+def overlay_fields(student_name, course_title, issued_on, certificate_id):
+    """(font, size, x, y, text) of the per-certificate text, centred fields already positioned."""
+    values = {
+        'student_name': student_name,
+        'course_title': course_title,
+        'issued_on': issued_on.strftime('%B %d, %Y'),
+        'certificate_id': str(certificate_id),
+    }
+    fields = []
+    for name, (font, size, x, y) in OVERLAY_LAYOUT.items():
+        text = values[name]
+        if x is None:
+            x = (WIDTH - pdfmetrics.stringWidth(text, font, size)) / 2
+        fields.append((font, size, x, y, text))
+    return fields
+
+
+def render_full(instructor_name, fields, branding_image=None):
+    """The whole certificate drawn with ReportLab."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    draw_static(c, instructor_name, branding_image)
+    for font, size, x, y, text in fields:
+        c.setFont(font, size)
+        c.drawString(x, y, text)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class CertificateTemplate:
+    """The static page of a course's certificates, rendered once; render() appends the per-student text."""
+
+    def __init__(self, instructor_name, branding_image=None):
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=letter)
+        draw_static(c, instructor_name, branding_image)
+        c.showPage()
+        c.save()
+        self.instructor_name = instructor_name
+        self.branding_image = branding_image
+        self.pdf = buffer.getvalue()
+        self.fonts = {name.decode(): b'/' + internal for name, internal in FONT_NAME.findall(self.pdf)}
+        page, trailer = PAGE_OBJECT.search(self.pdf), TRAILER.search(self.pdf)
+        # ReportLab writes these exactly this way; if that ever changes every render goes through render_full()
+        self.usable = bool(page and trailer)
+        if self.usable:
+            self.page_number, self.contents_number = int(page.group(1)), int(page.group(2))
+            self.page_rest = page.group(3)
+            self.file_id = trailer.group(1)
+            self.info, self.root, self.size, self.startxref = (int(value) for value in trailer.groups()[2:])
+
+    def _text_operator(self, font, size, x, y, text):
+        runs = pdfmetrics.unicode2T1(text, [pdfmetrics.getFont(font)])
+        if len(runs) > 1 or font not in self.fonts:
+            return None
+        encoded = runs[0][1] if runs else b''
+        return b'BT %s %s Tf 1 0 0 1 %s %s Tm (%s) Tj ET' % (
+            self.fonts[font], fp_str(size).encode(), fp_str(x).encode(), fp_str(y).encode(), escapePDF(encoded).encode('latin-1'),
+        )
+
+    def render(self, fields):
+        """The certificate as template + incremental update, or None if a field needs font substitution."""
+        if not self.usable:
+            return None
+        operators = [b'q 0 g']
+        for field in fields:
+            operator = self._text_operator(*field)
+            if operator is None:
+                return None
+            operators.append(operator)
+        operators.append(b'Q')
+        stream = b'\n'.join(operators)
+
+        out = [self.pdf]
+        offset = len(self.pdf)
+        stream_number = self.size
+        stream_offset = offset
+        chunk = b'%d 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n' % (stream_number, len(stream), stream)
+        out.append(chunk)
+        offset += len(chunk)
+        page_offset = offset
+        chunk = b'%d 0 obj\n<<\n/Contents [ %d 0 R %d 0 R ] %s>>\nendobj\n' % (
+            self.page_number, self.contents_number, stream_number, self.page_rest,
+        )
+        out.append(chunk)
+        offset += len(chunk)
+        # Each file keeps the template's first ID and gets its own second one, as for any updated PDF
+        update_id = hashlib.md5(stream).hexdigest().encode()
+        out.append(
+            b'xref\n%d 1\n%010d 00000 n \n%d 1\n%010d 00000 n \n'
+            b'trailer\n<< /ID [<%s><%s>] /Info %d 0 R /Prev %d /Root %d 0 R /Size %d >>\n'
+            b'startxref\n%d\n%%%%EOF\n' % (
+                self.page_number, page_offset, stream_number, stream_offset,
+                self.file_id, update_id, self.info, self.startxref, self.root, stream_number + 1,
+                offset,
+            )
+        )
+        return b''.join(out)
+
+
+def certificate_template(course_id, instructor_name):
+    branding_image = getattr(settings, 'CERTIFICATE_BRANDING_IMAGE', None) or None
+    return certificate_templates.get_or_set(
+        (course_id, instructor_name, branding_image), lambda: CertificateTemplate(instructor_name, branding_image),
+    )
+
+
+def render_certificate_pdf(course_id, instructor_name, student_name, course_title, issued_on, certificate_id):
+    """PDF bytes of a certificate, from the course's cached template when its fonts can set the text."""
+    template = certificate_template(course_id, instructor_name)
+    fields = overlay_fields(student_name, course_title, issued_on, certificate_id)
+    return template.render(fields) or render_full(instructor_name, fields, template.branding_image)
+
+
+def certificate_path(certificate_id):
+    """Storage name of a certificate's PDF, relative to MEDIA_ROOT."""
+    return f'certificates/certificate_{certificate_id}.pdf'
+
+
+def render_certificate(course_id, instructor_name, student_name, course_title, issued_on, certificate_id):
+    """
+    Render a certificate to MEDIA_ROOT and return its storage name. The file is written under a temporary
+    name and renamed, so a reader never sees a partly written PDF.
+    """
+    name = certificate_path(certificate_id)
+    file_path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    data = render_certificate_pdf(course_id, instructor_name, student_name, course_title, issued_on, certificate_id)
+    # A unique name per call: threads of one process may render the same certificate at once
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(file_path), suffix='.tmp', delete=False) as output:
+        output.write(data)
+    try:
+        # mkstemp-style files are private; give the PDF the permissions of any other stored file
+        os.chmod(output.name, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        os.replace(output.name, file_path)
+    except OSError:
+        os.remove(output.name)
+        raise
+    return name
@@ -2,13 +2,39 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from .models import Module, Course, ModuleContent, Enrollment, ContentProgress, Certificate, Assignment, AssignmentSubmission, Category, SubCategory, Tag, CourseFeedback
-from .serializers import TagSerializer, CategorySerializer, SubCategorySerializer, CourseFeedbackSerializer
-from .serializers import ModuleSerializer, ModuleContentSerializer,CourseSerializer,PendingCertificateSerializer,  CertificateSerializer, DashboardSerializer, AssignmentSerializer, AssignmentSubmissionSerializer
-from .utils.certificate_generator import generate_certificate_pdf
+from .models import Module, Course, ModuleContent, Enrollment, ContentProgress, Certificate, Assignment, AssignmentSubmission, ChunkedUpload, CourseFeedback, CourseStats
+from .serializers import CourseFeedbackSerializer
+from .serializers import field_selection, is_selected
+from .serializers import ModuleSerializer, ModuleContentSerializer,CourseSerializer, CourseListSerializer, PendingCertificateSerializer,  CertificateSerializer, DashboardSerializer, AssignmentSerializer, AssignmentSubmissionSerializer
+from .certificate_jobs import certificate_file, certificate_status, enqueue_certificate, enqueue_certificates
+from .downloads import serve_media_file
+from .pagination import CertificateQueuePagination, CourseCursorPagination
+from .caching import (
+    conditional_get, course_version_key, user_course_version_key, catalog_page_cache_key, record_catalog_page_lookup,
+    CATALOG_PAGE_CACHE_TIMEOUT, CATALOG_VERSION_KEY,
+)
+from .facets import cached_facet_counts
+from .taxonomy import cached_taxonomy, TAXONOMY_VERSION_KEYS
+from .outline import content_bodies, course_outline_document, outline_modules, outline_module_items, selected_body_fields
+from .progress import certificate_queue, complete_contents, course_progress_summary, dashboard_courses, parse_content_id, progress_counts, MAX_BATCH_COMPLETIONS
+from .prerequisites import course_prerequisite_graph
+from .uploads import OffsetMismatch, append_chunk, finalize_upload, start_upload
+from .heartbeats import heartbeat_buffer, parse_heartbeat, resolve_heartbeat_targets, MAX_HEARTBEAT_EVENTS
+from .filters import CourseFilter
+from .search import fulltext_search, icontains_search, suggest, SUGGEST_LIMIT, SUGGEST_MAX_LIMIT
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Q
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
+from django.db.models import Avg, Q, Exists, OuterRef, Prefetch, Value, BooleanField
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+
+User = get_user_model()
+
 # Helper function to check if the user is the author of the course and if they are enrolled in the course
 def user_is_author(user, module_content):
     # Check if user is the author of the course the module_content belongs to
@@ -19,6 +45,108 @@ def user_is_enrolled(user, module_content):
     course = module_content.module.course
     return user in course.students_enrolled.all()
 
+def catalog_queryset(request):
+    """
+    Base queryset for the course catalog.
+    Joins author/category/subcategory, prefetches tags and annotates `is_enrolled` and `is_author`
+    for the requesting user, so serializing a page with `CourseListSerializer` costs a fixed number of queries.
+    Card statistics come from the denormalized CourseStats row (see courses.stats).
+    """
+    courses = Course.objects.select_related('author', 'category', 'subcategory').prefetch_related('tags').annotate(
+        enrollment_count=Coalesce('stats__enrollment_count', 0),
+        content_count=Coalesce('stats__content_count', 0),
+        total_content_duration=Coalesce('stats__total_content_duration', 0),
+        feedback_count=Coalesce('stats__feedback_count', 0),
+        average_rating=Coalesce('stats__average_rating', Value(Decimal('0'))),
+    )
+    user = request.user
+    if user.is_authenticated:
+        return courses.annotate(
+            is_enrolled=Exists(Enrollment.objects.filter(course=OuterRef('pk'), student=user)),
+            is_author=Q(author=user),
+        )
+    return courses.annotate(
+        is_enrolled=Value(False, output_field=BooleanField()),
+        is_author=Value(False, output_field=BooleanField()),
+    )
+
+def course_detail_queryset(user, selection=None):
+    """
+    Course with everything the detail page reads loaded up front: author/category/subcategory and, when
+    modules are selected, the precomputed outline (see courses.outline) joined; tags, enrolled student ids and the user's certificate
+    (as `user_certificates`) prefetched. With a field_selection(), only the selected relations are loaded.
+    """
+    selection = selection or {}
+    courses = Course.objects.select_related('author', 'category', 'subcategory')
+    if is_selected(selection, 'modules', expandable=True):
+        courses = courses.select_related('outline')
+    if is_selected(selection, 'certificate'):
+        courses = courses.prefetch_related(
+            Prefetch('certificate_set', queryset=Certificate.objects.filter(student=user), to_attr='user_certificates'),
+        )
+    if is_selected(selection, 'tags'):
+        courses = courses.prefetch_related('tags')
+    if is_selected(selection, 'students_enrolled') or is_selected(selection, 'is_enrolled'):
+        courses = courses.prefetch_related(Prefetch('students_enrolled', queryset=User.objects.only('pk')))
+    return courses
+
+def module_queryset(selection=None):
+    """Modules with the prerequisites and contents selected by a field_selection() prefetched."""
+    selection = selection or {}
+    modules = Module.objects.all()
+    if is_selected(selection, 'prerequisites'):
+        modules = modules.prefetch_related('prerequisites')
+    if is_selected(selection, 'contents', expandable=True):
+        contents = ModuleContent.objects.all()
+        if not is_selected(selection, 'contents.text'):
+            contents = contents.defer('text')
+        modules = modules.prefetch_related(Prefetch('contents', queryset=contents))
+    return modules
+
+def completed_content_ids(user, course):
+    """Ids of the contents of `course` the user has completed, in one query, for overlaying on the outline."""
+    return set(ContentProgress.objects.filter(
+        student=user, content__module__course=course, is_completed=True,
+    ).values_list('content_id', flat=True))
+
+def filter_catalog(request, courses):
+    """
+    Applies the catalog's visibility rule, search, and the CourseFilter field/tag filters from the query string.
+    Shared by the course list and the facet counts so both see the same filter set.
+    """
+    # Filter for visibility based on auth
+    if not request.user.is_authenticated:
+        courses = courses.filter(is_visible=True)
+
+    # Handle search: ?search_mode=fulltext uses the ranked, GIN-indexed search vector
+    search = request.query_params.get('search')
+    search_mode = request.query_params.get('search_mode', 'icontains')
+    if search_mode not in ('icontains', 'fulltext'):
+        raise ValidationError({'search_mode': ['Choose one of: icontains, fulltext.']})
+    if search and search_mode == 'fulltext':
+        courses = fulltext_search(courses, search)
+    elif search:
+        courses = icontains_search(courses, search)
+
+    # Field and tag filters (courses.filters.CourseFilter)
+    filterset = CourseFilter(request.query_params, queryset=courses, request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return filterset.qs
+
+
+# --- Taxonomy View ---
+@api_view(['GET'])
+def taxonomy(request):
+    """
+    The category -> subcategory tree and all tags in one payload, for course forms and catalog filters.
+    Endpoint: /api/courses/taxonomy/
+    """
+    not_modified, headers = conditional_get(request, *TAXONOMY_VERSION_KEYS)
+    if not_modified:
+        return not_modified
+    data = cached_taxonomy(headers['ETag'])
+    return Response({'categories': data['tree'], 'tags': data['tags']}, headers=headers)
 
 # --- Tag List View ---
 @api_view(['GET'])
@@ -27,9 +155,10 @@ def tag_list(request):
     List all tags.
     Endpoint: /api/courses/tags/
     """
-    tags = Tag.objects.all()
-    serializer = TagSerializer(tags, many=True)
-    return Response(serializer.data)
+    not_modified, headers = conditional_get(request, *TAXONOMY_VERSION_KEYS)
+    if not_modified:
+        return not_modified
+    return Response(cached_taxonomy(headers['ETag'])['tags'], headers=headers)
 
 # --- Category List View ---
 @api_view(['GET'])
@@ -38,9 +167,10 @@ def category_list(request):
     List all categories.
     Endpoint: /api/courses/categories/
     """
-    categories = Category.objects.all()
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    not_modified, headers = conditional_get(request, *TAXONOMY_VERSION_KEYS)
+    if not_modified:
+        return not_modified
+    return Response(cached_taxonomy(headers['ETag'])['categories'], headers=headers)
 
 # --- SubCategory List View (with optional filtering) ---
 @api_view(['GET'])
@@ -49,18 +179,21 @@ def subcategory_list(request):
     List all subcategories.
     Optionally filter by category_slug: /api/courses/subcategories/?category_slug=my-category-slug
     """
-    queryset = SubCategory.objects.all()
+    not_modified, headers = conditional_get(request, *TAXONOMY_VERSION_KEYS)
+    if not_modified:
+        return not_modified
+    data = cached_taxonomy(headers['ETag'])
     category_slug = request.query_params.get('category_slug', None)
     if category_slug is not None:
-        queryset = queryset.filter(category__slug=category_slug)
-    serializer = SubCategorySerializer(queryset, many=True)
-    return Response(serializer.data)
+        return Response(data['by_category'].get(category_slug, []), headers=headers)
+    return Response(data['subcategories'], headers=headers)
 
 @api_view(['GET', 'POST'])
 def course_list_create(request):
     """
     Handles GET and POST requests for courses.
-    GET: Returns a list of all courses, filtered by published status if the user is not authenticated.
+    GET: Returns a cursor-paginated page of the course catalog as summary records (CourseListSerializer),
+    filtered by visibility if the user is not authenticated.
     POST: Creates a new course if the user is authenticated.
     If the user is authenticated, they can create a course.
 
@@ -70,52 +203,40 @@ def course_list_create(request):
         HTTP Response
     """
     if request.method == 'GET':
-        courses = Course.objects.all()
-
-        # Filter for visibility based on auth
-        if not request.user.is_authenticated:
-            courses = courses.filter(is_visible=True)
-
-        # Handle search
-        search = request.query_params.get('search')
-        if search:
-            courses = courses.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(author__username__icontains=search)
-            )
-
-        # Filter by fields
-        level = request.query_params.get('level')
-        category = request.query_params.get('category')
-        subcategory = request.query_params.get('subcategory')
-        is_published = request.query_params.get('is_published')
-        is_visible = request.query_params.get('is_visible')
-        price_min = request.query_params.get('price_min')
-        price_max = request.query_params.get('price_max')
-
-        if level:
-            courses = courses.filter(level__iexact=level)
-        if category:
-            courses = courses.filter(category__slug=category)
-        if subcategory:
-            courses = courses.filter(subcategory__slug=subcategory)
-        if is_published is not None:
-            courses = courses.filter(is_published=is_published.lower() == 'true')
-        if is_visible is not None:
-            courses = courses.filter(is_visible=is_visible.lower() == 'true')
-        if price_min:
-            courses = courses.filter(price__gte=price_min)
-        if price_max:
-            courses = courses.filter(price__lte=price_max)
-
-        #  Ordering
-        ordering = request.query_params.get('ordering')  # e.g., -price, created_at
-        if ordering:
-            courses = courses.order_by(ordering)
-
-        serializer = CourseSerializer(courses, many=True, context={'request': request})
-        return Response(serializer.data)
+        # Answer If-None-Match / If-Modified-Since from the catalog version before running any query
+        user = request.user
+        not_modified, headers = conditional_get(
+            request, CATALOG_VERSION_KEY,
+            vary=f'user:{user.pk}' if user.is_authenticated else '',
+            last_modified=not user.is_authenticated,
+        )
+        if not_modified:
+            return not_modified
+
+        # Anonymous pages are the same for every visitor with the same query; the ETag carries the catalog version
+        if not user.is_authenticated:
+            cache_key = catalog_page_cache_key(request, headers['ETag'])
+            data = cache.get(cache_key)
+            record_catalog_page_lookup(hit=data is not None)
+            if data is not None:
+                return Response(data, headers=headers)
+
+        courses = filter_catalog(request, catalog_queryset(request))
+
+        paginator = CourseCursorPagination()
+        if 'rank' in courses.query.annotations:
+            # Full-text searches are ordered by relevance unless ?ordering is given
+            paginator.default_ordering = 'relevance'
+
+        # Keyset pagination over a whitelisted ordering (e.g. ?ordering=-price&cursor=...)
+        page = paginator.paginate_queryset(courses, request)
+        serializer = CourseListSerializer(page, many=True, context={'request': request, **field_selection(request)})
+        response = paginator.get_paginated_response(serializer.data)
+        if not user.is_authenticated:
+            cache.set(cache_key, response.data, CATALOG_PAGE_CACHE_TIMEOUT)
+        for name, value in headers.items():
+            response[name] = value
+        return response
 
     elif request.method == 'POST':
         if not request.user.is_authenticated:
@@ -127,19 +248,42 @@ def course_list_create(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def course_facets(request):
+    """
+    Facet counts (category, subcategory, level, tag, price band) for the catalog filter set in the query string.
+    Accepts the same filters as the course list; cursor/ordering/page_size are ignored.
+    Endpoint: /api/courses/courses/facets/?level=beginner&search=python
+    """
+    courses = filter_catalog(request, Course.objects.all())
+    return Response(cached_facet_counts(request, courses))
+
+@api_view(['GET'])
+def course_suggest(request):
+    """
+    Autocomplete for the search box: top course, tag, category and subcategory names for a prefix.
+    Tolerates typos once the prefix is 3+ characters long.
+    Endpoint: /api/courses/suggest/?q=pyth&limit=5
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(suggest(request.query_params.get('q', ''), limit))
+
 @api_view(['GET'])
 def subcategories_by_category(request, category_slug):
     """
     List subcategories for a specific category slug.
     Endpoint: /api/courses/categories/{category_slug}/subcategories/
     """
-    # Get the Category object based on the provided slug
-    category = get_object_or_404(Category, slug=category_slug)
-
-    # Filter SubCategory objects related to this category
-    subcategories = SubCategory.objects.filter(category=category)
-    serializer = SubCategorySerializer(subcategories, many=True)
-    return Response(serializer.data)
+    not_modified, headers = conditional_get(request, *TAXONOMY_VERSION_KEYS)
+    if not_modified:
+        return not_modified
+    subcategories = cached_taxonomy(headers['ETag'])['by_category'].get(category_slug)
+    if subcategories is None:
+        return Response({'detail': 'No Category matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(subcategories, headers=headers)
 
 
 
@@ -149,6 +293,7 @@ def course_detail(request, slug):
     """
     Handles GET, PUT, PATCH, and DELETE requests for a specific course.
     GET: Retrieve course details, including certificate if exists. 
+    Supports ?fields=slug,name,modules.title and ?expand=modules,modules.contents (see serializers.field_selection).
     PUT/PATCH: Update course details if the user is the author.
     DELETE: Delete the course if the user is the author.
     Args:
@@ -158,19 +303,40 @@ def course_detail(request, slug):
     Returns:
         HTTP Response
     """
-    course = get_object_or_404(Course, slug=slug)
     if request.method == 'GET':
-        serializer = CourseSerializer(course, context={'request': request})
-        data = serializer.data
-        try:
-            certificate = Certificate.objects.get(student=request.user, course=course)
-            cert_serializer = CertificateSerializer(certificate, context={'request': request})
-            data['certificate'] = cert_serializer.data
-        except Certificate.DoesNotExist:
-            data['certificate'] = None
-        return Response(data)
+        # The page only changes with the course tree or with this student's progress/certificate
+        not_modified, headers = conditional_get(
+            request, course_version_key(slug), user_course_version_key(request.user.pk, slug),
+            vary=f'user:{request.user.pk}', last_modified=False,
+        )
+        if not_modified:
+            return not_modified
+
+        # ?fields= / ?expand= pick the parts of the tree to load and render
+        selection = field_selection(request)
+        course = get_object_or_404(course_detail_queryset(request.user, selection), slug=slug)
+        # The module tree comes from the stored outline with this user's completion overlaid
+        course_selection = {
+            'fields': selection['fields'],
+            'expand': {name for name in selection['expand'] or () if name.split('.')[0] != 'modules'},
+        }
+        data = CourseSerializer(course, context={'request': request, **course_selection}).data
+        if is_selected(selection, 'modules', expandable=True):
+            completed_ids = set()
+            if is_selected(selection, 'modules.contents.is_completed'):
+                completed_ids = completed_content_ids(request.user, course)
+            # Content bodies are not in the outline: one query for the selected ones
+            bodies = content_bodies(
+                ModuleContent.objects.filter(module__course=course), selected_body_fields(selection, 'modules.contents'),
+            )
+            data['modules'] = outline_modules(course_outline_document(course), request, completed_ids, selection, bodies)
+        if is_selected(selection, 'certificate'):
+            certificate = course.user_certificates[0] if course.user_certificates else None
+            data['certificate'] = CertificateSerializer(certificate, context={'request': request}).data if certificate else None
+        return Response(data, headers=headers)
 
-    elif request.method in ['PUT', 'PATCH']:
+    course = get_object_or_404(Course, slug=slug)
+    if request.method in ['PUT', 'PATCH']:
         if course.author != request.user:
             return Response({'detail': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
         serializer = CourseSerializer(course, data=request.data, partial=(request.method == 'PATCH'), context={'request': request})
@@ -202,8 +368,9 @@ def module_list_create_view(request):
     course = get_object_or_404(Course, slug=course_slug)
 
     if request.method == 'GET':
-        modules = Module.objects.all()
-        serializer = ModuleSerializer(modules, many=True)
+        selection = field_selection(request)
+        modules = module_queryset(selection)
+        serializer = ModuleSerializer(modules, many=True, context=selection)
         return Response(serializer.data)
     
     elif request.method == 'POST' and request.user == course.author:
@@ -225,17 +392,18 @@ def module_detail_view(request, slug):
 
     """
     Handles GET, PUT, PATCH, and DELETE requests for a specific module.
-    GET: Retrieve module details.
+    GET: Retrieve module details. Supports ?fields= and ?expand=contents.
     PUT/PATCH: Update module details.
     DELETE: Delete the module.
     """
-    module = get_object_or_404(Module, slug=slug)
-
     if request.method == 'GET':
-        serializer = ModuleSerializer(module)
+        selection = field_selection(request)
+        module = get_object_or_404(module_queryset(selection), slug=slug)
+        serializer = ModuleSerializer(module, context=selection)
         return Response(serializer.data)
 
-    elif request.method in ['PUT', 'PATCH']:
+    module = get_object_or_404(Module, slug=slug)
+    if request.method in ['PUT', 'PATCH']:
         serializer = ModuleSerializer(module, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -267,25 +435,22 @@ def module_content_list_create_view(request):
             return Response({'detail': 'Module slug is required.'}, status=400)
 
         try:
-            module = Module.objects.get(slug=module_slug)
+            module = Module.objects.select_related('course__outline').get(slug=module_slug)
         except Module.DoesNotExist:
             return Response({'detail': 'Module not found.'}, status=404)
 
         # Only enrolled students or author can view
         is_enrolled = module.course.students_enrolled.filter(id=request.user.id).exists()
-        is_author = module.course.author == request.user
+        is_author = module.course.author_id == request.user.pk
 
         if not (is_enrolled or is_author):
             return Response({'detail': 'You are not authorized to view this module.'}, status=403)
 
-        contents = ModuleContent.objects.filter(module=module)
-        assignments = Assignment.objects.filter(module=module)
-
-        content_data = ModuleContentSerializer(contents, many=True, context={'request': request}).data
-        assignment_data = AssignmentSerializer(assignments, many=True, context={'request': request}).data
-
-        combined = sorted(content_data + assignment_data, key=lambda x: x.get('created_at', ''))
-        print(combined)
+        # The module's items in outline order, with the bodies of this module's contents only
+        combined = outline_module_items(
+            course_outline_document(module.course), module, request,
+            completed_content_ids(request.user, module.course), is_author,
+        )
         return Response(combined)
 
     elif request.method == 'POST':
@@ -334,7 +499,16 @@ def module_content_detail_view(request, pk):
         if not user_is_enrolled(request.user, content):
             return Response({'detail': 'You are not enrolled in this course.'}, status=status.HTTP_403_FORBIDDEN)
         serializer = ModuleContentSerializer(content, context={'request': request})
-        return Response(serializer.data)
+        data = serializer.data
+        if content.content_type == 'video':
+            # A heartbeat still buffered in this worker is newer than the stored position
+            position = heartbeat_buffer().position(request.user.pk, content.pk)
+            if position is None:
+                position = ContentProgress.objects.filter(student=request.user, content=content).values_list(
+                    'position_seconds', flat=True,
+                ).first()
+            data['resume_position'] = int(position or 0)
+        return Response(data)
 
     elif request.method in ['PUT', 'PATCH']:
         # Only author can update
@@ -409,6 +583,70 @@ def mark_content_completed(request):
 
     return Response({'success': True})
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_contents_completed(request):
+    """
+    Marks many module contents as completed in one request (video player and offline-sync bursts).
+    Expects `course_id` and a list of `content_ids`; the student must be enrolled in the course.
+    Returns the ids marked now, the ids ignored because they are not contents of the course,
+    and the updated course progress.
+    Endpoint: /api/courses/content-progress/complete/batch/
+    """
+    course_id = request.data.get('course_id')
+    content_ids = request.data.get('content_ids')
+    if not course_id or not isinstance(content_ids, list) or not content_ids:
+        return Response({'error': 'Missing course_id or content_ids'}, status=400)
+    if len(content_ids) > MAX_BATCH_COMPLETIONS:
+        return Response({'error': f'At most {MAX_BATCH_COMPLETIONS} content_ids per request'}, status=400)
+    try:
+        content_ids = {parse_content_id(content_id) for content_id in content_ids}
+    except ValueError:
+        return Response({'error': 'content_ids must be a list of integers'}, status=400)
+
+    course = Course.objects.select_related('stats').annotate(
+        is_enrolled=Exists(Enrollment.objects.filter(course=OuterRef('pk'), student=request.user)),
+    ).filter(slug=course_id).first()
+    if course is None:
+        return Response({'error': 'Course not found'}, status=404)
+    if not course.is_enrolled:
+        return Response({'error': 'You are not enrolled in this course.'}, status=403)
+
+    marked, ignored = complete_contents(request.user, course, content_ids)
+    return Response({'marked_ids': marked, 'ignored_ids': ignored, **course_progress_summary(request.user, course)})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def record_heartbeats(request):
+    """
+    Accepts video player heartbeats: a list of `events`, each with `content_id`, `position` (seconds),
+    optional `duration` and optional `completed`. Events are buffered and coalesced per student and video,
+    then written to ContentProgress in periodic bulk flushes (see courses.heartbeats); a video reported at
+    90% of its duration, or with `completed`, is marked completed by the flush.
+    Only videos of courses the student is enrolled in are accepted; the rest are returned as ignored.
+    Endpoint: /api/courses/content-progress/heartbeats/
+    """
+    events = request.data.get('events')
+    if not isinstance(events, list) or not events:
+        return Response({'error': 'Missing events'}, status=400)
+    if len(events) > MAX_HEARTBEAT_EVENTS:
+        return Response({'error': f'At most {MAX_HEARTBEAT_EVENTS} events per request'}, status=400)
+    try:
+        parsed = [parse_heartbeat(event) for event in events]
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'Each event needs a numeric content_id and position'}, status=400)
+
+    targets = resolve_heartbeat_targets(request.user, {content_id for content_id, *_ in parsed})
+    accepted = [
+        {'student': request.user.pk, 'content': content_id, 'course': targets[content_id],
+         'position': position, 'duration': duration, 'completed': completed}
+        for content_id, position, duration, completed in parsed if content_id in targets
+    ]
+    if accepted:
+        heartbeat_buffer().record(accepted)
+    ignored = sorted({content_id for content_id, *_ in parsed} - set(targets))
+    return Response({'accepted': len(accepted), 'ignored_ids': ignored}, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def course_progress(request, course_id):
@@ -417,23 +655,63 @@ def course_progress(request, course_id):
     except Course.DoesNotExist:
         return Response({"detail": "Course not found."}, status=status.HTTP_404_NOT_FOUND)
 
-    total_contents = ModuleContent.objects.filter(module__course=course).count()
-    completed = ContentProgress.objects.filter(student=request.user, course=course, is_completed=True).count()
-    is_enrolled = Enrollment.objects.filter(student=request.user, course=course).exists()
+    # One row: the enrollment's completed counter joined to the course's content total
+    enrollment = Enrollment.objects.filter(student=request.user, course=course).values_list(
+        'completed_count', 'course__stats__content_count',
+    ).first()
+    is_enrolled = enrollment is not None
+    completed, total_contents = enrollment if is_enrolled and enrollment[1] is not None else progress_counts(request.user, course)
     progress = int((completed / total_contents) * 100) if total_contents > 0 else 0
 
     return Response({"progress": progress, "is_enrolled":is_enrolled}, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def module_unlocks(request, course_id):
+    """
+    Which modules of a course are unlocked for the student: a module unlocks once every prerequisite
+    module is completed. Modules come in prerequisite order; `cyclic` lists modules that can never unlock
+    because their prerequisites loop. The graph is cached per outline build, so this costs the version
+    check, the course row and the student's completed contents.
+    Endpoint: /api/courses/courses/<course_id>/modules/unlocks/
+    """
+    not_modified, headers = conditional_get(
+        request, course_version_key(course_id), user_course_version_key(request.user.pk, course_id),
+        vary=f'user:{request.user.pk}', last_modified=False,
+    )
+    if not_modified:
+        return not_modified
+
+    course = Course.objects.select_related('outline').annotate(
+        is_enrolled=Exists(Enrollment.objects.filter(course=OuterRef('pk'), student=request.user)),
+    ).filter(slug=course_id).first()
+    if course is None:
+        return Response({'detail': 'Course not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if not course.is_enrolled and course.author_id != request.user.pk:
+        return Response({'detail': 'You are not enrolled in this course.'}, status=status.HTTP_403_FORBIDDEN)
+
+    graph = course_prerequisite_graph(course)
+    modules = graph.unlocks(completed_content_ids(request.user, course))
+    return Response({
+        'course': course.pk,
+        'modules': modules,
+        'unlocked': [module['slug'] for module in modules if module['is_unlocked']],
+        'locked': [module['slug'] for module in modules if not module['is_unlocked']],
+        'cyclic': graph.cyclic,
+    }, headers=headers)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_dashboard_view(request):
     user = request.user
-    user_certificates = Certificate.objects.filter(student=user)
-    serializer = DashboardSerializer(user, context={'request': request})
-    data = serializer.data
-    data['certificates'] = CertificateSerializer(user_certificates, many=True).data
-    print(data['certificates'])
-    return Response(data)
+    # One query for the enrolled courses with their progress counters, one for the certificates
+    context = {
+        'request': request,
+        'courses': list(dashboard_courses(user)),
+        'certificates': list(Certificate.objects.filter(student=user)),
+    }
+    serializer = DashboardSerializer(user, context=context)
+    return Response(serializer.data)
 
 
 @api_view(['POST'])
@@ -448,13 +726,9 @@ def apply_for_certificate(request, course_id):
         cert.applied_at = timezone.now()
         cert.save()
         return Response({"res": "Certificate application was rejected, now its updated to pending approval."})
-    student_name = cert.student.first_name + cert.student.last_name 
-    course_title = cert.course.name
-    if course.auto_certificate:
-        cert.status = 'approved'
-        pdf_path = generate_certificate_pdf(student_name, course_title, cert.id)
-        cert.pdf_file = pdf_path
-        cert.save()
+    if course.auto_certificate and cert.status in ('pending', 'failed'):
+        # Rendered by the certificate worker; poll certificates/<id>/status/ until it is approved
+        enqueue_certificate(cert)
 
     serializer = CertificateSerializer(cert)
     return Response(serializer.data)
@@ -462,30 +736,112 @@ def apply_for_certificate(request, course_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def approve_certificate(request, cert_id):
-    cert = Certificate.objects.get(id=cert_id)
-    student_name = cert.student.first_name + cert.student.last_name 
-    course_title = cert.course.name
+    cert = get_object_or_404(Certificate.objects.select_related('course'), id=cert_id)
 
     if request.user != cert.course.author:
         return Response({"error": "Unauthorized"}, status=403)
-    cert.status = 'approved'
-    cert.issued_at = timezone.now()
-    pdf_path = generate_certificate_pdf(student_name, course_title, cert.id)
-    cert.pdf_file = pdf_path
-    cert.save()
-    return Response({"success": "Certificate approved."})
+    if cert.status == 'approved':
+        return Response({"success": "Certificate already approved."})
+    # The PDF is rendered by the certificate worker (manage.py process_certificate_jobs)
+    job = enqueue_certificate(cert, issued_at=timezone.now())
+    return Response(
+        {"success": "Certificate approval queued.", "status": cert.status, "job_id": job.pk},
+        status=status.HTTP_202_ACCEPTED,
+    )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_approve_certificates(request):
+    """
+    Approve many certificates at once: `certificate_ids`, or `course_id` (a course slug) for all of its
+    pending certificates. Authorship of every certificate is checked in one query and nothing is approved
+    if any is not the author's. The renders are queued together and the certificate worker runs them in
+    its process pool; poll certificates/<id>/status/ as for a single approval.
+    Endpoint: /api/courses/certificates/approve/bulk/
+    """
+    user = request.user
+    if request.data.get('course_id'):
+        course = get_object_or_404(Course, slug=request.data['course_id'])
+        if course.author_id != user.pk:
+            return Response({"error": "Unauthorized"}, status=403)
+        certificates = list(Certificate.objects.filter(course=course, status='pending'))
+        already_approved = []
+    else:
+        try:
+            ids = {int(pk) for pk in request.data.get('certificate_ids') or []}
+        except (TypeError, ValueError):
+            return Response({"error": "certificate_ids must be a list of ids."}, status=400)
+        if not ids:
+            return Response({"error": "Provide certificate_ids or course_id."}, status=400)
+        certificates = list(Certificate.objects.filter(pk__in=ids, course__author=user))
+        unauthorized = ids - {certificate.pk for certificate in certificates}
+        if unauthorized:
+            return Response({"error": "Unauthorized", "certificate_ids": sorted(unauthorized)}, status=403)
+        already_approved = sorted(certificate.pk for certificate in certificates if certificate.status == 'approved')
+        certificates = [certificate for certificate in certificates if certificate.status != 'approved']
+
+    jobs = enqueue_certificates(certificates, issued_at=timezone.now()) if certificates else []
+    return Response(
+        {
+            "success": f"{len(certificates)} certificate approval(s) queued.",
+            "certificate_ids": sorted(certificate.pk for certificate in certificates),
+            "already_approved": already_approved,
+            "job_ids": sorted(job.pk for job in jobs),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def pending_certificates_view(request):
-    user = request.user
-    certificates = Certificate.objects.filter(
-        course__author=user,
-    ).select_related('student', 'course')
+def certificate_status_view(request, cert_id):
+    """
+    Status of a certificate for polling while its PDF renders: 'generating' until the worker finishes,
+    then 'approved' with `pdf_file`, or 'failed' once the retries are used up; `job` describes the
+    latest render attempt. Visible to the student and the course author.
+    Endpoint: /api/courses/certificates/<cert_id>/status/
+    """
+    cert = get_object_or_404(Certificate.objects.select_related('course'), id=cert_id)
+    if request.user.pk not in (cert.student_id, cert.course.author_id):
+        return Response({"error": "Unauthorized"}, status=403)
+    return Response(certificate_status(cert))
 
-    serializer = PendingCertificateSerializer(certificates, many=True)
-    return Response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_certificate(request, cert_id):
+    """
+    Stream an approved certificate's PDF to its student or the course author, with ETag/Last-Modified
+    validators and Range support (see courses.downloads). A PDF missing from disk is rendered on the spot.
+    Endpoint: /api/courses/certificates/<cert_id>/download/
+    """
+    cert = get_object_or_404(Certificate.objects.select_related('student', 'course__author'), id=cert_id)
+    if request.user.pk not in (cert.student_id, cert.course.author_id):
+        return Response({"error": "Unauthorized"}, status=403)
+    if cert.status != 'approved':
+        return Response({"error": "Certificate has not been issued yet."}, status=404)
+    return serve_media_file(request, certificate_file(cert), f'certificate_{cert.pk}.pdf', content_type='application/pdf')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def pending_certificates_view(request):
+    """
+    The certificate requests of the author's courses, oldest first, each with the student's progress.
+    ?status=pending (default), a comma-separated list of statuses or `all`; paginated with
+    ?page= and ?page_size=. Two queries per page: the count and the annotated page.
+    Endpoint: /api/courses/certificates/pending/
+    """
+    choices = [value for value, _ in Certificate._meta.get_field('status').choices]
+    requested = request.query_params.get('status', 'pending')
+    statuses = choices if requested == 'all' else [value for value in requested.split(',') if value]
+    invalid = set(statuses) - set(choices)
+    if invalid or not statuses:
+        return Response({"status": [f"Choose 'all' or any of: {', '.join(choices)}."]}, status=400)
+
+    paginator = CertificateQueuePagination()
+    page = paginator.paginate_queryset(certificate_queue(request.user, statuses), request)
+    serializer = PendingCertificateSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -519,6 +875,18 @@ def assignment_list_create(request, module_id):
         return Response(serializer.errors, status=400)
 
 
+def submission_denied(user, assignment):
+    """Response refusing a submission of `assignment` by `user`, or None if they may submit."""
+    ## Check if the user is enrolled in the course of the assignment's module
+    if not Enrollment.objects.filter(student=user, course_id=assignment.module.course_id).exists():
+        return Response({'detail': 'You are not enrolled in this course.'}, status=403)
+
+    # Check if the assignment is already submitted by the user
+    if AssignmentSubmission.objects.filter(student=user, assignment=assignment).exists():
+        return Response({'detail': 'You have already submitted this assignment.'}, status=400)
+    return None
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_assignment(request, assignment_id):
@@ -527,13 +895,9 @@ def submit_assignment(request, assignment_id):
     except Assignment.DoesNotExist:
         return Response({'detail': 'Assignment not found.'}, status=404)
 
-    ## Check if the user is enrolled in the course of the assignment's module
-    if not Enrollment.objects.filter(student=request.user, course=assignment.module.course).exists():
-        return Response({'detail': 'You are not enrolled in this course.'}, status=403)
-    
-    # Check if the assignment is already submitted by the user
-    if AssignmentSubmission.objects.filter(student=request.user, assignment=assignment).exists():
-        return Response({'detail': 'You have already submitted this assignment.'}, status=400)
+    denied = submission_denied(request.user, assignment)
+    if denied:
+        return denied
 
     serializer = AssignmentSubmissionSerializer(data=request.data)
     if serializer.is_valid():
@@ -542,6 +906,116 @@ def submit_assignment(request, assignment_id):
     return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_chunked_upload(request):
+    """
+    Start a resumable upload (see courses.uploads) of `filename`, `size` bytes, for either
+    `assignment_id` (becomes the user's submission) or `content_id` (the file of a module content
+    the user authors). Then PUT each chunk's bytes to uploads/<id>/chunk/?offset=<n>, and POST
+    uploads/<id>/finalize/ with the SHA-256 `checksum` of the whole file.
+    Endpoint: /api/courses/uploads/
+    """
+    assignment = content = None
+    try:
+        if request.data.get('assignment_id') and not request.data.get('content_id'):
+            assignment = Assignment.objects.select_related('module').filter(pk=int(request.data['assignment_id'])).first()
+            if assignment is None:
+                return Response({'detail': 'Assignment not found.'}, status=404)
+            denied = submission_denied(request.user, assignment)
+            if denied:
+                return denied
+        elif request.data.get('content_id') and not request.data.get('assignment_id'):
+            content = ModuleContent.objects.select_related('module__course').filter(pk=int(request.data['content_id'])).first()
+            if content is None:
+                return Response({'detail': 'Content not found.'}, status=404)
+            if not user_is_author(request.user, content):
+                return Response({'detail': 'Only the author can upload content files.'}, status=403)
+        else:
+            return Response({'detail': 'Provide either assignment_id or content_id.'}, status=400)
+        upload = start_upload(request.user, request.data.get('filename'), request.data.get('size'), assignment, content)
+    except (TypeError, ValueError):
+        return Response({'detail': 'assignment_id, content_id and size must be integers.'}, status=400)
+    except DjangoValidationError as error:
+        return Response({'detail': error.messages}, status=400)
+    return Response(chunked_upload_state(upload), status=201)
+
+
+def chunked_upload_state(upload):
+    return {'id': upload.pk, 'filename': upload.filename, 'size': upload.size, 'offset': upload.offset}
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def chunked_upload_detail(request, upload_id):
+    """
+    GET: the upload's `offset`, where a client that lost track resumes. DELETE: cancel the upload.
+    Endpoint: /api/courses/uploads/<upload_id>/
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, owner=request.user)
+    if request.method == 'DELETE':
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(chunked_upload_state(upload))
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, upload_id):
+    """
+    Append the raw request body at ?offset=<n>, which must equal the upload's offset (409 with the
+    current `offset` otherwise). The body is streamed to disk, never held in memory whole.
+    Endpoint: /api/courses/uploads/<upload_id>/chunk/?offset=<n>
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, owner=request.user)
+    try:
+        offset = int(request.query_params['offset'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (KeyError, ValueError):
+        return Response({'detail': 'An integer ?offset= and a Content-Length are required.'}, status=400)
+    try:
+        # request.stream, not request.data: the body is read as it arrives instead of being parsed
+        new_offset = append_chunk(upload, offset, request.stream, length)
+    except ChunkedUpload.DoesNotExist:
+        return Response({'detail': 'Upload not found.'}, status=404)
+    except OffsetMismatch as mismatch:
+        return Response({'detail': str(mismatch), 'offset': mismatch.offset}, status=409)
+    except DjangoValidationError as error:
+        return Response({'detail': error.messages}, status=400)
+    return Response({'id': upload.pk, 'size': upload.size, 'offset': new_offset})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_chunked_upload(request, upload_id):
+    """
+    Check the assembled file against `checksum` (SHA-256, hex) and attach it: returns the new
+    submission (with the optional `comment`) or the updated module content.
+    Endpoint: /api/courses/uploads/<upload_id>/finalize/
+    """
+    upload = get_object_or_404(
+        ChunkedUpload.objects.select_related('assignment__module', 'content__module__course'), pk=upload_id, owner=request.user,
+    )
+    if upload.assignment_id:
+        denied = submission_denied(request.user, upload.assignment)
+        if denied:
+            return denied
+    elif not user_is_author(request.user, upload.content):
+        return Response({'detail': 'Only the author can upload content files.'}, status=403)
+    try:
+        target = finalize_upload(upload, request.data.get('checksum'), request.data.get('comment'))
+    except ChunkedUpload.DoesNotExist:
+        # Finalized by a concurrent request
+        return Response({'detail': 'Upload not found.'}, status=404)
+    except DjangoValidationError as error:
+        return Response({'detail': error.messages}, status=400)
+    except IntegrityError:
+        return Response({'detail': 'You have already submitted this assignment.'}, status=400)
+    if upload.assignment_id:
+        return Response(AssignmentSubmissionSerializer(target, context={'request': request}).data, status=201)
+    return Response(ModuleContentSerializer(target, context={'request': request}).data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def view_submissions(request, assignment_id):
@@ -580,15 +1054,16 @@ def submit_feedback(request, slug):
         serializer = CourseFeedbackSerializer(feedback, data=request.data, partial=True)
     except CourseFeedback.DoesNotExist:
         serializer = CourseFeedbackSerializer(data=request.data)
-    print(serializer)
 
     if serializer.is_valid():
         serializer.save(user=request.user, course=course)
-        # Update course rating in Course table
-        feedbacks = CourseFeedback.objects.filter(course=course)
-        avg_rating = round(sum(f.rating for f in feedbacks) / feedbacks.count(), 1)
-        course.rating = avg_rating
-        course.save()
+        # Update course rating from the incrementally maintained stats; courses without a stats row
+        # (bulk-created, until rebuild_course_stats runs) average their feedback directly
+        average = CourseStats.objects.filter(course=course).values_list('average_rating', flat=True).first()
+        if average is None:
+            average = course.feedbacks.aggregate(average=Avg('rating'))['average'] or 0
+        course.rating = round(average)
+        course.save(update_fields=['rating'])
         return Response(serializer.data)
     return Response(serializer.errors, status=400)
 
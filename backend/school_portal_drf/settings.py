@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -94,6 +95,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Defaults to per-process memory; point CACHE_BACKEND at FileBasedCache (with CACHE_LOCATION a directory)
+# to share cached catalog pages and their hit/miss counters between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lms-cache'),
+    }
+}
+
+# Video heartbeats are buffered per worker and written to ContentProgress every HEARTBEAT_FLUSH_INTERVAL
+# seconds (0 disables the background flush). Unflushed events are journaled in HEARTBEAT_JOURNAL_DIR,
+# which must be local to the host; set it empty to buffer in memory only.
+
+HEARTBEAT_JOURNAL_DIR = config('HEARTBEAT_JOURNAL_DIR', default=str(BASE_DIR / 'heartbeats'))
+HEARTBEAT_FLUSH_INTERVAL = config('HEARTBEAT_FLUSH_INTERVAL', default=10, cast=float)
+HEARTBEAT_MAX_PENDING = config('HEARTBEAT_MAX_PENDING', default=5000, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -162,4 +184,17 @@ CORS_ALLOWED_ORIGINS = [
     ]  
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media' 
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media' 
+
+# Optional logo drawn on every certificate; templates are cached per course, so restart workers after changing it
+CERTIFICATE_BRANDING_IMAGE = config('CERTIFICATE_BRANDING_IMAGE', default='')
+
+# Behind nginx, an `internal` location aliased to MEDIA_ROOT (e.g. /protected-media/): permission-checked
+# downloads are then handed to nginx with X-Accel-Redirect instead of being streamed by Django
+SENDFILE_ACCEL_PREFIX = config('SENDFILE_ACCEL_PREFIX', default='')
+
+# Resumable uploads (courses.uploads) are assembled here; on the same filesystem as MEDIA_ROOT the
+# finished file is renamed into place instead of copied
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=str(BASE_DIR / 'uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+CHUNKED_UPLOAD_MAX_CHUNK = config('CHUNKED_UPLOAD_MAX_CHUNK', default=8 * 1024 ** 2, cast=int)
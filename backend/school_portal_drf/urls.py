@@ -14,10 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import posixpath
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.http import Http404
+from django.views.static import serve
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    # Certificates are only served by the permission-checked api/courses/certificates/<id>/download/
+    if posixpath.normpath(path).lstrip('/').startswith('certificates/'):
+        raise Http404
+    return serve(request, path, document_root=document_root, show_indexes=show_indexes)
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,4 +36,4 @@ urlpatterns = [
     path('api/courses/', include('courses.urls')),
     path('api/admin/', include('administration.urls')),
 ] 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -73,17 +73,12 @@ const AddCourseForm = () => {
           return;
         }
 
-        // Fetch categories
-        const categoriesRes = await axios.get(`${BASE_URL}/api/courses/categories/`, {
+        // Fetch categories (with their subcategories) and tags in one request
+        const taxonomyRes = await axios.get(`${BASE_URL}/api/courses/taxonomy/`, {
           headers: { Authorization: `Bearer ${token}` }
         });
-        setCategories(categoriesRes.data);
-
-        // Fetch tags
-        const tagsRes = await axios.get(`${BASE_URL}/api/courses/tags/`, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        setAllTags(tagsRes.data);
+        setCategories(taxonomyRes.data.categories);
+        setAllTags(taxonomyRes.data.tags);
 
       } catch (err) {
         console.error('Error fetching initial data:', err);
@@ -96,27 +91,16 @@ const AddCourseForm = () => {
     fetchData();
   }, []);
 
-  // Fetch subcategories when category changes
+  // Subcategories of the selected category come with the taxonomy
   useEffect(() => {
     if (formData.category) {
-      const fetchSubcategories = async () => {
-        try {
-          const token = localStorage.getItem('access');
-          const res = await axios.get(`${BASE_URL}/api/courses/categories/${formData.category}/subcategories/`, {
-            headers: { Authorization: `Bearer ${token}` }
-          });
-          setSubcategories(res.data);
-        } catch (err) {
-          console.error('Error fetching subcategories:', err);
-          setErrors(prev => ({ ...prev, subcategory: 'Failed to load subcategories.' }));
-        }
-      };
-      fetchSubcategories();
+      const category = categories.find(cat => cat.slug === formData.category);
+      setSubcategories(category ? category.subcategories : []);
     } else {
       setSubcategories([]);
       setFormData(prev => ({ ...prev, subcategory: '' })); // Reset subcategory if category is cleared
     }
-  }, [formData.category]);
+  }, [formData.category, categories]);
 
   const handleChange = (e) => {
     const { name, value, type, checked, files } = e.target;
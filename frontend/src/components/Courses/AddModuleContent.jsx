@@ -2,6 +2,7 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { uploadInChunks } from '../../uploadService';
 import {
   BookOpenIcon,
   VideoCameraIcon,
@@ -84,9 +85,7 @@ const AddModuleContent = () => {
     if (form.content_type === 'video' && form.video_url) {
       formData.append('video_url', form.video_url);
     }
-    if (form.content_type === 'file' && form.file) {
-      formData.append('file', form.file);
-    }
+    // The file itself is sent afterwards in resumable chunks
     
     // Only append duration if it's greater than 0 (optional field)
     if (form.duration > 0) {
@@ -94,12 +93,15 @@ const AddModuleContent = () => {
     }
 
     try {
-      await axios.post(`${BASE_URL}/api/courses/contents/`, formData, {
+      const res = await axios.post(`${BASE_URL}/api/courses/contents/`, formData, {
         headers: {
           // 'Content-Type': 'multipart/form-data' is usually set automatically by axios for FormData
           Authorization: `Bearer ${localStorage.getItem('access')}`,
         },
       });
+      if (form.content_type === 'file' && form.file) {
+        await uploadInChunks(form.file, { content_id: res.data.id });
+      }
       setSuccessMsg('Content added successfully!');
       // Reset form to initial state after success
       setForm({
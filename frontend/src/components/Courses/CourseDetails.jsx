@@ -107,22 +107,60 @@ const CourseDetailPage = () => {
     }
   };
 
+  // The PDF is rendered in the background; refresh once it is no longer 'generating'
+  const pollCertificate = (certificateId, headers) => {
+    const timer = setInterval(async () => {
+      try {
+        const res = await axios.get(
+          `http://127.0.0.1:8000/api/courses/certificates/${certificateId}/status/`,
+          { headers }
+        );
+        if (res.data.status !== 'generating') {
+          clearInterval(timer);
+          fetchCourse();
+        }
+      } catch (error) {
+        console.error(error);
+        clearInterval(timer);
+      }
+    }, 2000);
+  };
+
   const handleApplyForCertificate = async () => {
     try {
       // URL untouched: Apply for certificate
-      await axios.post(
+      const headers = { Authorization: `Bearer ${localStorage.getItem('access')}` };
+      const res = await axios.post(
         `http://127.0.0.1:8000/api/courses/certificates/apply/${course.slug}/`,
         {},
-        { headers: { Authorization: `Bearer ${localStorage.getItem('access')}` } }
+        { headers }
       );
       alert("Certificate request sent!");
       fetchCourse(); // Refresh course state to potentially update certificate status
+      if (res.data?.status === 'generating') {
+        pollCertificate(res.data.id, headers);
+      }
     } catch (error) {
       console.error(error);
       alert("Already applied or error occurred.");
     }
   };
 
+  // The download endpoint checks the token, so the PDF is fetched with it and opened from a blob URL
+  const handleViewCertificate = async () => {
+    try {
+      const res = await axios.get(course.certificate.download_url, {
+        headers: { Authorization: `Bearer ${localStorage.getItem('access')}` },
+        responseType: 'blob',
+      });
+      const url = URL.createObjectURL(res.data);
+      window.open(url, '_blank', 'noopener,noreferrer');
+      setTimeout(() => URL.revokeObjectURL(url), 60000);
+    } catch (error) {
+      console.error(error);
+      alert("Failed to open the certificate.");
+    }
+  };
 
   useEffect(() => {
     fetchCourse();
@@ -306,7 +344,7 @@ const CourseDetailPage = () => {
             </p>
 
             <div className="flex flex-col sm:flex-row space-y-3 sm:space-y-0 sm:space-x-4">
-              {progress?.progress === 100 && course.certificate?.status !== 'approved' && course.certificate?.status !== 'pending' && (
+              {progress?.progress === 100 && !['approved', 'pending', 'generating'].includes(course.certificate?.status) && (
                 <button
                   onClick={handleApplyForCertificate}
                   className="inline-flex items-center px-6 py-3 rounded-xl text-white font-semibold transition duration-300 transform hover:scale-105 shadow-md
@@ -317,16 +355,14 @@ const CourseDetailPage = () => {
                 </button>
               )}
 
-              {course.certificate?.status === 'approved' && course.certificate.pdf_file && (
-                <a
-                  href={course.certificate.pdf_file} // URL untouched
-                  target="_blank"
-                  rel="noopener noreferrer"
+              {course.certificate?.status === 'approved' && course.certificate.download_url && (
+                <button
+                  onClick={handleViewCertificate}
                   className="inline-flex items-center px-6 py-3 rounded-xl text-blue-700 dark:text-blue-300 font-semibold transition duration-300 transform hover:scale-105 shadow-md border border-blue-500 hover:bg-blue-50 dark:hover:bg-blue-800 focus:outline-none focus:ring-2 focus:ring-blue-500 focus:ring-opacity-50 space-x-2"
                 >
                   <ArrowDownTrayIcon className="h-5 w-5" />
                   <span>View Certificate PDF</span>
-                </a>
+                </button>
               )}
             </div>
           </div>
@@ -8,6 +8,7 @@ const Courselist = () => {
   const [courses, setCourses] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null); // The catalog is cursor-paginated; URL of the next page
   const navigate = useNavigate();
   const coursesApiUrl = 'http://127.0.0.1:8000/api/courses/courses/'; 
 
@@ -18,7 +19,8 @@ const Courselist = () => {
       const headers = accessToken ? { Authorization: `Bearer ${accessToken}` } : {};
 
       const response = await axios.get(coursesApiUrl, { headers });
-      setCourses(response.data || []);
+      setCourses(response.data?.results || []);
+      setNextPage(response.data?.next || null);
     } catch (err) {
       console.error('Error fetching courses:', err);
       setError('Failed to load courses. Please try again later.');
@@ -27,6 +29,19 @@ const Courselist = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const accessToken = localStorage.getItem('access');
+      const headers = accessToken ? { Authorization: `Bearer ${accessToken}` } : {};
+      const response = await axios.get(nextPage, { headers });
+      setCourses(prev => [...prev, ...(response.data?.results || [])]);
+      setNextPage(response.data?.next || null);
+    } catch (err) {
+      console.error('Error fetching more courses:', err);
+      alert('Failed to load more courses. Please try again.');
+    }
+  };
+
   useEffect(() => {
     fetchCourses();
   }, []);
@@ -142,6 +157,17 @@ const Courselist = () => {
             </p>
           </div>
         )}
+
+        {nextPage && (
+          <div className="flex justify-center">
+            <button
+              onClick={loadMore}
+              className="inline-flex items-center px-5 py-2 border border-gray-300 dark:border-gray-700 text-sm font-medium rounded-md shadow-sm text-gray-700 dark:text-gray-200 bg-white dark:bg-gray-800 hover:bg-gray-50 dark:hover:bg-gray-700"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
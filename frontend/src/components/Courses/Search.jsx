@@ -20,12 +20,15 @@ const BASE_URL = 'http://127.0.0.1:8000'; // Define your base URL
 const CourseSearchFilter = () => {
   const [courses, setCourses] = useState([]);
   const [search, setSearch] = useState('');
+  // Whole-word, relevance-ranked search; the default matches substrings of titles, descriptions and authors
+  const [wholeWords, setWholeWords] = useState(false);
   const [level, setLevel] = useState('');
   const [category, setCategory] = useState('');
   const [priceRange, setPriceRange] = useState([0, 5000]);
   const [ordering, setOrdering] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextPage, setNextPage] = useState(null); // The catalog is cursor-paginated; URL of the next page
 
   const availableCategories = [
     'Programming', 'Design', 'Marketing', 'Business', 'Photography', 'Music', 'Health & Fitness', 'Development'
@@ -38,6 +41,7 @@ const CourseSearchFilter = () => {
     try {
       const params = {
         search,
+        search_mode: search && wholeWords ? 'fulltext' : undefined,
         level: level || undefined,
         category: category || undefined,
         price_min: priceRange[0] > 0 ? priceRange[0] : undefined,
@@ -48,8 +52,8 @@ const CourseSearchFilter = () => {
       Object.keys(params).forEach(key => params[key] === undefined && delete params[key]);
 
       const res = await axios.get(`${BASE_URL}/api/courses/courses/`, { params });
-      setCourses(res.data);
-      console.log('Fetched courses:', res.data);
+      setCourses(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error('Failed to fetch courses', err.response?.data || err.message);
       setError('Failed to load courses. Please try adjusting your filters or try again later.');
@@ -58,6 +62,18 @@ const CourseSearchFilter = () => {
     }
   };
 
+  // `next` already carries the filters and the cursor
+  const loadMore = async () => {
+    try {
+      const res = await axios.get(nextPage);
+      setCourses(prev => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error('Failed to fetch more courses', err.response?.data || err.message);
+      alert('Failed to load more courses. Please try again.');
+    }
+  };
+
   useEffect(() => {
     const handler = setTimeout(() => {
       fetchCourses();
@@ -66,7 +82,7 @@ const CourseSearchFilter = () => {
     return () => {
       clearTimeout(handler);
     };
-  }, [search, level, category, priceRange, ordering]);
+  }, [search, wholeWords, level, category, priceRange, ordering]);
 
   return (
     <div className="min-h-screen p-6 bg-gray-50 dark:bg-slate-900 font-sans antialiased">
@@ -89,6 +105,15 @@ const CourseSearchFilter = () => {
                 value={search}
                 onChange={(e) => setSearch(e.target.value)}
               />
+              <label className="ml-3 flex items-center text-xs text-gray-600 dark:text-gray-300 whitespace-nowrap cursor-pointer">
+                <input
+                  type="checkbox"
+                  className="mr-1 accent-indigo-500"
+                  checked={wholeWords}
+                  onChange={(e) => setWholeWords(e.target.checked)}
+                />
+                Whole words
+              </label>
             </div>
 
             {/* Level Select */}
@@ -241,6 +266,17 @@ const CourseSearchFilter = () => {
             ))}
           </div>
         )}
+
+        {!loading && !error && nextPage && (
+          <div className="mt-8 flex justify-center">
+            <button
+              onClick={loadMore}
+              className="inline-flex items-center px-5 py-2 border border-gray-300 dark:border-slate-600 text-sm font-medium rounded-md shadow-sm text-gray-700 dark:text-gray-200 bg-white dark:bg-slate-800 hover:bg-gray-50 dark:hover:bg-slate-700"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
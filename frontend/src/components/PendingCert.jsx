@@ -22,6 +22,7 @@ const PendingCertificates = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [actionLoading, setActionLoading] = useState(null); // To disable buttons during action
+  const [nextPage, setNextPage] = useState(null); // The queue is paginated; URL of the next page
 
   const fetchPending = async () => {
     setLoading(true);
@@ -34,7 +35,8 @@ const PendingCertificates = () => {
       const res = await axios.get(`${BASE_URL}/api/courses/certificates/pending/`, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      setRequests(res.data);
+      setRequests(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error('Error fetching pending certificates:', err);
       setError('Failed to load certificate requests. Please try again.');
@@ -62,6 +64,37 @@ const PendingCertificates = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const res = await axios.get(nextPage, {
+        headers: { Authorization: `Bearer ${localStorage.getItem('access')}` }
+      });
+      setRequests(prev => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error('Error fetching more certificate requests:', err);
+      alert('Failed to load more requests. Please try again.');
+    }
+  };
+
+  const handleApproveAll = async () => {
+    const ids = requests.filter(req => req.status === 'pending').map(req => req.id);
+    setActionLoading('all');
+    try {
+      // One request for the whole list; the PDFs are rendered in the background
+      const res = await axios.post(`${BASE_URL}/api/courses/certificates/approve/bulk/`, { certificate_ids: ids }, {
+        headers: { Authorization: `Bearer ${localStorage.getItem('access')}` }
+      });
+      alert(res.data.success);
+      fetchPending();
+    } catch (err) {
+      console.error('Error approving certificates:', err);
+      alert('Failed to approve certificates. Please try again.');
+    } finally {
+      setActionLoading(null);
+    }
+  };
+
   useEffect(() => {
     fetchPending();
   }, []);
@@ -131,6 +164,18 @@ const PendingCertificates = () => {
           <span>Pending Certificate Requests</span>
         </h2>
 
+        {requests.some(req => req.status === 'pending') && (
+          <div className="mb-6 flex justify-end">
+            <button
+              onClick={handleApproveAll}
+              disabled={actionLoading !== null}
+              className="inline-flex items-center px-5 py-2 border border-transparent text-sm font-medium rounded-md shadow-sm text-white bg-green-600 hover:bg-green-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-green-500 dark:bg-green-700 dark:hover:bg-green-800 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {actionLoading === 'all' ? 'Approving...' : 'Approve all pending'}
+            </button>
+          </div>
+        )}
+
         <div className="flex flex-col gap-6">
           {requests.map(req => (
             <div
@@ -184,6 +229,17 @@ const PendingCertificates = () => {
             </div>
           ))}
         </div>
+
+        {nextPage && (
+          <div className="mt-8 flex justify-center">
+            <button
+              onClick={loadMore}
+              className="inline-flex items-center px-5 py-2 border border-gray-300 dark:border-slate-600 text-sm font-medium rounded-md shadow-sm text-gray-700 dark:text-gray-200 bg-white dark:bg-slate-800 hover:bg-gray-50 dark:hover:bg-slate-700"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
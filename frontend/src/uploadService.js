@@ -0,0 +1,50 @@
+import api from './api/api';
+import { Sha256 } from './sha256';
+
+const CHUNK_SIZE = 4 * 1024 * 1024;
+
+async function readBytes(file, start, end) {
+  return new Uint8Array(await file.slice(start, end).arrayBuffer());
+}
+
+// Resumable upload: the file is sent in chunks and, after a failed chunk, resumed from the offset the
+// server reports. `target` is { assignment_id } for a submission or { content_id } for a module file.
+// The checksum is computed from the chunks as they are read, so at most one chunk is in memory.
+export async function uploadInChunks(file, target, { comment, onProgress, retries = 3 } = {}) {
+  const { data: upload } = await api.post('courses/uploads/', { ...target, filename: file.name, size: file.size });
+  const hash = new Sha256();
+  let hashed = 0;
+  const hashUpTo = async (end) => {
+    for (; hashed < end; hashed = Math.min(hashed + CHUNK_SIZE, end)) {
+      hash.update(await readBytes(file, hashed, Math.min(hashed + CHUNK_SIZE, end)));
+    }
+  };
+  let offset = upload.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    // The server may report an offset past the bytes hashed so far; hash the gap in order first
+    await hashUpTo(offset);
+    const chunk = await readBytes(file, offset, offset + CHUNK_SIZE);
+    if (offset === hashed) {
+      hash.update(chunk);
+      hashed += chunk.length;
+    }
+    try {
+      const res = await api.put(`courses/uploads/${upload.id}/chunk/?offset=${offset}`, chunk, {
+        headers: { 'Content-Type': 'application/octet-stream' },
+      });
+      offset = res.data.offset;
+      failures = 0;
+      onProgress?.(offset / file.size);
+    } catch (err) {
+      if (++failures > retries) throw err;
+      // 409 carries the offset; otherwise ask where the upload stopped
+      offset = err.response?.status === 409
+        ? err.response.data.offset
+        : (await api.get(`courses/uploads/${upload.id}/`)).data.offset;
+    }
+  }
+  await hashUpTo(file.size);
+  const res = await api.post(`courses/uploads/${upload.id}/finalize/`, { checksum: hash.hex(), comment });
+  return res.data;
+}